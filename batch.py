@@ -0,0 +1,366 @@
+"""
+Plays scripted games without prompts or delays, one after the other in
+the same process, and writes the result of each as a line of JSON.
+
+Examples:
+    python main.py --batch moves.txt --output results.jsonl
+    python batch.py moves.txt                      # the same, to the screen
+    generate-moves | python batch.py - --capacity 8
+
+The script is read line by line. Blank lines and lines starting with #
+are skipped, and words are not case sensitive. A game starts with:
+    NEW [puzzleId]        a new game of the configuration, or of a puzzle ID
+    SEED n                the game of seed n, with the shape of the configuration
+    SAVE fileName         a saved game
+    PACK fileName level   a level of a puzzle pack (see buildpack.py)
+and is then played by the lines that follow it, until END or the start
+of the next game:
+    A B                   pour bottle A into bottle B
+    <, >                  undo, redo
+
+A move that is not possible counts as an error, as in the game. Lines
+that are not understood, and moves made once the game is over, are
+rejected: they are counted and the first ones are reported, but change
+nothing. Each result has "ok", "line" (where the game started),
+"start", the game ("puzzleId", "nrBotts", "botSize", "expertise"),
+"status" ("won", "lost" or "playing"), "nrErrors", "fullBottles",
+"moves", "undos", "redos", "rejected", "problems", the final "bottles" and
+"seconds" (to build and play the game); or "ok" false and "error" if the
+game could not be started.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import functions as funcs
+from gameconfig import CFG_FILE, loadConfig
+from gamesession import GameSession
+from pack import PuzzlePack
+from puzzleid import formatPuzzleId, newPuzzleId, parsePuzzleId
+from saves import loadSave, parseSaveFile
+
+# The words that start a game
+STARTS = ("NEW", "SEED", "SAVE", "PACK")
+# How many rejected lines of a game are reported
+MAX_PROBLEMS = 10
+
+# *****************************************************
+def newGame(cfgFile, overrides, puzzleId=None, seed=None):
+    """
+    The game information of a new game, like functions.newGameInfo but
+    without printing or waiting
+
+    Parameters
+    ----------
+    cfgFile : string
+        The configuration file.
+    overrides : dictionary
+        Values that replace those of the file.
+    puzzleId : string, optional
+        The game to build. The default is None (a new one).
+    seed : int, optional
+        Builds the game of this seed instead, with the shape of the
+        configuration (and, if its expertise is random, an expertise
+        chosen by the seed). The default is None.
+
+    Returns
+    -------
+    tuple
+        As returned by functions.newGameInfo.
+
+    """
+    if puzzleId is not None:
+        idBotts, idSize, idExpert, _ = parsePuzzleId(puzzleId)
+        overrides = dict(overrides, nrBotts=idBotts, botSize=idSize, expertise=str(idExpert))
+    cfg = loadConfig(cfgFile, overrides)
+    if cfg.expertise != "random":
+        expertise = int(cfg.expertise)
+    elif seed is not None:
+        expertise = random.Random(seed).randint(1, 5)
+    else:
+        expertise = random.randint(1, 5)
+    if puzzleId is None:
+        puzzleId = newPuzzleId(cfg.nrBotts, cfg.botSize, expertise) if seed is None \
+            else formatPuzzleId(cfg.nrBotts, cfg.botSize, expertise, seed)
+    bottles = funcs.buildGameFromId(puzzleId, cfg.bottleLabels(),
+                                    cfg.colorSymbols(cfg.nrBotts - expertise))
+    return cfg.botSize, cfg.nrBotts, expertise, 0, 0, bottles, puzzleId
+
+# *****************************************************
+def savedGame(fileName):
+    """
+    The game information of a save file, read directly (the saves index
+    is neither needed nor changed)
+
+    Raises
+    ------
+    ValueError
+        If the file is not a save.
+
+    """
+    entry = parseSaveFile(fileName)
+    if entry is None:
+        raise ValueError(f"{fileName} is not a saved game")
+    folder, name = os.path.split(fileName)
+    bottles = loadSave(name, entry, folder or ".")
+    return (entry["botSize"], entry["nrBotts"], entry["expertise"], entry["nrErrors"],
+            entry["fullBottles"], bottles, entry.get("puzzleId"))
+
+# *****************************************************
+class BatchRunner:
+    """
+    Plays the games of scripts, keeping what can serve several games:
+    the configuration (cached by loadConfig) and the open puzzle packs.
+    """
+
+    __slots__ = ("cfgFile", "overrides", "packs")
+
+    def __init__(self, cfgFile=CFG_FILE, overrides=None):
+        self.cfgFile = cfgFile
+        self.overrides = dict(overrides or {})
+        # fileName -> PuzzlePack
+        self.packs = {}
+
+    # *************************************************
+    def close(self):
+        for pack in self.packs.values():
+            pack.close()
+        self.packs.clear()
+
+    # *************************************************
+    def gameInfo(self, words):
+        """
+        The game information of a line starting a game (see the module
+        docstring)
+
+        Raises
+        ------
+        ValueError
+            If the line is not valid or the game cannot be built.
+        OSError
+            If a file cannot be read.
+
+        """
+        start, args = words[0].upper(), words[1:]
+        if start == "NEW" and len(args) <= 1:
+            return newGame(self.cfgFile, self.overrides, args[0] if args else None)
+        if start == "SEED" and len(args) == 1:
+            return newGame(self.cfgFile, self.overrides, seed=int(args[0]))
+        if start == "SAVE" and len(args) == 1:
+            return savedGame(args[0])
+        if start == "PACK" and len(args) == 2:
+            fileName, level = args[0], int(args[1])
+            if fileName not in self.packs:
+                self.packs[fileName] = PuzzlePack(fileName)
+            pack = self.packs[fileName]
+            nrBotts, botSize, expertise = pack.shape(level)
+            cfg = loadConfig(self.cfgFile, dict(self.overrides, nrBotts=nrBotts,
+                                                botSize=botSize, expertise=str(expertise)),
+                             validate=False)
+            bottles = pack.bottles(level, cfg.bottleLabels(),
+                                   cfg.colorSymbols(nrBotts - expertise))
+            return botSize, nrBotts, expertise, 0, 0, bottles, None
+        raise ValueError("a game starts with NEW [puzzleId], SEED n, SAVE fileName "
+                         "or PACK fileName level")
+
+    # *************************************************
+    def run(self, lines):
+        """
+        Plays the games of a script
+
+        Parameters
+        ----------
+        lines : iterable of strings
+            The script (see the module docstring), e.g. an open file.
+
+        Yields
+        ------
+        dictionary
+            The result of each game, as soon as it ends; lines before the
+            first game give a result with "ok" false.
+
+        """
+        game = None
+        # After a line that could not start a game, until the next start
+        skipping = False
+        for number, line in enumerate(lines, start=1):
+            words = line.split()
+            if not words or words[0].startswith("#"):
+                continue
+            command = words[0].upper()
+            if command in STARTS or command == "END":
+                if game is not None:
+                    yield game.result()
+                    game = None
+                skipping = False
+                if command == "END":
+                    continue
+                begun = time.perf_counter()
+                try:
+                    info = self.gameInfo(words)
+                except (ValueError, OSError, IndexError) as e:
+                    yield {"ok": False, "line": number, "start": line.strip(), "error": str(e)}
+                    skipping = True
+                    continue
+                game = BatchGame(GameSession.fromInfo(info), number, line.strip(), begun)
+            elif game is not None:
+                game.play(number, words)
+            elif not skipping:
+                yield {"ok": False, "line": number, "start": line.strip(),
+                       "error": "no game: start one with " + ", ".join(STARTS)}
+                skipping = True
+        if game is not None:
+            yield game.result()
+
+# *****************************************************
+class BatchGame:
+    """
+    The game being played by a script and what happened to it.
+    """
+
+    __slots__ = ("session", "line", "start", "begun", "moves", "undos", "redos",
+                 "rejected", "problems")
+
+    def __init__(self, session, line, start, begun):
+        self.session = session
+        self.line = line
+        self.start = start
+        self.begun = begun
+        self.moves = 0
+        self.undos = 0
+        self.redos = 0
+        self.rejected = 0
+        self.problems = []
+
+    # *************************************************
+    def reject(self, number, problem):
+        self.rejected += 1
+        if len(self.problems) < MAX_PROBLEMS:
+            self.problems.append(f"line {number}: {problem}")
+
+    # *************************************************
+    def play(self, number, words):
+        # One line of moves
+        session = self.session
+        if session.over():
+            self.reject(number, "the game is over")
+        elif words == ["<"]:
+            if session.undo():
+                self.undos += 1
+            else:
+                self.reject(number, "nothing to undo")
+        elif words == [">"]:
+            if session.redo():
+                self.redos += 1
+            else:
+                self.reject(number, "nothing to redo")
+        elif len(words) == 2:
+            source, destin = (word.upper() for word in words)
+            try:
+                if session.move(source, destin):
+                    self.moves += 1
+            except KeyError as e:
+                self.reject(number, f"there is no bottle {e.args[0]}")
+        else:
+            self.reject(number, "a move is two bottles, < or >")
+
+    # *************************************************
+    def result(self):
+        session = self.session
+        if session.won():
+            status = "won"
+        elif session.over():
+            status = "lost"
+        else:
+            status = "playing"
+        return {"ok": True, "line": self.line, "start": self.start,
+                "puzzleId": session.puzzleId, "nrBotts": session.nrBotts,
+                "botSize": session.botSize, "expertise": session.expertise,
+                "status": status, "nrErrors": session.nrErrors,
+                "fullBottles": session.fullBottles, "moves": self.moves,
+                "undos": self.undos, "redos": self.redos, "rejected": self.rejected, "problems": self.problems,
+                "bottles": session.bottles, "seconds": time.perf_counter() - self.begun}
+
+# *****************************************************
+def runBatch(script, output, cfgFile=CFG_FILE, overrides=None):
+    """
+    Plays a script and writes one line of JSON per game
+
+    Parameters
+    ----------
+    script : file
+        The script (see the module docstring).
+    output : file
+        Where the results go.
+    cfgFile : string, optional
+        The configuration of new games. The default is CFG_FILE.
+    overrides : dictionary, optional
+        Values that replace those of the configuration file.
+
+    Returns
+    -------
+    dictionary
+        "games", "failed" (games that could not be started), "won" and
+        "seconds".
+
+    """
+    summary = {"games": 0, "failed": 0, "won": 0}
+    start = time.perf_counter()
+    runner = BatchRunner(cfgFile, overrides)
+    try:
+        for result in runner.run(script):
+            summary["games"] += 1
+            summary["failed"] += not result["ok"]
+            summary["won"] += result.get("status") == "won"
+            output.write(json.dumps(result) + "\n")
+    finally:
+        runner.close()
+    output.flush()
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+# *****************************************************
+def batch(scriptFile, outputFile=None, cfgFile=CFG_FILE, overrides=None):
+    """
+    runBatch with file names ("-" or None for the standard streams),
+    reporting the totals on the standard error
+    """
+    script = sys.stdin if scriptFile == "-" else open(scriptFile, 'r', encoding='utf-8')
+    output = sys.stdout if outputFile in (None, "-") else \
+        open(outputFile, 'w', encoding='utf-8')
+    try:
+        summary = runBatch(script, output, cfgFile, overrides)
+    finally:
+        if script is not sys.stdin:
+            script.close()
+        if output is not sys.stdout:
+            output.close()
+    seconds = summary["seconds"]
+    print(f"{summary['games']} games ({summary['won']} won, {summary['failed']} not started) "
+          f"in {seconds:.2f} s, {summary['games'] / seconds if seconds else 0:.0f} games/s",
+          file=sys.stderr)
+    return summary
+
+# *****************************************************
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Play scripted games, writing JSON lines.")
+    parser.add_argument("script", help="the script of moves, - for the standard input")
+    parser.add_argument("--output", help="the results file (default: the standard output)")
+    parser.add_argument("--config", default=CFG_FILE)
+    parser.add_argument("--capacity", type=int, dest="botSize")
+    parser.add_argument("--bottles", type=int, dest="nrBotts")
+    parser.add_argument("--symbols")
+    parser.add_argument("--letters")
+    parser.add_argument("--expertise")
+    args = parser.parse_args(args)
+    overrides = {name: getattr(args, name) for name in
+                 ("botSize", "nrBotts", "symbols", "letters", "expertise")
+                 if getattr(args, name) is not None}
+    batch(args.script, args.output, args.config, overrides)
+
+
+if __name__ == "__main__":
+    main()
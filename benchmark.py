@@ -0,0 +1,502 @@
+"""
+Benchmarks for the core functions of the game.
+
+Examples:
+    python benchmark.py                         # run and print
+    python benchmark.py --save bench_baseline.json
+    python benchmark.py --compare bench_baseline.json
+    python benchmark.py --symmetry 20            # states saved by symmetry
+    python benchmark.py --patterns 20            # nodes saved by the pattern tables
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+
+import functions as funcs
+from gameconfig import DEFAULT_CONFIG, GameConfig
+from board import Board
+from generator import buildGameBatch
+from moveindex import MoveIndex
+from patterndb import PDB_FOLDER, PatternDatabase
+from solver import solveBoard
+
+# (nrBotts, botSize, expert); the last ones go beyond the 10 x 20 limits
+# of the configuration menu
+SIZES = [(7, 8, 2), (10, 8, 3), (10, 20, 3), (40, 32, 5), (120, 64, 10)]
+
+# *****************************************************
+def labelsAndSymbols(nrBotts):
+    """
+    Single character bottle labels and symbols for a game of any size
+
+    Parameters
+    ----------
+    nrBotts : int
+        The number of bottles in the game.
+
+    Returns
+    -------
+    letters : string
+    symbols : string
+
+    """
+    letters = "".join(chr(0x1000 + i) for i in range(nrBotts))
+    symbols = "".join(chr(0x100 + i) for i in range(nrBotts))
+    return letters, symbols
+
+# *****************************************************
+def seededBottles(nrBotts, botSize, expert, seed=0):
+    """
+    The same game every time for the same arguments
+
+    Parameters
+    ----------
+    nrBotts, botSize, expert : int
+        As in functions.buildGameBottles.
+    seed : int, optional
+        The default is 0.
+
+    Returns
+    -------
+    dictionary
+        As built by functions.buildGameBottles.
+
+    """
+    letters, symbols = labelsAndSymbols(nrBotts)
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return funcs.buildGameBottles(nrBotts, botSize, expert, letters, symbols)
+    finally:
+        random.setstate(state)
+
+# *****************************************************
+def legalMoves(bottles, botSize):
+    return [(source, destin) for source in bottles for destin in bottles
+            if source != destin and funcs.moveIsPossible(botSize, source, destin, bottles)]
+
+# *****************************************************
+@contextmanager
+def noDelaysAndInput(answer):
+    # newGameInfo/oldGameInfo sleep and ask questions; those are not
+    # what is being measured
+    funcs.sleep = lambda seconds: None
+    funcs.input = lambda prompt="": answer
+    try:
+        yield
+    finally:
+        del funcs.input
+        funcs.sleep = time.sleep
+
+# *****************************************************
+def benchMoves(nrBotts, botSize, expert):
+    bottles = seededBottles(nrBotts, botSize, expert)
+    moves = legalMoves(bottles, botSize) or [(None, None)]
+
+    def run():
+        for source, destin in moves:
+            transfer = funcs.doMove(botSize, source, destin, bottles)
+            funcs.undoMove(source, destin, transfer, bottles)
+    return run, len(moves)
+
+# *****************************************************
+def benchMoveIsPossible(nrBotts, botSize, expert):
+    bottles = seededBottles(nrBotts, botSize, expert)
+    pairs = [(source, destin) for source in bottles for destin in bottles]
+
+    def run():
+        for source, destin in pairs:
+            funcs.moveIsPossible(botSize, source, destin, bottles)
+    return run, len(pairs)
+
+# *****************************************************
+def benchAllMovesPairs(nrBotts, botSize, expert):
+    bottles = seededBottles(nrBotts, botSize, expert)
+
+    def run():
+        legalMoves(bottles, botSize)
+    return run, 1
+
+# *****************************************************
+def benchAllMovesIndex(nrBotts, botSize, expert):
+    # Each operation lists the moves and then makes and takes back one,
+    # so the cost of keeping the index up to date is measured too
+    index = MoveIndex(Board.fromBottles(seededBottles(nrBotts, botSize, expert), botSize))
+
+    def run():
+        moves = index.legalMoves()
+        if moves:
+            source, destin = moves[0]
+            index.undoMove(source, destin, index.doMove(source, destin))
+    return run, 1
+
+# *****************************************************
+def benchFull(nrBotts, botSize, expert):
+    bottles = seededBottles(nrBotts, botSize, expert)
+    contents = list(bottles.values())
+    # Full bottles are the slowest case: every symbol is compared
+    contents += [[content[0]] * botSize for content in contents if content]
+
+    def run():
+        for content in contents:
+            funcs.full(content, botSize)
+    return run, len(contents)
+
+# *****************************************************
+def benchBuild(nrBotts, botSize, expert):
+    letters, symbols = labelsAndSymbols(nrBotts)
+
+    def run():
+        funcs.buildGameBottles(nrBotts, botSize, expert, letters, symbols)
+    return run, 1
+
+# *****************************************************
+def benchShow(nrBotts, botSize, expert):
+    bottles = seededBottles(nrBotts, botSize, expert)
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            funcs.showBottles(bottles, botSize, 0)
+    return run, 1
+
+# *****************************************************
+def benchNewGame(nrBotts, botSize, expert, folder):
+    letters, symbols = labelsAndSymbols(nrBotts)
+    cfg = GameConfig(botSize, nrBotts, symbols, letters, str(expert))
+    if cfg.problems():
+        # newGameInfo only accepts the sizes of the configuration menu
+        return None
+    fileName = os.path.join(folder, f"cfg.{nrBotts}x{botSize}.txt")
+    with open(fileName, 'w', encoding='utf-8') as file:
+        file.write(f"#\n{botSize}\n\n#\n{nrBotts}\n\n#\n{symbols}\n\n"
+                   f"#\n{letters}\n\n#\n{expert}")
+
+    def run():
+        with noDelaysAndInput(""), redirect_stdout(io.StringIO()):
+            funcs.newGameInfo(fileName)
+    return run, 1
+
+# *****************************************************
+def benchOldGame(nrBotts, botSize, expert, folder):
+    letters, symbols = labelsAndSymbols(nrBotts)
+    bottles = seededBottles(nrBotts, botSize, expert)
+    saveFolder = os.path.join(folder, f"save.{nrBotts}x{botSize}")
+    os.makedirs(saveFolder, exist_ok=True)
+    here = os.getcwd()
+    os.chdir(saveFolder)
+    try:
+        with noDelaysAndInput("bench"), redirect_stdout(io.StringIO()):
+            funcs.writeGameInfo(botSize, nrBotts, expert, 0, 0, bottles)
+    finally:
+        os.chdir(here)
+
+    def run():
+        os.chdir(saveFolder)
+        try:
+            with noDelaysAndInput("1"), redirect_stdout(io.StringIO()):
+                funcs.oldGameInfo()
+        finally:
+            os.chdir(here)
+    return run, 1
+
+BENCHMARKS = {"doMove+undo": benchMoves,
+              "moveIsPossible": benchMoveIsPossible,
+              "allMoves:pairs": benchAllMovesPairs,
+              "allMoves:index": benchAllMovesIndex,
+              "full": benchFull,
+              "buildGameBottles": benchBuild,
+              "showBottles": benchShow,
+              "newGameInfo": benchNewGame,
+              "oldGameInfo": benchOldGame}
+FILE_BENCHMARKS = ("newGameInfo", "oldGameInfo")
+
+# *****************************************************
+def measure(run, opsPerRun, minSeconds):
+    """
+    Measures the speed and memory use of run
+
+    Parameters
+    ----------
+    run : function
+        Called without arguments; does opsPerRun operations.
+    opsPerRun : int
+        The number of operations done by each call.
+    minSeconds : float
+        Each of the 3 timed rounds calls run until at least this long
+        has passed; the fastest round is kept.
+
+    Returns
+    -------
+    dictionary
+        "opsPerSec", "peakKiB" (memory peak of one call) and "netBlocks"
+        (memory blocks still allocated after one call, per operation).
+
+    """
+    run()  # warm up
+    # The best of a few rounds is much less sensitive to other processes
+    best = 0.0
+    for _ in range(3):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < minSeconds:
+            run()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, calls * opsPerRun / elapsed)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return {"opsPerSec": best,
+            "peakKiB": peak / 1024,
+            "netBlocks": blocks / opsPerRun}
+
+# *****************************************************
+def runAll(names=None, sizes=SIZES, minSeconds=0.2):
+    """
+    Runs the benchmarks for each size
+
+    Parameters
+    ----------
+    names : list of strings, optional
+        Keys of BENCHMARKS. The default is None (all of them).
+    sizes : list of tuples (nrBotts, botSize, expert), optional
+        The default is SIZES.
+    minSeconds : float, optional
+        Minimum time of each timed round. The default is 0.2.
+
+    Returns
+    -------
+    dictionary
+        Keys are "name nrBottsxbotSize", values as returned by measure.
+
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for name in names or BENCHMARKS:
+            for nrBotts, botSize, expert in sizes:
+                if name in FILE_BENCHMARKS:
+                    run, ops = BENCHMARKS[name](nrBotts, botSize, expert, folder) or (None, 0)
+                else:
+                    run, ops = BENCHMARKS[name](nrBotts, botSize, expert)
+                if run is None:
+                    continue
+                results[f"{name} {nrBotts}x{botSize}"] = measure(run, ops, minSeconds)
+    return results
+
+# *****************************************************
+def symmetryReport(nrBoards, seed=0, maxNodes=20000):
+    """
+    How much ignoring bottle order shrinks the search
+
+    The same games of the default configuration (each with a random
+    expertise, as a new game gets) are solved with plain and with
+    canonical transposition table keys (see solver.solveBoard).
+
+    Parameters
+    ----------
+    nrBoards : int
+        The number of games to solve.
+    seed : int, optional
+        The default is 0.
+    maxNodes : int, optional
+        Node budget of each search. The default is 20000.
+
+    Returns
+    -------
+    dictionary
+        "plain" and "canonical", each with the total "nodes",
+        "peakTable", "solved" and "seconds", and "nodesSaved" and
+        "tableSaved" (fractions), counted over the games both solved.
+
+    """
+    nrBotts = DEFAULT_CONFIG.nrBotts
+    botSize = DEFAULT_CONFIG.botSize
+    report = {}
+    stats = {}
+    for canonical, name in ((False, "plain"), (True, "canonical")):
+        stats[name] = []
+        total = {"nodes": 0, "peakTable": 0, "solved": 0, "seconds": 0.0}
+        games = random.Random(seed)
+        for _ in range(nrBoards):
+            expert = games.randint(1, DEFAULT_CONFIG.maxExpertise())
+            board = buildGameBatch(1, nrBotts, botSize, expert, games).board(
+                0, range(nrBotts), range(1, nrBotts - expert + 1))
+            solution, result = solveBoard(board, nrBotts - expert, maxNodes,
+                                          canonical=canonical)
+            stats[name].append((solution is not None, result))
+            total["solved"] += solution is not None
+            for key in ("nodes", "peakTable", "seconds"):
+                total[key] += result[key]
+        report[name] = total
+    both = [(plain[1], canonical[1]) for plain, canonical in zip(stats["plain"], stats["canonical"])
+            if plain[0] and canonical[0]]
+    for key, saved in (("nodes", "nodesSaved"), ("peakTable", "tableSaved")):
+        before = sum(plain[key] for plain, _ in both)
+        after = sum(canonical[key] for _, canonical in both)
+        report[saved] = 1 - after / before if before else 0.0
+    return report
+
+# *****************************************************
+def patternReport(nrBoards, nrBotts=10, botSize=4, expert=2, seed=0, maxNodes=200000,
+                  folder=PDB_FOLDER):
+    """
+    How much the pattern tables shrink the search
+
+    The same games are solved with the bound of the runs and with the
+    tables of folder (see patterndb), which must hold the table of
+    botSize.
+
+    Parameters
+    ----------
+    nrBoards : int
+        The number of games to solve.
+    nrBotts, botSize, expert : int, optional
+        The games. The defaults are 10, 4 and 2.
+    seed : int, optional
+        The default is 0.
+    maxNodes : int, optional
+        Node budget of each search. The default is 200000.
+    folder : string, optional
+        The default is PDB_FOLDER.
+
+    Returns
+    -------
+    dictionary
+        "runs" and "patterns", each with the games "solved" and the total
+        "nodes" and "seconds" of the games both solved, "nodesSaved" (a
+        fraction) and "mismatches", the games whose solutions are not
+        equally long (always 0, both bounds being admissible).
+
+    """
+    patterns = PatternDatabase(folder)
+    if patterns.table(botSize) is None:
+        raise ValueError(f"there is no pattern table of capacity {botSize} in {folder}")
+    boards = buildGameBatch(nrBoards, nrBotts, botSize, expert, random.Random(seed))
+    report = {name: {"nodes": 0, "solved": 0, "seconds": 0.0} for name in ("runs", "patterns")}
+    report["mismatches"] = 0
+    try:
+        for row in range(nrBoards):
+            board = boards.board(row, range(nrBotts), range(1, nrBotts - expert + 1))
+            found = {}
+            for name, database in (("runs", None), ("patterns", patterns)):
+                found[name] = solveBoard(board.copy(), nrBotts - expert, maxNodes,
+                                         patterns=database)
+                report[name]["solved"] += found[name][0] is not None
+            if found["runs"][0] is None or found["patterns"][0] is None:
+                continue
+            report["mismatches"] += len(found["runs"][0]) != len(found["patterns"][0])
+            for name, (_, result) in found.items():
+                report[name]["nodes"] += result["nodes"]
+                report[name]["seconds"] += result["seconds"]
+    finally:
+        patterns.close()
+    before = report["runs"]["nodes"]
+    report["nodesSaved"] = 1 - report["patterns"]["nodes"] / before if before else 0.0
+    return report
+
+# *****************************************************
+def compare(results, baseline, tolerance):
+    """
+    Finds the benchmarks that got slower than the baseline
+
+    Parameters
+    ----------
+    results, baseline : dictionaries
+        As returned by runAll.
+    tolerance : float
+        Accepted slowdown, e.g. 0.2 for 20%.
+
+    Returns
+    -------
+    list of strings
+        One message per regression.
+
+    """
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        ratio = result["opsPerSec"] / old["opsPerSec"]
+        if ratio < 1 - tolerance:
+            regressions.append(f"{key}: {result['opsPerSec']:.0f} ops/s, "
+                               f"was {old['opsPerSec']:.0f} ({ratio:.0%})")
+    return regressions
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game functions.")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--seconds", type=float, default=0.2)
+    parser.add_argument("--save", help="store the results as a baseline file")
+    parser.add_argument("--compare", help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--symmetry", type=int, metavar="N",
+                        help="only compare the search of N default games "
+                             "with and without canonical keys")
+    parser.add_argument("--patterns", type=int, metavar="N",
+                        help="only compare the search of N games with and without "
+                             "the pattern tables")
+    parser.add_argument("--shape", type=int, nargs=3, default=(10, 4, 2),
+                        metavar=("NRBOTTS", "BOTSIZE", "EXPERT"),
+                        help="the games of --patterns (default: 10 4 2)")
+    parser.add_argument("--folder", default=PDB_FOLDER, help="the pattern tables")
+    args = parser.parse_args()
+
+    if args.patterns:
+        report = patternReport(args.patterns, *args.shape, folder=args.folder)
+        for name in ("runs", "patterns"):
+            total = report[name]
+            print(f"{name:10} {total['solved']:4} solved {total['nodes']:10} nodes "
+                  f"{total['seconds']:8.2f} s")
+        print(f"On the games both solved: {report['nodesSaved']:.0%} fewer nodes, "
+              f"{report['mismatches']} solutions of another length")
+        return
+
+    if args.symmetry:
+        report = symmetryReport(args.symmetry)
+        for name in ("plain", "canonical"):
+            total = report[name]
+            print(f"{name:10} {total['solved']:4} solved {total['nodes']:10} nodes "
+                  f"{total['peakTable']:10} table entries {total['seconds']:8.2f} s")
+        print(f"On the games both solved: {report['nodesSaved']:.0%} fewer nodes, "
+              f"{report['tableSaved']:.0%} fewer table entries")
+        return
+
+    results = runAll(args.names, minSeconds=args.seconds)
+    print(f"{'benchmark':32}{'ops/s':>14}{'peak KiB':>12}{'blocks/op':>12}")
+    for key, result in results.items():
+        print(f"{key:32}{result['opsPerSec']:14.0f}{result['peakKiB']:12.1f}"
+              f"{result['netBlocks']:12.2f}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print("Baseline written to " + args.save)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION " + message)
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,579 @@
+import hashlib
+from array import array
+
+EMPTY = 0
+# Above this many colors, cells take 2 bytes each
+MAX_BYTE_COLORS = 255
+
+# *****************************************************
+def newCells(nrColors, size=0):
+    """
+    A sequence of empty cells for color codes up to nrColors
+
+    Parameters
+    ----------
+    nrColors : int
+        The number of different colors the cells must hold.
+    size : int, optional
+        The number of cells. The default is 0.
+
+    Returns
+    -------
+    bytearray, or array of unsigned shorts if nrColors > MAX_BYTE_COLORS
+        Both are indexed, sliced, extended and compared the same way.
+
+    """
+    if nrColors > MAX_BYTE_COLORS:
+        return array('H', bytes(2 * size))
+    return bytearray(size)
+
+# *****************************************************
+class Board:
+    """
+    A compact representation of the game bottles.
+
+    All the bottles share a single bytearray (see newCells) with botSize
+    cells per bottle; cell (b, i) holds the color code of position i of
+    bottle b, 0 meaning empty. Color codes 1, 2, ... stand for the
+    symbols, and the number of filled cells of each bottle is kept in
+    heights. Bottles are identified by their index (0 to nrBotts - 1);
+    labels keeps the letters of the original dictionary.
+
+    The methods mirror the functions of the functions module, with the
+    same rules, but moves only touch the cells of the two bottles involved.
+    """
+
+    __slots__ = ("botSize", "nrBotts", "cells", "heights", "labels", "symbols", "blank")
+
+    def __init__(self, botSize, nrBotts, labels, symbols):
+        self.botSize = botSize
+        self.nrBotts = nrBotts
+        self.cells = newCells(len(symbols), botSize * nrBotts)
+        self.heights = bytearray(nrBotts)
+        self.labels = labels
+        self.symbols = symbols
+        # Empty cells of the same type, to clear part of a bottle
+        self.blank = newCells(len(symbols), botSize)
+
+    # *************************************************
+    @classmethod
+    def fromBottles(cls, bottles, botSize):
+        """
+        Builds a board from a dictionary of bottles
+
+        Parameters
+        ----------
+        bottles : dictionary
+            Keys are strings and values are lists.
+        botSize : int
+            The capacity of bottles.
+
+        Returns
+        -------
+        Board
+
+        """
+        # Colors are numbered by first appearance
+        codes = {}
+        for content in bottles.values():
+            for char in content:
+                if char not in codes:
+                    codes[char] = len(codes) + 1
+        board = cls(botSize, len(bottles), list(bottles.keys()), list(codes))
+        for bottle, content in enumerate(bottles.values()):
+            base = bottle * botSize
+            for position, char in enumerate(content):
+                board.cells[base + position] = codes[char]
+            board.heights[bottle] = len(content)
+        return board
+
+    # *************************************************
+    def toBottles(self):
+        """
+        Builds the dictionary of bottles this board represents
+
+        Returns
+        -------
+        dictionary
+            Keys are the labels and values are lists of symbols.
+
+        """
+        result = {}
+        for bottle, label in enumerate(self.labels):
+            base = bottle * self.botSize
+            result[label] = [self.symbols[code - 1] for code in
+                             self.cells[base : base + self.heights[bottle]]]
+        return result
+
+    # *************************************************
+    def copy(self):
+        """
+        A new board with the same contents
+
+        Returns
+        -------
+        Board
+
+        """
+        other = Board.__new__(Board)
+        other.botSize = self.botSize
+        other.nrBotts = self.nrBotts
+        other.cells = self.cells[:]
+        other.heights = bytearray(self.heights)
+        other.labels = self.labels
+        other.symbols = self.symbols
+        other.blank = self.blank
+        return other
+
+    # *************************************************
+    def key(self):
+        """
+        A hashable snapshot of the contents of the board
+
+        Returns
+        -------
+        bytes
+            Empty cells are 0, so the cells alone identify the board.
+
+        """
+        return bytes(self.cells)
+
+    # *************************************************
+    def symbolKey(self):
+        """
+        A snapshot of the board that does not depend on how its colors
+        were numbered
+
+        fromBottles numbers colors by first appearance, so the same
+        bottles can get different codes once a move changes which symbol
+        comes first. Here colors are renumbered in the order of their
+        symbols, which is the same for every board of a game.
+
+        Returns
+        -------
+        bytes
+            Like key, with the bottles in the same order.
+
+        """
+        order = sorted(range(len(self.symbols)), key=self.symbols.__getitem__)
+        if isinstance(self.cells, bytearray):
+            table = bytearray(range(256))
+            for code, index in enumerate(order, start=1):
+                table[index + 1] = code
+            return bytes(self.cells).translate(table)
+        table = [EMPTY] * (len(order) + 1)
+        for code, index in enumerate(order, start=1):
+            table[index + 1] = code
+        return array('H', [table[code] for code in self.cells]).tobytes()
+
+    # *************************************************
+    def sortedKey(self):
+        """
+        A snapshot of the board that ignores the order of the bottles
+
+        Moves never rename colors, so within a search this is enough to
+        recognize the boards reached again with bottles swapped (mostly
+        which of the empty bottles was filled first), and it is much
+        cheaper than canonicalKey.
+
+        Returns
+        -------
+        bytes
+            nrBotts sorted rows of botSize cells.
+
+        """
+        cells = bytes(self.cells)
+        width = len(cells) // self.nrBotts
+        return b"".join(sorted(cells[i : i + width] for i in range(0, len(cells), width)))
+
+    # *************************************************
+    def canonicalKey(self):
+        """
+        A snapshot of the board that ignores bottle order and color names
+
+        Two boards get the same key exactly when they are the same puzzle
+        with the bottles in another order and the colors renamed (see
+        canonicalForm).
+
+        Returns
+        -------
+        bytes
+            nrBotts rows of botSize cells.
+
+        """
+        return self.canonicalForm()[0]
+
+    # *************************************************
+    def canonicalForm(self):
+        """
+        The canonicalKey and where each of its rows comes from
+
+        Colors are first ranked by what their cells look like (position,
+        bottle height and the ranks of the neighbors), refined until the
+        ranks settle. Bottles that share colors are then taken a group at
+        a time: the colors of a group are numbered rank by rank, those of
+        the same rank so that the sorted rows of the group are the
+        smallest (searching the bottle orders a row at a time), and the
+        groups are put in the order of their rows.
+
+        Returns
+        -------
+        key : bytes
+            As returned by canonicalKey.
+        order : list of ints
+            order[row] is the bottle of this board that row of the key
+            stands for. Boards with the same key are the same game with
+            bottle order[row] of one in place of bottle order[row] of
+            the other, so moves translate through order.
+
+        """
+        botSize = self.botSize
+        cells = self.cells
+        rows = [tuple(cells[i : i + botSize]) for i in range(0, len(cells), botSize)]
+        rank = {code: 0 for row in rows for code in row if code != EMPTY}
+        rank[EMPTY] = -1
+        nrRanks = 1
+        while True:
+            described = {code: [] for code in rank if code != EMPTY}
+            for row in rows:
+                height = botSize - row.count(EMPTY)
+                for position in range(height):
+                    below = rank[row[position - 1]] if position else -1
+                    above = rank[row[position + 1]] if position + 1 < height else -1
+                    described[row[position]].append((position, height, below, above))
+            descriptions = {code: (rank[code], tuple(sorted(cellsOf)))
+                            for code, cellsOf in described.items()}
+            ranks = sorted(set(descriptions.values()))
+            if len(ranks) == nrRanks:
+                break
+            nrRanks = len(ranks)
+            ranks = {description: r for r, description in enumerate(ranks)}
+            rank = {code: ranks[description] for code, description in descriptions.items()}
+            rank[EMPTY] = -1
+            if nrRanks == len(described):
+                # Every color has a rank of its own
+                break
+
+        # Bottles that share a color belong to the same group
+        group = list(range(self.nrBotts))
+
+        def find(bottle):
+            while group[bottle] != bottle:
+                group[bottle] = group[group[bottle]]
+                bottle = group[bottle]
+            return bottle
+
+        firstBottle = {}
+        for bottle, row in enumerate(rows):
+            root = bottle
+            for code in set(row) - {EMPTY}:
+                other = firstBottle.setdefault(code, root)
+                if other != root:
+                    other = find(other)
+                    if other != root:
+                        group[root] = other
+                        root = other
+        members = {}
+        for bottle in range(self.nrBotts):
+            members.setdefault(find(bottle), []).append(bottle)
+
+        groups = sorted((self._canonicalGroup(rows, bottles, rank)
+                         for bottles in members.values()), key=lambda g: g[0])
+        key = newCells(len(firstBottle))
+        order = []
+        offset = 0
+        for groupRows, bottles, nrColors in groups:
+            for row in groupRows:
+                if offset:
+                    row = [code + offset if code != EMPTY else EMPTY for code in row]
+                key.extend(row)
+            order.extend(bottles)
+            offset += nrColors
+        return bytes(key), order
+
+    # *************************************************
+    @staticmethod
+    def _canonicalGroup(rows, bottles, rank):
+        # The smallest sorted rows of a group of bottles, its colors numbered
+        # rank by rank, and the bottles in the order of those rows
+        colors = sorted({code for bottle in bottles for code in rows[bottle]
+                         if code != EMPTY}, key=rank.get)
+        table = {EMPTY: EMPTY}
+        nextCode = {}
+        sizes = {}
+        for newCode, code in enumerate(colors, start=1):
+            nextCode.setdefault(rank[code], newCode)
+            sizes[rank[code]] = sizes.get(rank[code], 0) + 1
+        # A color alone in its rank needs no search
+        for code in colors:
+            if sizes[rank[code]] == 1:
+                table[code] = nextCode[rank[code]]
+        tied = {code for code in colors if sizes[rank[code]] > 1}
+        best = []
+
+        def search(table, nextCode, remaining):
+            while remaining:
+                # The next row of each bottle, its new colors taking the next codes
+                candidates = []
+                for bottle in remaining:
+                    codes = nextCode
+                    fresh = {}
+                    row = []
+                    for code in rows[bottle]:
+                        newCode = table.get(code)
+                        if newCode is None:
+                            newCode = fresh.get(code)
+                            if newCode is None:
+                                if codes is nextCode:
+                                    codes = dict(nextCode)
+                                newCode = fresh[code] = codes[rank[code]]
+                                codes[rank[code]] += 1
+                        row.append(newCode)
+                    candidates.append((row, bottle, fresh, codes))
+                smallest = min(candidate[0] for candidate in candidates)
+                tries = [candidate for candidate in candidates if candidate[0] == smallest]
+                if len(tries) > 1:
+                    # Bottles whose new colors appear nowhere else are
+                    # interchangeable: only one of them is tried
+                    elsewhere = {}
+                    for bottle in remaining:
+                        for code in set(rows[bottle]):
+                            elsewhere[code] = elsewhere.get(code, 0) + 1
+                    alone = [candidate[1] for candidate in tries
+                             if all(elsewhere[code] == 1 for code in candidate[2])]
+                    tries = [candidate for candidate in tries
+                             if candidate[1] not in alone[1:]]
+                for _, bottle, fresh, codes in tries[1:]:
+                    search({**table, **fresh}, codes, [b for b in remaining if b != bottle])
+                _, bottle, fresh, nextCode = tries[0]
+                table = {**table, **fresh}
+                remaining = [b for b in remaining if b != bottle]
+            found = sorted((tuple(table[code] for code in rows[bottle]), bottle)
+                           for bottle in bottles)
+            foundRows = [row for row, _ in found]
+            # Only the rows count: which bottle is which does not
+            if not best or foundRows < best[0]:
+                best[:] = [foundRows, [bottle for _, bottle in found]]
+
+        search(table, nextCode, [bottle for bottle in bottles if not tied.isdisjoint(rows[bottle])])
+        return best[0], best[1], len(colors)
+
+    # *************************************************
+    def canonicalHash(self):
+        """
+        A stable hash of canonicalKey (the same in every run and on every
+        system, unlike hash())
+
+        Returns
+        -------
+        string
+            16 hexadecimal digits.
+
+        """
+        return hashlib.blake2b(self.canonicalKey(), digest_size=8).hexdigest()
+
+    # *************************************************
+    def index(self, label):
+        """
+        The index of the bottle identified by label
+
+        Parameters
+        ----------
+        label : string
+            A key of the dictionary the board was built from.
+
+        Returns
+        -------
+        int
+
+        """
+        return self.labels.index(label)
+
+    # *************************************************
+    def topSymbolAndPosition(self, bottle):
+        """
+        The color code and position of the top of the bottle
+
+        Parameters
+        ----------
+        bottle : int
+            The index of the bottle.
+
+        Returns
+        -------
+        code : int
+            The color at the top. EMPTY if the bottle is empty.
+        position : int
+            The index of the top position. -1 if the bottle is empty.
+
+        """
+        position = self.heights[bottle] - 1
+        if position < 0:
+            return EMPTY, -1
+        return self.cells[bottle * self.botSize + position], position
+
+    # *************************************************
+    def topRun(self, bottle):
+        """
+        How many cells at the top of the bottle hold the top color?
+
+        Parameters
+        ----------
+        bottle : int
+            The index of the bottle.
+
+        Returns
+        -------
+        int
+            0 if the bottle is empty.
+
+        """
+        base = bottle * self.botSize
+        i = base + self.heights[bottle] - 1
+        if i < base:
+            return 0
+        cells = self.cells
+        top = cells[i]
+        run = 0
+        while i >= base and cells[i] == top:
+            i -= 1
+            run += 1
+        return run
+
+    # *************************************************
+    def full(self, bottle):
+        """
+        Is the bottle all full with a same color?
+
+        Parameters
+        ----------
+        bottle : int
+            The index of the bottle.
+
+        Returns
+        -------
+        bool
+
+        """
+        return self.heights[bottle] == self.botSize and \
+               self.topRun(bottle) == self.botSize
+
+    # *************************************************
+    def moveIsPossible(self, source, destin):
+        """
+        Is it possible to transfer any "liquid" from source to destin?
+
+        Parameters
+        ----------
+        source : int
+            The index of the source bottle.
+        destin : int
+            The index of the destination bottle.
+
+        Returns
+        -------
+        bool
+            Same rule as functions.moveIsPossible.
+
+        """
+        heights = self.heights
+        sourceHeight = heights[source]
+        destHeight = heights[destin]
+        if sourceHeight == 0 or source == destin:
+            return False
+        if destHeight == 0:
+            return True
+        botSize = self.botSize
+        cells = self.cells
+        return destHeight < botSize and \
+               cells[source * botSize + sourceHeight - 1] == \
+               cells[destin * botSize + destHeight - 1]
+
+    # *************************************************
+    def doMove(self, source, destin):
+        """
+        Transfers as much "liquid" as possible from source to destin
+
+        Parameters
+        ----------
+        source : int
+            The index of the source bottle.
+        destin : int
+            The index of the destination bottle.
+
+        Returns
+        -------
+        int
+            The quantity of "liquid" that was transferred (0 if source is
+            destin, which changes nothing).
+
+        Requires:
+        --------
+            moveIsPossible(source, destin)
+        """
+        if source == destin:
+            return 0
+        botSize = self.botSize
+        heights = self.heights
+        cells = self.cells
+        transfer = min(self.topRun(source), botSize - heights[destin])
+        sourceTop = source * botSize + heights[source]
+        destTop = destin * botSize + heights[destin]
+        cells[destTop : destTop + transfer] = cells[sourceTop - 1 : sourceTop] * transfer
+        cells[sourceTop - transfer : sourceTop] = self.blank[:transfer]
+        heights[source] -= transfer
+        heights[destin] += transfer
+        return transfer
+
+    # *************************************************
+    def undoMove(self, source, destin, transfer):
+        """
+        Reverts a move previously made with doMove
+
+        Parameters
+        ----------
+        source : int
+            The index of the bottle that was the source of the move.
+        destin : int
+            The index of the bottle that was the destination of the move.
+        transfer : int
+            The quantity returned by doMove.
+
+        Returns
+        -------
+        None.
+
+        """
+        botSize = self.botSize
+        heights = self.heights
+        cells = self.cells
+        sourceTop = source * botSize + heights[source]
+        destTop = destin * botSize + heights[destin]
+        cells[sourceTop : sourceTop + transfer] = cells[destTop - 1 : destTop] * transfer
+        cells[destTop - transfer : destTop] = self.blank[:transfer]
+        heights[source] += transfer
+        heights[destin] -= transfer
+
+    # *************************************************
+    def runs(self, bottle):
+        """
+        The number of runs (groups of equal consecutive colors) in the bottle
+
+        Parameters
+        ----------
+        bottle : int
+            The index of the bottle.
+
+        Returns
+        -------
+        int
+
+        """
+        base = bottle * self.botSize
+        runs = 0
+        previous = EMPTY
+        for code in self.cells[base : base + self.heights[bottle]]:
+            if code != previous:
+                runs += 1
+                previous = code
+        return runs
@@ -0,0 +1,114 @@
+"""
+Writes puzzle packs of generated games (see pack.py).
+
+Example:
+    python buildpack.py levels.pack --boards 200000 --bottles 10 --capacity 8 --expert 2
+"""
+import argparse
+import sys
+import time
+from array import array
+
+from generator import buildGameBatch
+from pack import HEADER, OFFSET, PACK_MAGIC, encodeLevel
+from verify import chunkRandom
+
+# *****************************************************
+def buildPack(fileName, nrBoards, nrBotts, botSize, expert, seed=0, chunkSize=4096,
+              unique=False, onChunk=None):
+    """
+    Writes a puzzle pack of generated games
+
+    The games are built chunkSize at a time by generator.buildGameBatch
+    and written as they are built; only the offset table is kept in
+    memory, and written in its place at the end.
+
+    Parameters
+    ----------
+    fileName : string
+        The pack to write (replaced if it exists).
+    nrBoards : int
+        The number of levels.
+    nrBotts, botSize, expert : int
+        The shape of the games, as in functions.buildGameBottles.
+    seed : int, optional
+        The same seed always builds the same pack. The default is 0.
+    chunkSize : int, optional
+        Games built at a time. The default is 4096.
+    unique : bool, optional
+        Whether to leave out the games that are the same puzzle as an
+        earlier level (see Board.canonicalHash). The default is False.
+    onChunk : function, optional
+        Called with the number of levels written so far after each chunk.
+
+    Returns
+    -------
+    None.
+
+    Requires:
+    --------
+        with unique, nrBoards is not more than the number of different
+        puzzles of that shape
+
+    """
+    offsets = array('Q')
+    seen = set()
+    letters = range(nrBotts)
+    symbols = range(1, nrBotts - expert + 1)
+    with open(fileName, 'wb') as file:
+        file.write(HEADER.pack(PACK_MAGIC, nrBoards))
+        file.write(bytes((nrBoards + 1) * OFFSET.size))
+        position = file.tell()
+        chunk = 0
+        while len(offsets) < nrBoards:
+            batch = buildGameBatch(min(chunkSize, nrBoards - len(offsets)), nrBotts,
+                                   botSize, expert, chunkRandom(seed, chunk))
+            chunk += 1
+            levels = []
+            for row in range(len(batch)):
+                board = batch.board(row, letters, symbols)
+                if unique:
+                    key = board.canonicalHash()
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                level = encodeLevel(board, expert)
+                offsets.append(position)
+                position += len(level)
+                levels.append(level)
+            file.write(b"".join(levels))
+            if onChunk is not None:
+                onChunk(len(offsets))
+        offsets.append(position)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        file.seek(HEADER.size)
+        file.write(offsets.tobytes())
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Write a puzzle pack of generated games.")
+    parser.add_argument("fileName")
+    parser.add_argument("--boards", type=int, default=100000)
+    parser.add_argument("--bottles", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--expert", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--unique", action="store_true",
+                        help="leave out games that are the same puzzle as an earlier one")
+    args = parser.parse_args()
+
+    def progress(written):
+        print(f"{written} levels written", end="\r", flush=True)
+
+    start = time.perf_counter()
+    buildPack(args.fileName, args.boards, args.bottles, args.capacity, args.expert,
+              args.seed, args.chunk, args.unique, progress)
+    seconds = time.perf_counter() - start
+    print()
+    print(f"{args.boards} levels written to {args.fileName} in {seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+from board import Board
+from solver import isSolved, solveBoard
+
+WON = "won"
+ALIVE = "alive"
+DEAD = "dead"
+UNKNOWN = "unknown"
+
+# *****************************************************
+def hasAnyMove(board):
+    """
+    Is any move possible at all?
+
+    With an empty bottle and a non-empty one there always is; otherwise
+    two bottles with free space or a full bottle next to another with the
+    same top color are needed, which is checked by color.
+
+    Parameters
+    ----------
+    board : Board
+
+    Returns
+    -------
+    bool
+
+    """
+    heights = board.heights
+    botSize = board.botSize
+    tops = set()
+    withSpace = set()
+    nonEmpty = 0
+    empty = False
+    for bottle in range(board.nrBotts):
+        height = heights[bottle]
+        if height == 0:
+            empty = True
+            continue
+        nonEmpty += 1
+        code = board.cells[bottle * botSize + height - 1]
+        if height < botSize:
+            if code in tops or code in withSpace:
+                return True
+            withSpace.add(code)
+        elif code in withSpace:
+            return True
+        tops.add(code)
+    return empty and nonEmpty > 0
+
+# *****************************************************
+def isReversible(board, source, destin, transfer):
+    """
+    Can the move just made be taken back with the opposite move?
+
+    Parameters
+    ----------
+    board : Board
+        The bottles after the move. It is left unchanged.
+    source, destin : int
+        The bottles of the move.
+    transfer : int
+        The quantity that was transferred.
+
+    Returns
+    -------
+    bool
+        True if pouring destin into source transfers exactly transfer
+        (and so gives back the board before the move).
+
+    """
+    if not board.moveIsPossible(destin, source):
+        return False
+    back = board.doMove(destin, source)
+    board.undoMove(destin, source, back)
+    return back == transfer
+
+# *****************************************************
+class DeadEndDetector:
+    """
+    Tells, after each move, whether the game can still be won.
+
+    It keeps a known way to win (a list of moves) when it has one. After
+    each move, the cheap checks come first: no possible move at all means
+    a dead end; a move that follows the known way to win keeps the game
+    winnable, and a move that can be taken back exactly by the opposite
+    move keeps whatever status the game had. Only otherwise a search is
+    made, bounded by nodes and time, which can find a new way to win,
+    prove that there is none, or give up (UNKNOWN). After a search gives
+    up, the next ones are skipped for a number of moves that doubles each
+    time, so a game too big to search does not cost a search per move.
+    """
+
+    __slots__ = ("maxNodes", "maxSeconds", "status", "plan", "searches", "wait", "backoff")
+
+    def __init__(self, maxNodes=20000, maxSeconds=0.05):
+        self.maxNodes = maxNodes
+        self.maxSeconds = maxSeconds
+        self.status = UNKNOWN
+        self.plan = None
+        self.searches = 0
+        # Moves left before searching again, and the next wait
+        self.wait = 0
+        self.backoff = 1
+
+    # *************************************************
+    def reset(self):
+        """
+        Forgets what is known (e.g. after moves were undone)
+        """
+        self.status = UNKNOWN
+        self.plan = None
+        self.wait = 0
+        self.backoff = 1
+
+    # *************************************************
+    def _search(self, board, nrColors):
+        self.searches += 1
+        solution, stats = solveBoard(board, nrColors, self.maxNodes, self.maxSeconds)
+        if solution is not None:
+            self.plan = solution
+            self.backoff = 1
+            return ALIVE
+        self.plan = None
+        if stats["exhausted"]:
+            self.wait = self.backoff
+            self.backoff *= 2
+            return UNKNOWN
+        self.backoff = 1
+        return DEAD
+
+    # *************************************************
+    def checkBoard(self, board, nrColors, move=None, transfer=0):
+        """
+        The status of a Board, after a move or from scratch
+
+        Parameters
+        ----------
+        board : Board
+            The bottles (after the move). It is left unchanged.
+        nrColors : int
+            The number of different symbols in the game.
+        move : tuple (source, destin) of bottle indexes, optional
+            The move just made. The default is None (nothing is assumed
+            about the board).
+        transfer : int, optional
+            The quantity the move transferred.
+
+        Returns
+        -------
+        string
+            WON, ALIVE, DEAD or UNKNOWN.
+
+        """
+        previous = self.status
+        plan = self.plan
+        if isSolved(board, nrColors):
+            status = WON
+            self.plan = []
+        elif not hasAnyMove(board):
+            status = DEAD
+            self.plan = None
+        elif move is None:
+            self.wait = 0
+            status = self._search(board, nrColors)
+        elif plan and plan[0] == move:
+            status = ALIVE
+            self.plan = plan[1:]
+        elif isReversible(board, move[0], move[1], transfer):
+            # The game can go back to where it was, so its status holds
+            status = previous
+            if plan is not None:
+                self.plan = [(move[1], move[0])] + plan
+        elif self.wait > 0:
+            self.wait -= 1
+            status = UNKNOWN
+            self.plan = None
+        else:
+            status = self._search(board, nrColors)
+        self.status = status
+        return status
+
+    # *************************************************
+    def check(self, bottles, botSize, expert, move=None, transfer=0):
+        """
+        The status of a dictionary of bottles (see checkBoard)
+
+        Parameters
+        ----------
+        bottles : dictionary
+            Keys are strings and values are lists.
+        botSize : int
+            The capacity of bottles.
+        expert : int
+            The user's expert level.
+        move : tuple (source, destin) of keys of bottles, optional
+            The move just made.
+        transfer : int, optional
+            The quantity the move transferred.
+
+        Returns
+        -------
+        string
+            WON, ALIVE, DEAD or UNKNOWN.
+
+        """
+        board = Board.fromBottles(bottles, botSize)
+        if move is not None:
+            move = (board.index(move[0]), board.index(move[1]))
+        return self.checkBoard(board, len(bottles) - expert, move, transfer)
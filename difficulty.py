@@ -0,0 +1,239 @@
+import math
+import random
+from collections import deque
+
+from deadend import hasAnyMove
+from generator import buildGameBatch
+from solver import isSolved, solveBoard, usefulMoves
+
+# Scores already computed:
+# (botSize, nrColors, maxNodes, maxStates, maxSolutions, canonical key) -> score
+_scores = {}
+
+# *****************************************************
+def explore(board, nrColors, maxStates):
+    """
+    Visits the boards reachable from board, breadth first
+
+    Boards that only differ in the order of their bottles are visited once.
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles. It is left unchanged.
+    nrColors : int
+        The number of different symbols in the game.
+    maxStates : int
+        Stops after visiting this many boards.
+
+    Returns
+    -------
+    states : int
+        The number of boards visited.
+    branching : float
+        The mean number of useful moves of the boards visited.
+    deadEnds : int
+        The boards visited, not won, where no move is possible.
+
+    """
+    seen = {board.sortedKey()}
+    queue = deque([board.copy()])
+    states = moves = deadEnds = 0
+    while queue and states < maxStates:
+        current = queue.popleft()
+        states += 1
+        if isSolved(current, nrColors):
+            continue
+        options = usefulMoves(current)
+        moves += len(options)
+        if not hasAnyMove(current):
+            deadEnds += 1
+        for source, destin in options:
+            transfer = current.doMove(source, destin)
+            key = current.sortedKey()
+            if key not in seen:
+                seen.add(key)
+                queue.append(current.copy())
+            current.undoMove(source, destin, transfer)
+    return states, moves / states if states else 0.0, deadEnds
+
+# *****************************************************
+def countSolutions(board, nrColors, length, maxSolutions, maxNodes):
+    """
+    How many different sequences of length moves win the game?
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles. It is left unchanged.
+    nrColors : int
+        The number of different symbols in the game.
+    length : int
+        The length of an optimal solution.
+    maxSolutions, maxNodes : int
+        The count stops at maxSolutions, or after visiting maxNodes boards.
+
+    Returns
+    -------
+    int
+
+    """
+    runs = board.runs
+    count = [0, 0]   # solutions, nodes
+
+    def search(depth, h):
+        if count[0] >= maxSolutions or count[1] >= maxNodes:
+            return
+        count[1] += 1
+        if depth + h > length:
+            return
+        if depth == length:
+            if isSolved(board, nrColors):
+                count[0] += 1
+            return
+        for source, destin in usefulMoves(board):
+            before = runs(source) + runs(destin)
+            transfer = board.doMove(source, destin)
+            search(depth + 1, h - before + runs(source) + runs(destin))
+            board.undoMove(source, destin, transfer)
+
+    search(0, sum(runs(bottle) for bottle in range(board.nrBotts)) - nrColors)
+    return count[0]
+
+# *****************************************************
+def scoreBoard(board, nrColors, maxNodes=20000, maxStates=2000, maxSolutions=1000,
+               solved=None):
+    """
+    How hard is it to win the game?
+
+    Scores are cached by canonical form and budgets, so the same game is
+    only scored once, even with its bottles in another order or its colors
+    renamed. Games whose solvability is unknown are not cached: a larger
+    budget may still settle it.
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles. It is left unchanged.
+    nrColors : int
+        The number of different symbols in the game.
+    maxNodes : int, optional
+        Node budget of the solver and of the solution count.
+    maxStates : int, optional
+        Boards visited to measure branching and dead ends.
+    maxSolutions : int, optional
+        Solutions are counted up to this number.
+    solved : tuple, optional
+        What solveBoard(board, nrColors, maxNodes) returned, if it was
+        already called. The default is None (it is called here).
+
+    Returns
+    -------
+    dictionary
+        "optimalMoves" (None if unknown or not winnable), "solvable"
+        (True, False or None if the budget ran out), "branching",
+        "deadEnds" (as a fraction of the boards visited), "solutions"
+        and "difficulty", which grows with the length of the solution,
+        the branching and the dead ends, and falls with the number of
+        optimal solutions. Unwinnable games get infinite difficulty.
+
+    """
+    key = (board.botSize, nrColors, maxNodes, maxStates, maxSolutions,
+           board.canonicalKey())
+    score = _scores.get(key)
+    if score is not None:
+        return score
+
+    solution, stats = solveBoard(board, nrColors, maxNodes) if solved is None else solved
+    states, branching, deadEnds = explore(board, nrColors, maxStates)
+    if solution is not None:
+        solvable = True
+        optimal = len(solution)
+        # The solver found one even if the count ran out of budget
+        solutions = max(1, countSolutions(board, nrColors, optimal, maxSolutions, maxNodes))
+        difficulty = optimal * math.log2(1 + branching) * (1 + deadEnds / states) \
+                     / math.log2(1 + solutions)
+    else:
+        solvable = None if stats["exhausted"] else False
+        optimal = None
+        solutions = 0
+        difficulty = math.inf
+    score = {"optimalMoves": optimal,
+             "solvable": solvable,
+             "branching": branching,
+             "deadEnds": deadEnds / states if states else 0.0,
+             "solutions": solutions,
+             "difficulty": difficulty}
+    if solvable is not None:
+        _scores[key] = score
+    return score
+
+# *****************************************************
+def scoreBatch(batch, **budgets):
+    """
+    Scores every game of a BoardBatch
+
+    Parameters
+    ----------
+    batch : BoardBatch
+        As returned by generator.buildGameBatch.
+    **budgets
+        maxNodes, maxStates, maxSolutions (see scoreBoard).
+
+    Returns
+    -------
+    list of dictionaries
+        One score per row of the batch.
+
+    """
+    nrColors = batch.nrBotts - batch.expert
+    symbols = [chr(code) for code in range(1, nrColors + 1)]
+    letters = [str(bottle) for bottle in range(batch.nrBotts)]
+    return [scoreBoard(batch.board(row, letters, symbols), nrColors, **budgets)
+            for row in range(len(batch))]
+
+# *****************************************************
+def buildGameWithDifficulty(nrBotts, botSize, expert, low, high, rng=None,
+                            batchSize=32, maxBatches=100, **budgets):
+    """
+    A random game whose difficulty is between low and high
+
+    Games are built and scored a batch at a time until one falls in the
+    band.
+
+    Parameters
+    ----------
+    nrBotts, botSize, expert : int
+        As in functions.buildGameBottles.
+    low, high : float
+        The band of difficulty wanted (see scoreBoard).
+    rng : random.Random, optional
+        The source of randomness. The default is None (a new one).
+    batchSize : int, optional
+        Games built at a time. The default is 32.
+    maxBatches : int, optional
+        Gives up after this many batches. The default is 100.
+    **budgets
+        maxNodes, maxStates, maxSolutions (see scoreBoard).
+
+    Returns
+    -------
+    batch : BoardBatch or None
+        The batch where the game was found (None if none was found).
+    row : int
+        The row of the game in batch.
+    score : dictionary
+        Its score.
+
+    """
+    rng = rng or random.Random()
+    nrColors = nrBotts - expert
+    symbols = [chr(code) for code in range(1, nrColors + 1)]
+    letters = [str(bottle) for bottle in range(nrBotts)]
+    for _ in range(maxBatches):
+        batch = buildGameBatch(batchSize, nrBotts, botSize, expert, rng)
+        for row in range(batchSize):
+            score = scoreBoard(batch.board(row, letters, symbols), nrColors, **budgets)
+            if low <= score["difficulty"] <= high:
+                return batch, row, score
+    return None, -1, None
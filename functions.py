@@ -1,7 +1,15 @@
+import shutil
+import sys
 import time
 from random import randint, shuffle
 from time import sleep
-from os import path, listdir
+from os import path
+
+from gameconfig import (BOT_SIZE_RANGE, CFG_FILE, DEFAULT_CONFIG, NR_BOTTS_RANGE,
+                        loadConfig, saveConfig)
+from pack import PuzzlePack
+from puzzleid import newPuzzleId, parsePuzzleId, puzzleRandom
+from saves import formatSave, loadSave, readSaveIndex, recordSave
 
 # *****************************************************
 def topSymbolAndPosition(contents):
@@ -27,6 +35,95 @@ def topSymbolAndPosition(contents):
     return symbol, position
 
 # *****************************************************
+def cellWidth(bottles):
+    """
+    How many characters the widest bottle label or symbol takes
+
+    Parameters
+    ----------
+    bottles : dictionary
+        Keys are strings and values are lists.
+
+    Returns
+    -------
+    int
+        1 with single character letters and symbols.
+
+    """
+    width = max(map(len, bottles), default=1)
+    for content in bottles.values():
+        for char in set(content):
+            width = max(width, len(char))
+    return width
+# *****************************************************
+def bottlesPerBand(width, columns=None):
+    """
+    How many bottles fit side by side on the screen
+
+    Parameters
+    ----------
+    width : int
+        As returned by cellWidth.
+    columns : int, optional
+        The width of the screen. The default is None (the width of the
+        terminal, or 80).
+
+    Returns
+    -------
+    int
+
+    """
+    if columns is None:
+        columns = shutil.get_terminal_size().columns
+    return max(1, (columns - 3) // (width + 6))
+# *****************************************************
+def formatBottles(bottles,botSize,nrErrors,columns=None,width=None):
+    """
+    The text showBottles prints, as a single string
+
+    Bottles that do not fit side by side on the screen go on to further
+    bands below, separated by an empty line.
+
+    Parameters
+    ----------
+    bottles : dictionary
+        Keys are strings and values are lists.
+    botSize : int
+        The capacity of bottles.
+    nrErrors : int
+        The number of errors the user already made.
+    columns : int, optional
+        The width of the screen (see bottlesPerBand).
+    width : int, optional
+        The width of each cell. The default is None (see cellWidth).
+
+    Returns
+    -------
+    string
+        For each band, the header with the letters and botSize lines of
+        bottle contents (top position first); then the number of errors.
+        Each line ends with a new line.
+
+    """
+    if width is None:
+        width = cellWidth(bottles)
+    perBand = bottlesPerBand(width, columns)
+    empty = "  |" + " " * width + "|  "
+    letters = list(bottles.keys())
+    contents = list(bottles.values())
+    lines = []
+    for first in range(0, len(letters), perBand):
+        if first:
+            lines.append("")
+        lines.append(" " * 3 + "".join(letter.rjust(width) + " " * 6
+                                       for letter in letters[first : first + perBand]))
+        band = contents[first : first + perBand]
+        for line in range(botSize - 1, -1, -1):
+            lines.append("".join("  |" + content[line].rjust(width) + "|  "
+                                 if line < len(content) else empty for content in band))
+    lines.append("NUMBER OF ERRORS: " + str(nrErrors))
+    return "\n".join(lines) + "\n"
+# *****************************************************
 def showBottles(bottles,botSize,nrErrors):
     """
     Prints in the standard output a representation of the
@@ -46,23 +143,8 @@ def showBottles(bottles,botSize,nrErrors):
     None.
 
     """
-    print(" " * 3, end = "")
-    for letter in bottles.keys():
-        print(letter, end = " " * 6) 
-    print()
-    
-    line = botSize - 1
-    while line >= 0:
-       for content in bottles.values():
-           print(" " * 2, end = "")
-           if line < len(content):
-               print("|" + content[line] + "|", end = "")
-           else:
-               print("| |", end = "")               
-           print(" " * 2, end = "")
-       line -= 1
-       print()
-    print("NUMBER OF ERRORS:", nrErrors)
+    # The whole frame is written at once instead of one print per cell
+    sys.stdout.write(formatBottles(bottles, botSize, nrErrors))
 # *****************************************************
 def allBottlesFull(nrBotts, nrBottFull, expert):
     """
@@ -154,6 +236,31 @@ def doMove(botSize, source, destin, bottles):
     
     return transfer
 # *****************************************************
+def undoMove(source, destin, transfer, bottles):
+    """
+    Reverts a move previously made with doMove
+
+    Parameters
+    ----------
+    source : string
+        The letter of the bottle that was the source of the move.
+    destin : string
+        The letter of the bottle that was the destination of the move.
+    transfer : int
+        The quantity returned by doMove.
+    bottles : dictionary
+        Keys are strings and values are lists.
+
+    Returns
+    -------
+    None.
+
+    """
+    sourceContent = bottles[source]
+    destContent = bottles[destin]
+    for _ in range(transfer):
+        sourceContent.append(destContent.pop())
+# *****************************************************
 def moveIsPossible(botSize, source, destin, bottles):
     """
     Is it possible to transfer any "liquid" from source to destin?
@@ -172,9 +279,9 @@ def moveIsPossible(botSize, source, destin, bottles):
     Returns
     -------
     bool
-        True if the source is not empty, and, either the destination is empty
-        or it has some empty position(s) and the top symbols of both bottles
-        are the same.
+        True if the source is not empty and is not the destination, and,
+        either the destination is empty or it has some empty position(s)
+        and the top symbols of both bottles are the same.
 
     Requires: 
     --------
@@ -184,11 +291,11 @@ def moveIsPossible(botSize, source, destin, bottles):
     sourceSymb, sourceTop = topSymbolAndPosition(bottles[source])
     destSymb, destTop = topSymbolAndPosition(bottles[destin])    
  
-    return sourceTop != -1 and \
+    return sourceTop != -1 and source != destin and \
            (destTop == -1 or
            (destTop < botSize - 1 and sourceSymb == destSymb)) 
 # ***************************************************************
-def buildGameBottles(nrBotts, botSize, expert, letters, symbols):
+def buildGameBottles(nrBotts, botSize, expert, letters, symbols, rng=None):
     """
     Builds a dictionary of bottles, filled in a random way.
 
@@ -204,6 +311,9 @@ def buildGameBottles(nrBotts, botSize, expert, letters, symbols):
         The letters that identify bottles.
     symbols : string
         The symbols that compose the liquid in bottles.
+    rng : random.Random, optional
+        The source of randomness; the same rng state always builds the
+        same game. The default is None (the random module).
 
     Returns
     -------
@@ -222,24 +332,91 @@ def buildGameBottles(nrBotts, botSize, expert, letters, symbols):
     """   
     result = {}
     howManyFullBott = nrBotts - expert
-    allSymbols = randomSymbols(botSize,howManyFullBott,symbols)
-    letter = 0
+    allSymbols = randomSymbols(botSize,howManyFullBott,symbols,rng)
     indexFrom = 0
     # In this way we obtain a more balanced symbol distribution
-    indexTo = randint(botSize - expert,botSize)
-    for nr in range(nrBotts - 1):
-        symbolsToPut = allSymbols[indexFrom : indexTo]
-        result[letters[letter]] = symbolsToPut
-        letter += 1
+    sizes = bottleSizes(nrBotts, botSize, expert, len(allSymbols),
+                        randint if rng is None else rng.randint)
+    for letter in range(nrBotts):
+        indexTo = indexFrom + sizes[letter]
+        result[letters[letter]] = allSymbols[indexFrom : indexTo]
         indexFrom = indexTo
-        newValueTo = indexTo + randint(botSize - expert,botSize)
-        indexTo = min(len(allSymbols), newValueTo)
-    symbolsToPut = allSymbols[indexFrom : indexTo]
-    result[letters[letter]] = symbolsToPut
         
     return result
 # *****************************************************
-def randomSymbols(botSize, howMany, symbols):
+def buildGameFromId(puzzleId, letters, symbols):
+    """
+    Builds the game of a puzzle ID (see puzzleid.formatPuzzleId)
+
+    The same puzzle ID, letters and symbols always give the same
+    dictionary of bottles.
+
+    Parameters
+    ----------
+    puzzleId : string
+        Holds the number of bottles, their capacity, the expertise and
+        the seed of the game.
+    letters : string
+        The letters that identify bottles.
+    symbols : string
+        The symbols that compose the liquid in bottles.
+
+    Returns
+    -------
+    dictionary
+        As returned by buildGameBottles.
+
+    """
+    nrBotts, botSize, expert, _ = parsePuzzleId(puzzleId)
+    return buildGameBottles(nrBotts, botSize, expert, letters, symbols,
+                            puzzleRandom(puzzleId))
+# *****************************************************
+def bottleSizes(nrBotts, botSize, expert, total, rand=randint):
+    """
+    How many symbols to put in each bottle of a new game
+
+    Each bottle gets between max(0, botSize - expert) and botSize symbols,
+    taking bottles in order until the symbols run out; if some symbols
+    are still left, they go one by one to random bottles with free space.
+
+    Parameters
+    ----------
+    nrBotts : int
+        The number of bottles in the game.
+    botSize : int
+        The capacity of bottles.
+    expert : int
+        The level of the user's expertise.
+    total : int
+        The number of symbols to distribute.
+    rand : function, optional
+        Called as rand(a, b) to draw an int between a and b (inclusive).
+        The default is random.randint.
+
+    Returns
+    -------
+    list of int
+        nrBotts sizes, each <= botSize, adding up to total.
+
+    Requires: 
+    --------
+        total <= nrBotts * botSize
+
+    """
+    sizes = []
+    left = total
+    for _ in range(nrBotts):
+        size = min(left, rand(max(0, botSize - expert), botSize))
+        sizes.append(size)
+        left -= size
+    while left > 0:
+        bottle = rand(0, nrBotts - 1)
+        if sizes[bottle] < botSize:
+            sizes[bottle] += 1
+            left -= 1
+    return sizes
+# *****************************************************
+def randomSymbols(botSize, howMany, symbols, rng=None):
     """
     Builds and returns a list with (botSize * howMany) characters of symbols
 
@@ -251,6 +428,8 @@ def randomSymbols(botSize, howMany, symbols):
         The number of different symbols to be used.
     symbols : string
         The symbols that can be used.
+    rng : random.Random, optional
+        The source of randomness. The default is None (the random module).
 
     Returns
     -------
@@ -264,7 +443,7 @@ def randomSymbols(botSize, howMany, symbols):
     # botSize chars of each of the first howMany symbols
     symbolsToUse = symbols[0:howMany]
     result = [s for s in symbolsToUse for _ in range(botSize)]
-    shuffle(result)
+    (shuffle if rng is None else rng.shuffle)(result)
     return result
 
 # *****************************************************
@@ -300,57 +479,94 @@ def askUserFor(ask, options, end = ""):
 # ***************** NEW FUNCTIONS HERE ****************
 # *****************************************************
 
-def newGameInfo(fileName):
+def newGameInfo(fileName, overrides=None, puzzleId=None, packFile=None, level=0):
 
     print("Creating a new game...")
     sleep(1)
 
     try:
-        # Abrir o arquivo e ler as informações
-        # 'utf-8' para lidar com caracteres especiais e evitar caracteres não esperados. (Â)
-        with open(fileName, 'r', encoding='utf-8') as file:
-            file_contents = file.readlines()
-        # The file is automatically closed here; there's no need to call file.close().
-
-        # Extração das informações do arquivo
-        botSize = int(file_contents[1].strip())
-        nrBotts = int(file_contents[4].strip())
-        symbols = file_contents[7].strip()
-        letters = file_contents[10].strip()
-
-
-        # Opção expertise no arquivo
-        expertise_option = file_contents[13].strip()
+        # A level of a puzzle pack is read straight from the pack
+        if packFile is not None:
+            return packGameInfo(fileName, overrides, packFile, level)
+        # A puzzle ID fixes the size and expertise of the game
+        if puzzleId is not None:
+            idBotts, idSize, idExpert, _ = parsePuzzleId(puzzleId)
+            overrides = dict(overrides or {}, nrBotts=idBotts, botSize=idSize,
+                             expertise=str(idExpert))
+        # The configuration is parsed and validated once and cached until the file changes
+        cfg = loadConfig(fileName, overrides)
+        botSize = cfg.botSize
+        nrBotts = cfg.nrBotts
+        letters = cfg.bottleLabels()
 
         # Verificar se expertise_option é "random" ou um número
-        if expertise_option.lower() == "random":
+        if cfg.expertise == "random":
             # Geração aleatória do nível de expertise
             expertise = randint(1, 5)
         else:
-            expertise = int(expertise_option)
+            expertise = int(cfg.expertise)
 
         print("Expertise Level: " + str(expertise))
+        symbols = cfg.colorSymbols(nrBotts - expertise)
 
         # Criação do dicionário representando as garrafas
-        bottles = buildGameBottles(nrBotts, botSize, expertise, letters, symbols)
+        # The game is built from a seeded ID so that it can be built again
+        if puzzleId is None:
+            puzzleId = newPuzzleId(nrBotts, botSize, expertise)
+        print("Puzzle ID: " + puzzleId)
+        bottles = buildGameFromId(puzzleId, letters, symbols)
 
         # Inicialização de outros valores
         nrErrors = 0
         fullBottles = 0
 
         # Retorno dos valores necessários para o jogo
-        return botSize, nrBotts, expertise, nrErrors, fullBottles, bottles
+        return botSize, nrBotts, expertise, nrErrors, fullBottles, bottles, puzzleId
 
     except Exception as e:
         # Tratamento de exceção em caso de problemas com o arquivo
         raise Exception(f"Erro ao ler o arquivo: {e}")
 
+def packGameInfo(fileName, overrides, packFile, level):
+    """
+    The game information of a level of a puzzle pack
+
+    Only that level is read from the pack (see pack.PuzzlePack); the
+    configuration file gives the letters and symbols.
+
+    Parameters
+    ----------
+    fileName : string
+        The configuration file.
+    overrides : dictionary
+        As in newGameInfo.
+    packFile : string
+        The puzzle pack.
+    level : int
+        From 0 to the number of levels of the pack - 1.
+
+    Returns
+    -------
+    tuple
+        As returned by newGameInfo, with no puzzle ID.
+
+    """
+    with PuzzlePack(packFile) as pack:
+        nrBotts, botSize, expertise = pack.shape(level)
+        cfg = loadConfig(fileName, dict(overrides or {}, nrBotts=nrBotts, botSize=botSize,
+                                        expertise=str(expertise)), validate=False)
+        print(f"Level {level} of {packFile}")
+        print("Expertise Level: " + str(expertise))
+        bottles = pack.bottles(level, cfg.bottleLabels(),
+                               cfg.colorSymbols(nrBotts - expertise))
+    return botSize, nrBotts, expertise, 0, 0, bottles, None
+
 # Test the Function
 # fileName = 'cfg.newGame.txt'
 # testInfo = newGameInfo(fileName)
 # print(testInfo)
 
-def writeGameInfo(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles):
+def writeGameInfo(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles, puzzleId=None):
     try:
         while True:
             user = input("Enter your name to store your game information: ")
@@ -368,19 +584,16 @@ def writeGameInfo(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles):
                 break
 
         # Open the file for writing
-        with open(fileName, 'w', encoding='utf-8') as file:
-            # Write the necessary values to the file
-            file.write(f"# Attention - Changing any value in this database may break your save forever.\n\n")
-            file.write(f"# Bottle capacity\n{botSize}\n\n")
-            file.write(f"# Total number of bottles in the game\n{nrBotts}\n\n")
-            file.write(f"# Expertise level\n{expertise}\n\n")
-            file.write(f"# Number of Errors\n{nrErrors}\n\n")
-            file.write(f"# Number of Full Bottles\n{fullBottles}\n\n")
-
-            # Write the current state of the bottles
-            file.write(f"Bottles: \n")
-            for letter, content in bottles.items():
-                file.write(f"{letter}:{','.join(content)}\n")
+        header, body = formatSave(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles,
+                                  puzzleId)
+        # newline='\n' so that the byte offset of the bottles is the same on every system
+        with open(fileName, 'w', encoding='utf-8', newline='\n') as file:
+            file.write(header)
+            file.write(body)
+
+        # The saves index lets oldGameInfo list the saves without opening them
+        recordSave(fileName, user, botSize, nrBotts, expertise, nrErrors,
+                   fullBottles, len(header.encode('utf-8')), puzzleId=puzzleId)
 
         # The file is automatically closed here; there's no need to call file.close().
 
@@ -405,8 +618,9 @@ def writeGameInfo(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles):
 
 def oldGameInfo():
     try:
-        # Obter a lista de arquivos .txt na pasta
-        file_list = [f for f in listdir() if f.endswith(".txt") and f != "cfg.newGame.txt"]
+        # The saves are listed from the saves index, without opening them
+        index = readSaveIndex()
+        file_list = sorted(index, key=lambda f: index[f]["timestamp"], reverse=True)
 
         if not file_list:
             print("No game files found.")
@@ -415,43 +629,33 @@ def oldGameInfo():
         # Mostrar a lista de arquivos para o usuário escolher
         print("Choose a saved game file:")
         for i, filename in enumerate(file_list, start=1):
-            print(f"{i}. {filename}")
+            entry = index[filename]
+            print(f"{i}. {filename} ({entry['player']}, "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['timestamp']))}, "
+                  f"{entry['nrBotts']} bottles of {entry['botSize']}, "
+                  f"{entry['nrErrors']} errors, {entry['progress']}% done)")
 
         # Solicitar ao usuário a escolha do arquivo
         choice = int(input("Enter the number of the file you want to load: "))
         sleep(1)
         selected_file = file_list[choice - 1]
 
-        # Abrir o arquivo selecionado e extrair as informações
-        with open(selected_file, 'r', encoding='utf-8') as file:
-            file_contents = file.readlines()
-
-        # The file is automatically closed here; there's no need to call file.close().
-
-        # Processar as informações do arquivo
-        botSize = int(file_contents[3].strip())
-        nrBotts = int(file_contents[6].strip())
-        expertise = int(file_contents[9].strip())
-        nrErrors = int(file_contents[12].strip())
-        fullBottles = int(file_contents[15].strip())
-
-        # Extrair o estado atual das garrafas
-        bottles = {}
-        for line in file_contents[18:]:
-            letter, content = line.strip().split(":")
-            bottles[letter] = content.split(',')
-
-        # print(botSize, nrBotts)
-        # print(expertise)
-        # print(nrErrors, fullBottles)
-        # print(bottles)
+        # Only the bottles are read from the file, the rest is in the index
+        entry = index[selected_file]
+        bottles = loadSave(selected_file, entry)
+        botSize = entry["botSize"]
+        nrBotts = entry["nrBotts"]
+        expertise = entry["expertise"]
+        nrErrors = entry["nrErrors"]
+        fullBottles = entry["fullBottles"]
+        puzzleId = entry.get("puzzleId")
 
         print("Game information loaded successfully from " + selected_file)
         sleep(0.5)
         print("Iniciating the game..")
         sleep(1)
 
-        return botSize, nrBotts, expertise, nrErrors, fullBottles, bottles
+        return botSize, nrBotts, expertise, nrErrors, fullBottles, bottles, puzzleId
 
     except Exception as e:
         # Tratamento de exceção em caso de problemas com o arquivo
@@ -465,20 +669,8 @@ def oldGameInfo():
 
 def default_cfg():
     try:
-        # Abrir o arquivo de configuração
-        with open('cfg.newGame.txt', 'w', encoding='utf-8') as cfg_file:
-            # Escrever as opções padrão no arquivo
-            cfg_file.write("# Bottle capacity (Min 8)\n")
-            cfg_file.write("8")
-            cfg_file.write("\n\n# Total number of bottles in the game (Max 10)\n")
-            cfg_file.write("10")
-            cfg_file.write("\n\n# Available symbols (Must contain 9 different symbols)\n")
-            cfg_file.write("@#%$!+o?§")
-            cfg_file.write("\n\n# Identifying letters for the bottles (Must contain 10 different letters)\n")
-            cfg_file.write("ABCDEFGHIJ")
-            cfg_file.write("\n\n# Expertise (options: random; 1; 2; 3; 4; 5)\n")
-            cfg_file.write("random")
-
+        # Escrever as opções padrão no arquivo
+        saveConfig(DEFAULT_CONFIG)
         print("Default configuration has been set successfully.")
 
     except Exception as e:
@@ -491,14 +683,11 @@ def default_cfg():
 def config():
     while True:
         try:
-            # Abrir o arquivo de configuração
-            with open('cfg.newGame.txt', 'r', encoding='utf-8') as cfg_file:
-                cfg_contents = cfg_file.readlines()
-
-            # Extrair informações do arquivo de configuração
-            botSize = int(cfg_contents[1].strip())
-            nrBotts = int(cfg_contents[4].strip())
-            expertise_option = cfg_contents[13].strip()
+            # The file is only parsed again if it changed
+            cfg = loadConfig(CFG_FILE, environ={}, validate=False)
+            botSize = cfg.botSize
+            nrBotts = cfg.nrBotts
+            expertise_option = cfg.expertise
 
             print("|---------------|")
             print("|  Game Config  | ")
@@ -519,37 +708,27 @@ def config():
             print("\n- Other Options")
             print("z. Go Back\n")
 
-            rewrite = True
+            newCfg = cfg
 
             # Solicitar escolha do usuário
             choice = input("Enter your choice: ").lower()
 
             if choice == 'a':
-                new_botSize = int(input("Enter new bottle capacity (between 8 and 20): "))
-                if 8 <= new_botSize <= 20:
-                    cfg_contents[1] = str(new_botSize) + "\n"
-                    print("Bottle capacity updated successfully.")
-                else:
-                    print("Invalid input. Please check the specified range.")
+                new_botSize = int(input("Enter new bottle capacity (between %d and %d): " % BOT_SIZE_RANGE))
+                newCfg = cfg.replace(botSize=new_botSize)
+                message = "Bottle capacity updated successfully."
 
             elif choice == 'b':
-                new_nrBotts = int(input("Enter new total number of bottles (between 7 and 10): "))
-                if 7 <= new_nrBotts <= 10:
-                    cfg_contents[4] = str(new_nrBotts) + "\n"
-                    print("Total number of bottles updated successfully.")
-                else:
-                    print("Invalid input. Please check the specified range.")
+                new_nrBotts = int(input("Enter new total number of bottles (between %d and %d): " % NR_BOTTS_RANGE))
+                newCfg = cfg.replace(nrBotts=new_nrBotts)
+                message = "Total number of bottles updated successfully."
 
             elif choice == 'c':
                 new_expertise = input("Enter new expertise (options: random; 1; 2; 3; 4; 5): ").lower()
-                if new_expertise in ['random', '1', '2', '3', '4', '5']:
-                    cfg_contents[13] = str(new_expertise) + "\n"
-                    print("Expertise updated successfully.")
-                else:
-                    print("Invalid input. Please check the specified options.")
+                newCfg = cfg.replace(expertise=new_expertise)
+                message = "Expertise updated successfully."
 
             elif choice == 'd':
-                rewrite = False
                 default_cfg()
 
             elif choice == 'z':
@@ -558,10 +737,13 @@ def config():
             else:
                 print("Invalid choice. Please enter a valid option.")
 
-            # Gravar as alterações no arquivo
-            if rewrite:
-                with open('cfg.newGame.txt', 'w', encoding='utf-8') as cfg_file:
-                    cfg_file.writelines(cfg_contents)
+            # Gravar as alterações no arquivo (only if something changed)
+            if newCfg is not cfg:
+                if newCfg.problems():
+                    print("Invalid input. " + " ".join(newCfg.problems()))
+                else:
+                    saveConfig(newCfg)
+                    print(message)
 
         except Exception as e:
             print(f"Error accessing or modifying the configuration file: {e}")
@@ -0,0 +1,306 @@
+import os
+
+CFG_FILE = 'cfg.newGame.txt'
+EXPERTISE_OPTIONS = ['random', '1', '2', '3', '4', '5']
+# Heights are stored in a byte, and bottle indexes of session logs in 2
+BOT_SIZE_RANGE = (8, 255)
+NR_BOTTS_RANGE = (7, 999)
+
+# Environment variables that override the values of the file
+ENVIRONMENT = {"botSize": "WSP_BOT_SIZE",
+               "nrBotts": "WSP_NR_BOTTS",
+               "symbols": "WSP_SYMBOLS",
+               "letters": "WSP_LETTERS",
+               "expertise": "WSP_EXPERTISE"}
+
+# The comment above each value of the file starts with its header
+HEADERS = {"botSize": "Bottle capacity",
+           "nrBotts": "Total number of bottles",
+           "symbols": "Available symbols",
+           "letters": "Identifying letters",
+           "expertise": "Expertise"}
+
+# Files already read: fileName -> (modification time, size, GameConfig)
+_cache = {}
+
+# *****************************************************
+class GameConfig:
+    """
+    The values of the new game configuration file.
+
+    Instances are not changed after being built (use replace), so the
+    same object can be handed to every caller of loadConfig.
+    """
+
+    __slots__ = ("botSize", "nrBotts", "symbols", "letters", "expertise")
+
+    def __init__(self, botSize, nrBotts, symbols, letters, expertise):
+        self.botSize = botSize
+        self.nrBotts = nrBotts
+        self.symbols = symbols
+        self.letters = letters
+        self.expertise = expertise
+
+    def __eq__(self, other):
+        return isinstance(other, GameConfig) and self.values() == other.values()
+
+    def __repr__(self):
+        return "GameConfig(%r, %r, %r, %r, %r)" % self.values()
+
+    # *************************************************
+    def values(self):
+        return (self.botSize, self.nrBotts, self.symbols, self.letters, self.expertise)
+
+    # *************************************************
+    def replace(self, **changes):
+        """
+        A copy of this configuration with some values changed
+
+        Parameters
+        ----------
+        **changes
+            New values for botSize, nrBotts, symbols, letters or expertise.
+
+        Returns
+        -------
+        GameConfig
+
+        """
+        values = dict(zip(self.__slots__, self.values()))
+        values.update(changes)
+        return GameConfig(**values)
+
+    # *************************************************
+    def maxExpertise(self):
+        # "random" draws a level between 1 and 5
+        if self.expertise == 'random':
+            return 5
+        return int(self.expertise)
+
+    # *************************************************
+    def bottleLabels(self):
+        """
+        The keys of the bottles of a new game
+
+        Returns
+        -------
+        list of strings
+            The first nrBotts letters, or the numbers 1 to nrBotts if
+            there are not enough letters.
+
+        """
+        if len(self.letters) >= self.nrBotts:
+            return list(self.letters[:self.nrBotts])
+        return [str(number) for number in range(1, self.nrBotts + 1)]
+
+    # *************************************************
+    def colorSymbols(self, nrColors):
+        """
+        The symbols of the colors of a new game
+
+        Parameters
+        ----------
+        nrColors : int
+            The number of different colors of the game.
+
+        Returns
+        -------
+        list of strings
+            The first nrColors symbols, or the numbers 1 to nrColors if
+            there are not enough symbols.
+
+        """
+        if len(self.symbols) >= nrColors:
+            return list(self.symbols[:nrColors])
+        return [str(number) for number in range(1, nrColors + 1)]
+
+    # *************************************************
+    def problems(self):
+        """
+        What is wrong with this configuration
+
+        Returns
+        -------
+        list of strings
+            Empty if the configuration can be used to build games.
+
+        """
+        problems = []
+        if not BOT_SIZE_RANGE[0] <= self.botSize <= BOT_SIZE_RANGE[1]:
+            problems.append("Bottle capacity must be between %d and %d." % BOT_SIZE_RANGE)
+        if not NR_BOTTS_RANGE[0] <= self.nrBotts <= NR_BOTTS_RANGE[1]:
+            problems.append("Total number of bottles must be between %d and %d." % NR_BOTTS_RANGE)
+        if self.expertise not in EXPERTISE_OPTIONS:
+            problems.append("Expertise must be one of: " + "; ".join(EXPERTISE_OPTIONS) + ".")
+        elif self.maxExpertise() >= self.nrBotts:
+            problems.append("Expertise must be lower than the number of bottles.")
+        if len(set(self.letters)) != len(self.letters):
+            problems.append("Identifying letters must be different.")
+        if 'Z' in self.letters.upper() or any(c in self.letters for c in "<>?+-"):
+            problems.append("Z, <, >, ?, + and - cannot identify bottles.")
+        if len(set(self.symbols)) != len(self.symbols):
+            problems.append("Symbols must be different.")
+        # Without enough letters or symbols, numbers are used (see bottleLabels)
+        return problems
+
+    # *************************************************
+    def format(self):
+        """
+        The text of the configuration file
+
+        Returns
+        -------
+        string
+
+        """
+        return (f"# Bottle capacity (Min {BOT_SIZE_RANGE[0]})\n{self.botSize}"
+                f"\n\n# Total number of bottles in the game (Max {NR_BOTTS_RANGE[1]})\n{self.nrBotts}"
+                f"\n\n# Available symbols (Numbers are used with fewer than {self.nrBotts - 1} different symbols)\n{self.symbols}"
+                f"\n\n# Identifying letters for the bottles (Numbers are used with fewer than {self.nrBotts} different letters)\n{self.letters}"
+                f"\n\n# Expertise (options: {'; '.join(EXPERTISE_OPTIONS)})\n{self.expertise}")
+
+DEFAULT_CONFIG = GameConfig(8, 10, "@#%$!+o?§", "ABCDEFGHIJ", "random")
+
+# *****************************************************
+def parseConfig(text):
+    """
+    The configuration in the text of a configuration file
+
+    Parameters
+    ----------
+    text : string
+
+    Returns
+    -------
+    GameConfig
+
+    Raises
+    ------
+    ValueError
+        If some value is missing or is not a number where one is expected.
+
+    """
+    # Comments start with "# " and may take several lines; the header of
+    # the first one tells which value the next line holds. A value may
+    # itself start with "#", which is a valid symbol
+    values = {}
+    name = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line[:2] in ("# ", "#\t"):
+            comment = line[1:].strip().lower()
+            for key, header in HEADERS.items():
+                if comment.startswith(header.lower()):
+                    name = key
+            continue
+        if name is not None:
+            values[name] = line
+            name = None
+    missing = [HEADERS[key] for key in HEADERS if key not in values]
+    if missing:
+        raise ValueError("the configuration file has no value for: " + "; ".join(missing))
+    return GameConfig(int(values["botSize"]), int(values["nrBotts"]), values["symbols"],
+                      values["letters"], values["expertise"].lower())
+
+# *****************************************************
+def loadConfig(fileName=CFG_FILE, overrides=None, environ=None, validate=True):
+    """
+    The validated configuration of new games
+
+    The file is only read again when its modification time or size
+    changed since the last call.
+
+    Parameters
+    ----------
+    fileName : string, optional
+        The default is CFG_FILE.
+    overrides : dictionary, optional
+        Values that replace those of the file (e.g. from the command line).
+    environ : dictionary, optional
+        Environment variables (see ENVIRONMENT), which replace the values
+        of the file but not the overrides. The default is os.environ.
+    validate : bool, optional
+        Whether to check the values. The default is True.
+
+    Returns
+    -------
+    GameConfig
+
+    Raises
+    ------
+    ValueError
+        If the configuration is not valid.
+
+    """
+    info = os.stat(fileName)
+    cached = _cache.get(fileName)
+    if cached is not None and cached[0] == info.st_mtime_ns and cached[1] == info.st_size:
+        cfg = cached[2]
+    else:
+        with open(fileName, 'r', encoding='utf-8') as file:
+            cfg = parseConfig(file.read())
+        _cache[fileName] = (info.st_mtime_ns, info.st_size, cfg)
+
+    changes = {}
+    environ = os.environ if environ is None else environ
+    for name, variable in ENVIRONMENT.items():
+        if variable in environ:
+            changes[name] = environ[variable]
+    changes.update(overrides or {})
+    if changes:
+        for name in ("botSize", "nrBotts"):
+            if name in changes:
+                changes[name] = int(changes[name])
+        if "expertise" in changes:
+            changes["expertise"] = str(changes["expertise"]).lower()
+        cfg = cfg.replace(**changes)
+
+    problems = cfg.problems() if validate else []
+    if problems:
+        raise ValueError(" ".join(problems))
+    return cfg
+
+# *****************************************************
+def saveConfig(cfg, fileName=CFG_FILE):
+    """
+    Writes the configuration file, if it does not have cfg already
+
+    The new contents are written to a temporary file which then replaces
+    the old one, so the file is never left half written.
+
+    Parameters
+    ----------
+    cfg : GameConfig
+    fileName : string, optional
+        The default is CFG_FILE.
+
+    Returns
+    -------
+    bool
+        True if the file was written.
+
+    """
+    cached = _cache.get(fileName)
+    if cached is not None and cached[2] == cfg:
+        try:
+            info = os.stat(fileName)
+            if cached[0] == info.st_mtime_ns and cached[1] == info.st_size:
+                return False
+        except FileNotFoundError:
+            pass
+    text = cfg.format()
+    try:
+        with open(fileName, 'r', encoding='utf-8') as file:
+            if file.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    temporary = fileName + ".tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temporary, fileName)
+    info = os.stat(fileName)
+    _cache[fileName] = (info.st_mtime_ns, info.st_size, cfg)
+    return True
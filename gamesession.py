@@ -0,0 +1,229 @@
+from board import Board
+from deadend import DEAD
+from gamestate import GameState
+from journal import MoveJournal
+
+# A game is lost after this many errors
+MAX_ERRORS = 3
+
+# *****************************************************
+class GameSession:
+    """
+    One game being played: the rules of the game loop of main.py without
+    any input or output, so the same game can be played from the
+    keyboard, by a program or over the network.
+
+    The bottles are kept in a GameState, the moves in a MoveJournal (for
+    undo and redo) and, when given, in a MoveLog (for crash recovery).
+    hints (a HintService) and deadEnds (a DeadEndDetector) are optional:
+    without them hint() always returns None and the game only ends when
+    it is won or after MAX_ERRORS errors. With either, the bottles are
+    also kept in a Board, built once and then changed move by move like
+    the GameState, which both search directly: nothing the size of the
+    game is rebuilt after a move.
+    """
+
+    __slots__ = ("botSize", "nrBotts", "expertise", "nrErrors", "bottles", "puzzleId",
+                 "state", "journal", "hints", "deadEnds", "deadEnd", "log", "board",
+                 "indexes")
+
+    def __init__(self, botSize, nrBotts, expertise, nrErrors, bottles, puzzleId=None,
+                 hints=None, deadEnds=None, log=None):
+        self.botSize = botSize
+        self.nrBotts = nrBotts
+        self.expertise = expertise
+        self.nrErrors = nrErrors
+        self.bottles = bottles
+        self.puzzleId = puzzleId
+        # Keeps track of the full bottles move by move (the saved count is not trusted)
+        self.state = GameState(bottles, botSize, expertise)
+        self.journal = MoveJournal()
+        self.hints = hints
+        self.deadEnds = deadEnds
+        self.deadEnd = False
+        self.log = log
+        # The Board of the searches and the index of each letter in it
+        self.board = None
+        self.indexes = None
+        if hints is not None or deadEnds is not None:
+            self.board = Board.fromBottles(bottles, botSize)
+            self.indexes = {letter: i for i, letter in enumerate(self.board.labels)}
+
+    # *************************************************
+    @classmethod
+    def fromInfo(cls, infoGame, **options):
+        """
+        A session for the tuple returned by functions.newGameInfo,
+        functions.oldGameInfo or movelog.replayLog
+
+        Parameters
+        ----------
+        infoGame : tuple
+            (botSize, nrBotts, expertise, nrErrors, fullBottles, bottles,
+            puzzleId).
+        **options
+            hints, deadEnds and log, as in GameSession.
+
+        Returns
+        -------
+        GameSession
+
+        """
+        botSize, nrBotts, expertise, nrErrors, _, bottles, puzzleId = infoGame
+        return cls(botSize, nrBotts, expertise, nrErrors, bottles, puzzleId, **options)
+
+    # *************************************************
+    @property
+    def fullBottles(self):
+        return self.state.nrComplete
+
+    # *************************************************
+    def info(self):
+        """
+        The game information, as returned by functions.newGameInfo
+
+        Returns
+        -------
+        tuple
+            (botSize, nrBotts, expertise, nrErrors, fullBottles, bottles,
+            puzzleId).
+
+        """
+        return (self.botSize, self.nrBotts, self.expertise, self.nrErrors,
+                self.fullBottles, self.bottles, self.puzzleId)
+
+    # *************************************************
+    def move(self, source, destin):
+        """
+        Pours source into destin, or counts an error if that is not possible
+        (also if source is destin)
+
+        Parameters
+        ----------
+        source : string
+            The letter of the source bottle.
+        destin : string
+            The letter of the destination bottle.
+
+        Returns
+        -------
+        int
+            The quantity of "liquid" transferred, 0 for an error.
+
+        Raises
+        ------
+        KeyError
+            If source or destin is not a bottle of the game.
+
+        """
+        bottles = self.bottles
+        if source not in bottles or destin not in bottles:
+            raise KeyError(source if source not in bottles else destin)
+        # A bottle poured into itself is an error whatever the rules of the state
+        if source == destin or not self.state.moveIsPossible(source, destin):
+            self.nrErrors += 1
+            if self.log is not None:
+                self.log.error()
+            return 0
+        transfer = self.state.doMove(source, destin)
+        self.journal.record(source, destin, transfer, bottles[destin][-1])
+        if self.log is not None:
+            self.log.move(source, destin, bottles, self.nrErrors)
+        if self.board is not None:
+            move = (self.indexes[source], self.indexes[destin])
+            self.board.doMove(*move)
+            if self.deadEnds is not None:
+                self.deadEnd = self.deadEnds.checkBoard(self.board, self.nrColors(), move,
+                                                        transfer) == DEAD
+        return transfer
+
+    # *************************************************
+    def nrColors(self):
+        return self.nrBotts - self.expertise
+
+    # *************************************************
+    def undo(self):
+        """
+        Takes back the last move
+
+        Returns
+        -------
+        bool
+            False if there was nothing to undo.
+
+        """
+        if not self.journal.undo(self.state):
+            return False
+        source, destin, transfer, _ = self.journal.entries[self.journal.position]
+        if self.log is not None:
+            self.log.undo(source, destin, transfer, self.bottles, self.nrErrors)
+        if self.board is not None:
+            self.board.undoMove(self.indexes[source], self.indexes[destin], transfer)
+        self._changed()
+        return True
+
+    # *************************************************
+    def redo(self):
+        """
+        Makes again the last move undone
+
+        Returns
+        -------
+        bool
+            False if there was nothing to redo.
+
+        """
+        if not self.journal.redo(self.state):
+            return False
+        source, destin, _, _ = self.journal.entries[self.journal.position - 1]
+        if self.log is not None:
+            self.log.move(source, destin, self.bottles, self.nrErrors)
+        if self.board is not None:
+            self.board.doMove(self.indexes[source], self.indexes[destin])
+        self._changed()
+        return True
+
+    # *************************************************
+    def _changed(self):
+        # Whatever was known about winning may no longer hold
+        if self.deadEnds is not None:
+            self.deadEnds.reset()
+            self.deadEnd = False
+
+    # *************************************************
+    def hint(self):
+        """
+        A suggested move (see HintService.hint)
+
+        Returns
+        -------
+        tuple (source, destin) of letters, or None
+            None if the game is won or cannot be won, or without hints.
+
+        """
+        if self.hints is None:
+            return None
+        move = self.hints.hintBoard(self.board, self.nrColors())
+        if move is None:
+            return None
+        return self.board.labels[move[0]], self.board.labels[move[1]]
+
+    # *************************************************
+    def won(self):
+        return self.state.won()
+
+    # *************************************************
+    def over(self):
+        """
+        Has the game ended (won, MAX_ERRORS errors, or no longer winnable)?
+        """
+        return self.state.won() or self.nrErrors >= MAX_ERRORS or self.deadEnd
+
+    # *************************************************
+    def close(self, remove=True):
+        """
+        Closes the session log (see MoveLog.close)
+        """
+        if self.log is not None:
+            self.log.close(remove)
+            self.log = None
@@ -0,0 +1,174 @@
+import functions as funcs
+
+# *****************************************************
+class GameState:
+    """
+    The bottles of a game together with what the game loop needs to know
+    about them, kept up to date move by move.
+
+    For each bottle, runs holds the lengths of its runs (groups of equal
+    consecutive symbols) from bottom to top, so the length of the top run
+    is runs[letter][-1]. complete tells which bottles are full of a single
+    symbol and nrComplete how many they are. doMove and undoMove only
+    update the two bottles involved, so legality and win checks never
+    rescan the board.
+    """
+
+    __slots__ = ("bottles", "botSize", "expert", "runs", "complete", "nrComplete")
+
+    def __init__(self, bottles, botSize, expert):
+        self.bottles = bottles
+        self.botSize = botSize
+        self.expert = expert
+        self.runs = {}
+        self.complete = {}
+        self.nrComplete = 0
+        for letter, content in bottles.items():
+            runs = []
+            previous = None
+            for char in content:
+                if char == previous:
+                    runs[-1] += 1
+                else:
+                    runs.append(1)
+                    previous = char
+            self.runs[letter] = runs
+            self._updateComplete(letter)
+
+    # *************************************************
+    def _updateComplete(self, letter):
+        isComplete = self.runs[letter] == [self.botSize]
+        if isComplete != self.complete.get(letter, False):
+            self.nrComplete += 1 if isComplete else -1
+        self.complete[letter] = isComplete
+
+    # *************************************************
+    def topRun(self, letter):
+        """
+        How many symbols at the top of the bottle are equal to the top one?
+
+        Parameters
+        ----------
+        letter : string
+            The key of the bottle in bottles.
+
+        Returns
+        -------
+        int
+            0 if the bottle is empty.
+
+        """
+        runs = self.runs[letter]
+        return runs[-1] if runs else 0
+
+    # *************************************************
+    def moveIsPossible(self, source, destin):
+        """
+        Is it possible to transfer any "liquid" from source to destin?
+
+        Parameters
+        ----------
+        source : string
+            The letter that identifies the source bottle.
+        destin : string
+            The letter that identifies the destination bottle.
+
+        Returns
+        -------
+        bool
+            Same rule as functions.moveIsPossible.
+
+        """
+        return funcs.moveIsPossible(self.botSize, source, destin, self.bottles)
+
+    # *************************************************
+    def doMove(self, source, destin):
+        """
+        Transfers as much "liquid" as possible from source to destin
+
+        Parameters
+        ----------
+        source : string
+            The letter that identifies the source bottle.
+        destin : string
+            The letter that identifies the destination bottle.
+
+        Returns
+        -------
+        int
+            The quantity of "liquid" that was transferred.
+
+        Requires:
+        --------
+            moveIsPossible(source, destin)
+        """
+        sourceContent = self.bottles[source]
+        destContent = self.bottles[destin]
+        sourceRuns = self.runs[source]
+        destRuns = self.runs[destin]
+        symbol = sourceContent[-1]
+        transfer = min(sourceRuns[-1], self.botSize - len(destContent))
+        del sourceContent[len(sourceContent) - transfer:]
+        destContent.extend([symbol] * transfer)
+        if sourceRuns[-1] == transfer:
+            sourceRuns.pop()
+        else:
+            sourceRuns[-1] -= transfer
+        if len(destContent) > transfer:
+            destRuns[-1] += transfer
+        else:
+            destRuns.append(transfer)
+        self._updateComplete(source)
+        self._updateComplete(destin)
+        return transfer
+
+    # *************************************************
+    def undoMove(self, source, destin, transfer):
+        """
+        Reverts a move previously made with doMove
+
+        Parameters
+        ----------
+        source : string
+            The letter of the bottle that was the source of the move.
+        destin : string
+            The letter of the bottle that was the destination of the move.
+        transfer : int
+            The quantity returned by doMove.
+
+        Returns
+        -------
+        None.
+
+        """
+        sourceContent = self.bottles[source]
+        destContent = self.bottles[destin]
+        sourceRuns = self.runs[source]
+        destRuns = self.runs[destin]
+        symbol = destContent[-1]
+        del destContent[len(destContent) - transfer:]
+        if destRuns[-1] == transfer:
+            destRuns.pop()
+        else:
+            destRuns[-1] -= transfer
+        if sourceContent and sourceContent[-1] == symbol:
+            sourceRuns[-1] += transfer
+        else:
+            sourceRuns.append(transfer)
+        sourceContent.extend([symbol] * transfer)
+        self._updateComplete(source)
+        self._updateComplete(destin)
+
+    # *************************************************
+    def won(self):
+        """
+        Are all the bottles that are supposed to be full already full?
+
+        Returns
+        -------
+        bool
+            Same as functions.allBottlesFull with the number of complete
+            bottles.
+
+        """
+        return funcs.allBottlesFull(len(self.bottles), self.nrComplete, self.expert)
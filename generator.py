@@ -0,0 +1,157 @@
+import random
+
+from board import Board, newCells
+from functions import bottleSizes
+
+# *****************************************************
+class BoardBatch:
+    """
+    Many boards of the same shape stored in a single dense buffer.
+
+    Row r of the batch uses cells[r * rowSize : (r + 1) * rowSize], with
+    the same layout as Board.cells (botSize cells per bottle, color codes
+    1 to nrColors, 0 for empty), and heights[r * nrBotts : (r + 1) * nrBotts].
+    """
+
+    __slots__ = ("count", "nrBotts", "botSize", "expert", "cells", "heights")
+
+    def __init__(self, count, nrBotts, botSize, expert):
+        self.count = count
+        self.nrBotts = nrBotts
+        self.botSize = botSize
+        self.expert = expert
+        self.cells = newCells(nrBotts - expert, count * nrBotts * botSize)
+        self.heights = bytearray(count * nrBotts)
+
+    def __len__(self):
+        return self.count
+
+    # *************************************************
+    def board(self, row, letters, symbols):
+        """
+        The Board stored in a row of the batch
+
+        Parameters
+        ----------
+        row : int
+            The index of the board in the batch.
+        letters : string
+            The letters that identify bottles.
+        symbols : string
+            The symbols that color codes 1, 2, ... stand for.
+
+        Returns
+        -------
+        Board
+
+        """
+        nrBotts = self.nrBotts
+        rowSize = nrBotts * self.botSize
+        board = Board(self.botSize, nrBotts, list(letters[:nrBotts]),
+                      list(symbols[:nrBotts - self.expert]))
+        board.cells[:] = self.cells[row * rowSize : (row + 1) * rowSize]
+        board.heights[:] = self.heights[row * nrBotts : (row + 1) * nrBotts]
+        return board
+
+    # *************************************************
+    def bottles(self, row, letters, symbols):
+        """
+        The dictionary of bottles stored in a row of the batch
+
+        Parameters
+        ----------
+        row : int
+            The index of the board in the batch.
+        letters : string
+            The letters that identify bottles.
+        symbols : string
+            The symbols that color codes 1, 2, ... stand for.
+
+        Returns
+        -------
+        dictionary
+            Same format as the result of functions.buildGameBottles.
+
+        """
+        return self.board(row, letters, symbols).toBottles()
+
+    # *************************************************
+    def canonicalKey(self, row):
+        """
+        The Board.canonicalKey of a row of the batch
+        """
+        return self.board(row, range(self.nrBotts),
+                          range(1, self.nrBotts - self.expert + 1)).canonicalKey()
+
+# *****************************************************
+def buildGameBatch(howMany, nrBotts, botSize, expert, rng=None, unique=False):
+    """
+    Builds howMany random games at once
+
+    Each game follows the rules of functions.buildGameBottles: botSize
+    cells of each of the (nrBotts - expert) colors, shuffled and poured
+    in bottle order with bottleSizes deciding how many go in each bottle.
+    The games are written straight into a BoardBatch, without building
+    any dictionary or per-bottle list.
+
+    Parameters
+    ----------
+    howMany : int
+        The number of games to build.
+    nrBotts : int
+        The number of bottles in each game.
+    botSize : int
+        The capacity of bottles.
+    expert : int
+        The level of the user's expertise.
+    rng : random.Random, optional
+        The source of randomness. The default is None (a new unseeded one).
+    unique : bool, optional
+        Whether to build again the games that are the same puzzle as an
+        earlier one of the batch (see Board.canonicalKey). The default is
+        False.
+
+    Returns
+    -------
+    BoardBatch
+
+    Requires:
+    --------
+        expert < nrBotts; botSize < 256; with unique, howMany
+        is not more than the number of different puzzles of that shape
+
+    """
+    if rng is None:
+        rng = random.Random()
+    batch = BoardBatch(howMany, nrBotts, botSize, expert)
+    nrColors = nrBotts - expert
+    template = newCells(nrColors)
+    template.extend(code for code in range(1, nrColors + 1) for _ in range(botSize))
+    total = len(template)
+    rowSize = nrBotts * botSize
+    blank = newCells(nrColors, rowSize)
+    cells = batch.cells
+    heights = batch.heights
+    shuffle = rng.shuffle
+    rand = rng.randint
+    seen = set()
+    for row in range(howMany):
+        while True:
+            colors = template[:]
+            shuffle(colors)
+            sizes = bottleSizes(nrBotts, botSize, expert, total, rand)
+            heights[row * nrBotts : (row + 1) * nrBotts] = bytes(sizes)
+            cells[row * rowSize : (row + 1) * rowSize] = blank
+            cell = row * rowSize
+            taken = 0
+            for size in sizes:
+                cells[cell : cell + size] = colors[taken : taken + size]
+                taken += size
+                cell += botSize
+            if not unique:
+                break
+            key = batch.canonicalKey(row)
+            if key not in seen:
+                seen.add(key)
+                break
+    return batch
@@ -0,0 +1,181 @@
+import time
+from collections import deque
+
+from board import Board
+from moveindex import MoveIndex
+from solver import isSolved, solveBoard
+
+# *****************************************************
+class HintService:
+    """
+    Suggests the next move of a game, answering repeated questions from
+    a cache.
+
+    When the solver finds a solution within the time budget, every board
+    along it is cached with its next move, so the following hints of a
+    player who follows them are free. When the budget runs out, the first
+    move towards the most promising board the search reached is suggested
+    instead (or, failing that, the move that leaves the fewest runs), and
+    it is not cached.
+    """
+
+    __slots__ = ("maxSeconds", "maxEntries", "cache", "hits", "misses", "latencies")
+
+    def __init__(self, maxSeconds=0.05, maxEntries=100000):
+        self.maxSeconds = maxSeconds
+        self.maxEntries = maxEntries
+        # (botSize, nrColors, Board.symbolKey) -> (source, destin) or None if
+        # the game cannot be won
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.latencies = deque(maxlen=1000)
+
+    # *************************************************
+    def _store(self, key, move):
+        if len(self.cache) >= self.maxEntries:
+            # Dictionaries keep insertion order: drop the oldest entry
+            del self.cache[next(iter(self.cache))]
+        self.cache[key] = move
+
+    # *************************************************
+    def hintBoard(self, board, nrColors, start=None):
+        """
+        The suggested move for a Board
+
+        Parameters
+        ----------
+        board : Board
+            The game bottles. It is left unchanged.
+        nrColors : int
+            The number of different symbols in the game.
+        start : float, optional
+            When the hint was asked (time.perf_counter()): the time budget
+            counts from there. The default is None (now).
+
+        Returns
+        -------
+        tuple (source, destin) of bottle indexes, or None
+            None if the game is won or cannot be won.
+
+        """
+        if start is None:
+            start = time.perf_counter()
+        key = (board.botSize, nrColors, board.symbolKey())
+        if key in self.cache:
+            self.hits += 1
+            move = self.cache[key]
+        else:
+            self.misses += 1
+            move = self._search(board, nrColors, key, start)
+        self.latencies.append(time.perf_counter() - start)
+        return move
+
+    # *************************************************
+    def _search(self, board, nrColors, key, start):
+        if isSolved(board, nrColors):
+            return None
+        # Whatever was spent before the search counts against the budget
+        left = max(0.0, self.maxSeconds - (time.perf_counter() - start))
+        solution, stats = solveBoard(board, nrColors, maxSeconds=left)
+        if solution is not None:
+            walker = board.copy()
+            for source, destin in solution:
+                self._store((board.botSize, nrColors, walker.symbolKey()), (source, destin))
+                walker.doMove(source, destin)
+            return solution[0]
+        if not stats["exhausted"]:
+            self._store(key, None)
+            return None
+        if stats["closest"]:
+            return stats["closest"][0]
+        return greedyMove(board)
+
+    # *************************************************
+    def hint(self, bottles, botSize, expert):
+        """
+        The suggested move for a dictionary of bottles
+
+        Parameters
+        ----------
+        bottles : dictionary
+            Keys are strings and values are lists.
+        botSize : int
+            The capacity of bottles.
+        expert : int
+            The user's expert level.
+
+        Returns
+        -------
+        tuple (source, destin) of keys of bottles, or None
+            None if the game is won or cannot be won.
+
+        """
+        start = time.perf_counter()
+        board = Board.fromBottles(bottles, botSize)
+        move = self.hintBoard(board, len(bottles) - expert, start)
+        if move is None:
+            return None
+        return board.labels[move[0]], board.labels[move[1]]
+
+    # *************************************************
+    def stats(self):
+        """
+        How well the service is doing
+
+        Returns
+        -------
+        dictionary
+            "hits", "misses", "hitRate", "entries", and "p50Ms"/"p99Ms",
+            the latencies of the last 1000 hints in milliseconds.
+
+        """
+        asked = self.hits + self.misses
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return 1000 * latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / asked if asked else 0.0,
+                "entries": len(self.cache),
+                "p50Ms": percentile(0.50),
+                "p99Ms": percentile(0.99)}
+
+# *****************************************************
+def greedyMove(board):
+    """
+    The useful move that leaves the fewest runs in the two bottles
+
+    Ties go to the move that transfers the most.
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles. It is left unchanged.
+
+    Returns
+    -------
+    tuple (source, destin) of bottle indexes, or None if there is no move
+
+    """
+    best = None
+    bestScore = None
+    heights = board.heights
+    botSize = board.botSize
+    topRuns = {}
+    # The moves of each color only, not every pair of bottles. Only the
+    # tops change: the source loses a run when its whole top run goes,
+    # and an empty destination gains one
+    for source, destin in MoveIndex(board).legalMoves():
+        if source not in topRuns:
+            topRuns[source] = board.topRun(source)
+        topRun = topRuns[source]
+        transfer = min(topRun, botSize - heights[destin])
+        score = ((heights[destin] == 0) - (transfer == topRun), -transfer)
+        if bestScore is None or score < bestScore:
+            best = (source, destin)
+            bestScore = score
+    return best
@@ -0,0 +1,264 @@
+"""
+Counts and times the calls to the functions where the game spends its
+time. Nothing is measured (and nothing costs anything) until enable() is
+called: it replaces each function by a timed version wherever the
+program refers to it, and disable() puts the originals back.
+
+Example:
+    import instrument
+    instrument.enable()
+    instrument.startDumping("instrument.json", every=5.0)
+    ...
+    print(instrument.report())
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# The functions measured by default, as "module.function" or "module.Class.method"
+TARGETS = ("functions.doMove", "functions.moveIsPossible", "functions.showBottles",
+           "functions.buildGameBottles", "functions.newGameInfo", "functions.oldGameInfo",
+           "functions.writeGameInfo", "saves.loadSave", "saves.recordSave",
+           "saves.readSaveIndex", "gamestate.GameState.doMove",
+           "gamestate.GameState.moveIsPossible", "render.Renderer.render")
+
+# Environment variable: a file to dump the measures to (see enableFromEnvironment)
+ENVIRONMENT = "WSP_INSTRUMENT"
+
+# *****************************************************
+class CallStats:
+    """
+    The calls to one function: how many, their total and longest time,
+    and a histogram of their times, where bucket b counts the calls that
+    took from 2**(b-1) to 2**b - 1 nanoseconds.
+    """
+
+    __slots__ = ("calls", "totalNs", "maxNs", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.totalNs = 0
+        self.maxNs = 0
+        self.buckets = [0] * 64
+
+    # *************************************************
+    def record(self, ns):
+        self.calls += 1
+        self.totalNs += ns
+        if ns > self.maxNs:
+            self.maxNs = ns
+        self.buckets[min(ns.bit_length(), 63)] += 1
+
+    # *************************************************
+    def percentile(self, p):
+        """
+        An upper bound of the time taken by a fraction p of the calls, in
+        microseconds (the top of its histogram bucket)
+        """
+        wanted = p * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min((1 << bucket) - 1, self.maxNs) / 1000
+        return 0.0
+
+    # *************************************************
+    def summary(self):
+        """
+        Returns
+        -------
+        dictionary
+            "calls", "totalMs", "meanUs", "p50Us", "p99Us", "maxUs" and
+            "histogram" (bucket upper bound in nanoseconds -> calls).
+
+        """
+        return {"calls": self.calls,
+                "totalMs": self.totalNs / 1e6,
+                "meanUs": self.totalNs / self.calls / 1000 if self.calls else 0.0,
+                "p50Us": self.percentile(0.50),
+                "p99Us": self.percentile(0.99),
+                "maxUs": self.maxNs / 1000,
+                "histogram": {str((1 << bucket) - 1): count
+                              for bucket, count in enumerate(self.buckets) if count}}
+
+# name -> CallStats, kept across enable() and disable() until reset()
+_stats = {}
+# name -> (places where it was replaced, original function) of the enabled functions
+_enabled = {}
+_dumper = None
+
+# *****************************************************
+def timed(function, stats):
+    """
+    A version of function that records the time of each call in stats
+    """
+    clock = time.perf_counter_ns
+
+    @functools.wraps(function)
+    def timedFunction(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats.record(clock() - start)
+    return timedFunction
+
+# *****************************************************
+def _resolve(name):
+    # The owner (module or class) and attribute name of "module[.Class].function"
+    moduleName, *path = name.split(".")
+    __import__(moduleName)
+    owner = sys.modules[moduleName]
+    for attribute in path[:-1]:
+        owner = getattr(owner, attribute)
+    return owner, path[-1]
+
+# *****************************************************
+def enable(names=TARGETS):
+    """
+    Starts measuring functions
+
+    A function of a module is replaced in its module and in every loaded
+    module that imported it by name (e.g. "from saves import loadSave"),
+    so all the calls are measured. Modules imported later only see the
+    timed version if they import it from its own module.
+
+    Parameters
+    ----------
+    names : sequence of strings, optional
+        "module.function" or "module.Class.method". The default is TARGETS.
+
+    Returns
+    -------
+    None.
+
+    """
+    for name in names:
+        if name in _enabled:
+            continue
+        owner, attribute = _resolve(name)
+        original = getattr(owner, attribute)
+        stats = _stats.setdefault(name, CallStats())
+        replacement = timed(original, stats)
+        places = [(owner, attribute)]
+        if not isinstance(owner, type):
+            for module in list(sys.modules.values()):
+                if module is owner or module is None:
+                    continue
+                for other, value in list(vars(module).items()):
+                    if value is original:
+                        places.append((module, other))
+        for place, other in places:
+            setattr(place, other, replacement)
+        _enabled[name] = (places, original)
+
+# *****************************************************
+def disable():
+    """
+    Puts back the original functions (the measures are kept)
+    """
+    for places, original in _enabled.values():
+        for place, attribute in places:
+            setattr(place, attribute, original)
+    _enabled.clear()
+
+# *****************************************************
+def enabled():
+    return bool(_enabled)
+
+# *****************************************************
+def reset():
+    """
+    Forgets the measures made so far
+    """
+    for stats in _stats.values():
+        stats.__init__()
+
+# *****************************************************
+def report():
+    """
+    The measures made so far
+
+    Returns
+    -------
+    dictionary
+        "time" (when the report was made) and "functions", with the
+        CallStats.summary of each function called at least once.
+
+    """
+    return {"time": time.time(),
+            "functions": {name: stats.summary() for name, stats in _stats.items()
+                          if stats.calls}}
+
+# *****************************************************
+def dump(fileName):
+    """
+    Writes the report to a JSON file, replacing it in one step so that a
+    reader never finds half a report
+    """
+    temporary = fileName + ".tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(report(), file, indent=2)
+    os.replace(temporary, fileName)
+
+# *****************************************************
+def startDumping(fileName, every=10.0):
+    """
+    Writes the report to fileName every few seconds, in a background
+    thread, until stopDumping() (which writes it a last time)
+
+    Parameters
+    ----------
+    fileName : string
+        The JSON file to write.
+    every : float, optional
+        Seconds between two reports. The default is 10.0.
+
+    Returns
+    -------
+    None.
+
+    """
+    global _dumper
+    stopDumping()
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(every):
+            dump(fileName)
+        dump(fileName)
+    thread = threading.Thread(target=run, name="instrument-dump", daemon=True)
+    thread.start()
+    _dumper = (thread, stop)
+
+# *****************************************************
+def stopDumping():
+    global _dumper
+    if _dumper is not None:
+        thread, stop = _dumper
+        stop.set()
+        thread.join()
+        _dumper = None
+
+# *****************************************************
+def enableFromEnvironment(environ=None, every=10.0):
+    """
+    enable() and startDumping() if the variable ENVIRONMENT names a file
+
+    Returns
+    -------
+    bool
+        Whether measuring was started.
+
+    """
+    environ = os.environ if environ is None else environ
+    fileName = environ.get(ENVIRONMENT)
+    if not fileName:
+        return False
+    enable()
+    startDumping(fileName, every)
+    return True
@@ -0,0 +1,156 @@
+# *****************************************************
+class MoveJournal:
+    """
+    The moves made in a game, so they can be undone and redone.
+
+    Each entry is a tuple (source, destin, transfer, symbol) as seen by
+    doMove: the bottles involved, the quantity that was transferred and
+    the symbol that was poured. Entries before position have been made;
+    entries from position on have been undone and can be redone until a
+    new move is recorded.
+
+    undo and redo work on any game object with the methods
+    doMove(source, destin) and undoMove(source, destin, transfer), like
+    GameState (bottles identified by letters) or Board (by indexes), so
+    they never copy the bottles.
+    """
+
+    __slots__ = ("entries", "position")
+
+    def __init__(self):
+        self.entries = []
+        self.position = 0
+
+    def __len__(self):
+        return self.position
+
+    # *************************************************
+    def record(self, source, destin, transfer, symbol):
+        """
+        Records a move that was just made, dropping any undone moves
+
+        Parameters
+        ----------
+        source : string or int
+            The source bottle of the move.
+        destin : string or int
+            The destination bottle of the move.
+        transfer : int
+            The quantity returned by doMove.
+        symbol : string or int
+            The symbol (or color code) that was poured.
+
+        Returns
+        -------
+        None.
+
+        """
+        del self.entries[self.position:]
+        self.entries.append((source, destin, transfer, symbol))
+        self.position += 1
+
+    # *************************************************
+    def undo(self, game, howMany=1):
+        """
+        Undoes the last howMany moves (or as many as there are)
+
+        Parameters
+        ----------
+        game : GameState or Board
+            The game the moves were made on.
+        howMany : int, optional
+            The number of moves to undo. The default is 1.
+
+        Returns
+        -------
+        int
+            The number of moves actually undone.
+
+        """
+        done = 0
+        while done < howMany and self.position > 0:
+            self.position -= 1
+            source, destin, transfer, _ = self.entries[self.position]
+            game.undoMove(source, destin, transfer)
+            done += 1
+        return done
+
+    # *************************************************
+    def redo(self, game, howMany=1):
+        """
+        Makes again the last howMany undone moves (or as many as there are)
+
+        Parameters
+        ----------
+        game : GameState or Board
+            The game the moves were made on.
+        howMany : int, optional
+            The number of moves to redo. The default is 1.
+
+        Returns
+        -------
+        int
+            The number of moves actually redone.
+
+        """
+        done = 0
+        while done < howMany and self.position < len(self.entries):
+            source, destin, _, _ = self.entries[self.position]
+            game.doMove(source, destin)
+            self.position += 1
+            done += 1
+        return done
+
+    # *************************************************
+    def checkpoint(self):
+        """
+        A mark of the current position, to be used with rollback
+
+        Returns
+        -------
+        int
+            The number of moves made so far.
+
+        """
+        return self.position
+
+    # *************************************************
+    def rollback(self, game, checkpoint):
+        """
+        Undoes every move made after the checkpoint and forgets them
+
+        Parameters
+        ----------
+        game : GameState or Board
+            The game the moves were made on.
+        checkpoint : int
+            A value returned by checkpoint().
+
+        Returns
+        -------
+        None.
+
+        """
+        self.undo(game, self.position - checkpoint)
+        self.truncate()
+
+    # *************************************************
+    def truncate(self, keep=None):
+        """
+        Forgets the undone moves, and the oldest moves beyond keep
+
+        Parameters
+        ----------
+        keep : int, optional
+            How many of the last made moves can still be undone.
+            The default is None (all of them).
+
+        Returns
+        -------
+        None.
+
+        """
+        del self.entries[self.position:]
+        if keep is not None and self.position > keep:
+            del self.entries[:self.position - keep]
+            self.position = keep
@@ -0,0 +1,173 @@
+"""
+Plays many games at once against the game server, to measure how many
+requests it answers per second and how long each one waits.
+
+Examples:
+    python loadtest.py --sessions 2000              # starts its own server
+    python loadtest.py --sessions 2000 --port 7777  # against a running server
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from collections import Counter
+
+import functions as funcs
+from server import GameServer, percentiles
+
+# *****************************************************
+async def request(reader, writer, line, latencies):
+    # Sends one request and waits for its answer
+    start = time.perf_counter()
+    writer.write(line.encode('utf-8') + b"\n")
+    answer = json.loads(await reader.readline())
+    latencies.append(time.perf_counter() - start)
+    return answer
+
+# *****************************************************
+async def playSession(connect, rng, nrBotts, botSize, expert, slips, maxMoves, saves,
+                      latencies, outcomes):
+    """
+    Plays one game over its own connection with random moves
+
+    Parameters
+    ----------
+    connect : function
+        Opens a connection, returning (reader, writer).
+    rng : random.Random
+        Chooses the moves.
+    nrBotts, botSize, expert : int
+        The shape of the game.
+    slips : float
+        The chance of a move picked without looking (maybe an error).
+    maxMoves : int
+        The game is left after this many moves.
+    saves : float
+        The chance that the game is saved and loaded again before leaving.
+    latencies : list
+        The seconds each request waited are added to it.
+    outcomes : Counter
+        The status the game ended with is counted in it.
+
+    Returns
+    -------
+    None.
+
+    """
+    reader, writer = await connect()
+    try:
+        answer = await request(reader, writer, f"NEW {nrBotts} {botSize} {expert}",
+                               latencies)
+        if not answer["ok"]:
+            raise RuntimeError(answer["error"])
+        bottles = answer["bottles"]
+        letters = list(bottles)
+        moves = 0
+        while answer["status"] == "playing" and moves < maxMoves:
+            if rng.random() < slips:
+                source, destin = rng.sample(letters, 2)
+            else:
+                legal = [(s, d) for s in letters for d in letters
+                         if s != d and funcs.moveIsPossible(botSize, s, d, bottles)]
+                if not legal:
+                    break
+                source, destin = rng.choice(legal)
+            answer = await request(reader, writer, f"MOVE {source} {destin}", latencies)
+            if answer.get("transfer"):
+                funcs.doMove(botSize, source, destin, bottles)
+            moves += 1
+        outcomes[answer.get("status", "error")] += 1
+        if rng.random() < saves:
+            player = f"load{rng.getrandbits(48):x}"
+            await request(reader, writer, f"SAVE {player}", latencies)
+            await request(reader, writer, f"LOAD {player}", latencies)
+        await request(reader, writer, "QUIT", latencies)
+    finally:
+        writer.close()
+
+# *****************************************************
+async def loadTest(nrSessions, host="127.0.0.1", port=None, path=None, nrBotts=10,
+                   botSize=8, expert=2, slips=0.05, maxMoves=200, saves=0.01, seed=0):
+    """
+    Plays nrSessions games at the same time and measures the answers
+
+    Parameters
+    ----------
+    nrSessions : int
+        The number of games (and connections) at the same time.
+    host, port, path : optional
+        Where the server listens (path for a Unix socket). Without port or
+        path, a GameServer is started in this process, saving its games
+        in a temporary folder.
+    nrBotts, botSize, expert, slips, maxMoves, saves, seed : optional
+        How the games are played (see playSession).
+
+    Returns
+    -------
+    dictionary
+        "sessions", "requests", "seconds", "requestsPerSec", "outcomes",
+        the latencies seen by the clients (see server.percentiles) and,
+        with a server of its own, "server" (see GameServer.stats).
+
+    """
+    rng = random.Random(seed)
+    latencies = []
+    outcomes = Counter()
+    server = listener = folder = None
+    if port is None and path is None:
+        folder = tempfile.TemporaryDirectory()
+        server = GameServer(folder.name)
+        listener = await server.start(host, 0)
+        port = listener.sockets[0].getsockname()[1]
+
+    async def connect():
+        if path is not None:
+            return await asyncio.open_unix_connection(path, limit=1 << 20)
+        return await asyncio.open_connection(host, port, limit=1 << 20)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(playSession(connect, random.Random(rng.getrandbits(64)),
+                                           nrBotts, botSize, expert, slips, maxMoves,
+                                           saves, latencies, outcomes)
+                               for _ in range(nrSessions)))
+    finally:
+        seconds = time.perf_counter() - start
+        if listener is not None:
+            listener.close()
+            await listener.wait_closed()
+            server.close()
+            folder.cleanup()
+    report = dict(sessions=nrSessions, requests=len(latencies), seconds=seconds,
+                  requestsPerSec=len(latencies) / seconds if seconds else 0.0,
+                  outcomes=dict(outcomes), **percentiles(latencies))
+    if server is not None:
+        report["server"] = server.stats()
+    return report
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Play many games at once against the server.")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None,
+                        help="the port of a running server (default: start one)")
+    parser.add_argument("--unix", dest="path", help="the Unix socket of a running server")
+    parser.add_argument("--bottles", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--expert", type=int, default=2)
+    parser.add_argument("--slips", type=float, default=0.05)
+    parser.add_argument("--max-moves", type=int, default=200)
+    parser.add_argument("--saves", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = asyncio.run(loadTest(args.sessions, args.host, args.port, args.path,
+                                  args.bottles, args.capacity, args.expert, args.slips,
+                                  args.max_moves, args.saves, args.seed))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
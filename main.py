@@ -1,67 +1,166 @@
+import argparse
+import os
+import sys
+
 import functions as funcs
+import instrument
+from batch import batch
+from deadend import DeadEndDetector
+from gamesession import MAX_ERRORS, GameSession
+from hints import HintService
+from movelog import MoveLog, replayLog, unfinishedLogs
+from render import Renderer
+
+# Values given here replace those of the configuration file for new games
+parser = argparse.ArgumentParser(description="Water Sort Puzzle Bottle Game")
+parser.add_argument("--capacity", type=int, dest="botSize")
+parser.add_argument("--bottles", type=int, dest="nrBotts")
+parser.add_argument("--symbols")
+parser.add_argument("--letters")
+parser.add_argument("--expertise")
+# Plays again the game of a puzzle ID shown when a new game starts
+parser.add_argument("--puzzle", dest="puzzleId")
+# Plays a level of a puzzle pack written by buildpack.py
+parser.add_argument("--pack", dest="packFile")
+parser.add_argument("--level", type=int)
+# Counts and times the main functions, writing the measures to a file
+parser.add_argument("--instrument", dest="instrumentFile")
+# Plays the games of a script of moves (- for the standard input) without
+# prompts or delays, writing their results as JSON lines (see batch.py)
+parser.add_argument("--batch", dest="batchFile")
+parser.add_argument("--output", dest="outputFile")
+overrides = {name: value for name, value in vars(parser.parse_args()).items()
+             if value is not None}
+puzzleId = overrides.pop("puzzleId", None)
+packFile = overrides.pop("packFile", None)
+level = overrides.pop("level", 0)
+instrumentFile = overrides.pop("instrumentFile", None)
+batchFile = overrides.pop("batchFile", None)
+outputFile = overrides.pop("outputFile", None)
+if instrumentFile is not None:
+    instrument.enable()
+    instrument.startDumping(instrumentFile)
+else:
+    instrument.enableFromEnvironment()
 
-while True:
+if batchFile is not None:
+    batch(batchFile, outputFile, 'cfg.newGame.txt', overrides)
+    instrument.stopDumping()
+    sys.exit()
+
+infoGame = None
+# A session log left behind means the last game did not end normally
+logs = unfinishedLogs()
+if logs:
+    recover = funcs.askUserFor("An unfinished game was found. Recover it? (YES,NO) ",
+                               ['YES', 'NO'], '')
+    if recover == "YES":
+        try:
+            infoGame = replayLog(logs[0])
+        except (ValueError, OSError) as e:
+            print(f"The game could not be recovered: {e}")
+    # Recovered or not, the logs are not offered again
+    for fileName in logs:
+        os.remove(fileName)
+
+while infoGame is None:
     option = input("1 - New game \n2 - Load Game\n3 - Options\n\n")
     print()  # Just to skip one line
 
     if option == "1":
         """ Read some of the information about a new game from a config file, and
             build the missing information accordingly"""
-        infoGame = funcs.newGameInfo('cfg.newGame.txt')
-        break
+        infoGame = funcs.newGameInfo('cfg.newGame.txt', overrides, puzzleId,
+                                     packFile, level)
     elif option == "2":
         """ Read all the information about an old game from a file"""
         # Our program will locate all saved files and allow the player to choose
         # among them without needing to type the desired file name.
+        # None if the save could not be loaded: back to the menu
         infoGame = funcs.oldGameInfo()
-        break
     elif option == "3":
         funcs.config()
     else:
         print("You didn't type it correctly.")
 
 # infoGame is a tuple with several different values??    
-botSize, nrBotts, expertise, nrErrors, fullBottles, bottles = infoGame
+botSize, nrBotts, expertise, nrErrors, fullBottles, bottles, puzzleId = infoGame
+# The rules of the game: '<' undoes the last move, '>' redoes it and '?' suggests
+# a move; the game ends as soon as it can no longer be won, and every move is
+# logged so that the game can be recovered after a crash
+session = GameSession.fromInfo(infoGame, hints=HintService(),
+                               deadEnds=DeadEndDetector(maxNodes=5000, maxSeconds=0.05),
+                               log=MoveLog.create(botSize, nrBotts, expertise, nrErrors,
+                                                  bottles, puzzleId=puzzleId))
+fullBottles = session.fullBottles
+
+def askSource():
+    # A bottle letter or one of the commands (+ and - only with several pages)
+    if renderer.nrPages > 1:
+        return funcs.askUserFor("Source bottle? (Z to leave game, < undo, > redo, ? hint, "
+                                "+/- page) ",
+                                list(bottles.keys()) + ['<', '>', '?', '+', '-'], 'Z')
+    return funcs.askUserFor("Source bottle? (Z to leave game, < undo, > redo, ? hint) ",
+                            list(bottles.keys()) + ['<', '>', '?'], 'Z')
 
 endGame = False
-funcs.showBottles(bottles, botSize, nrErrors)
-source = funcs.askUserFor("Source bottle? ", bottles.keys())
+renderer = Renderer(botSize)
+renderer.render(bottles, nrErrors)
+source = askSource()
 # Let's play the game
 while not endGame and not source == 'Z':
-    destin = funcs.askUserFor("Destination bottle? ", bottles.keys())
-    if funcs.moveIsPossible(botSize, source, destin, bottles):
-        funcs.doMove(botSize, source, destin,bottles)
-        funcs.showBottles(bottles, botSize, nrErrors)
-        if funcs.full(bottles[destin], botSize):
-            fullBottles += 1
+    if source == '?':
+        hint = session.hint()
+        if hint is None:
+            print("No winning move from here, try undoing some moves.")
+        else:
+            print(f"Hint: pour {hint[0]} into {hint[1]}")
+    elif source == '+' or source == '-':
+        # Only offered when the bottles do not fit on one screen
+        renderer.turnPage(1 if source == '+' else -1)
+        renderer.render(bottles, nrErrors)
+    elif source == '<' or source == '>':
+        changed = session.undo() if source == '<' else session.redo()
+        if changed:
+            renderer.render(bottles, nrErrors)
+        else:
+            print("Nothing to " + ("undo!" if source == '<' else "redo!"))
     else:
-        print("Error!")
-        nrErrors += 1
-    endGame = funcs.allBottlesFull(nrBotts, fullBottles, expertise) or \
-              nrErrors == 3
+        destin = funcs.askUserFor("Destination bottle? ", bottles.keys())
+        if session.move(source, destin):
+            renderer.render(bottles, nrErrors, (source, destin))
+        else:
+            print("Error!")
+            nrErrors = session.nrErrors
+    fullBottles = session.fullBottles
+    endGame = session.over()
               
     if not endGame:
-        source = funcs.askUserFor("Source bottle? (Z to leave game) ",
-                                  bottles.keys(), 'Z')
+        source = askSource()
 """
 End of game may have happened either because the user filled all the bottles he
-was supposed to, or he made 3 errors, or he gave up playing (by inputing 
-the letter 'Z'' for the source) 
+was supposed to, or he made 3 errors, or the game could no longer be won, or he
+gave up playing (by inputing the letter 'Z'' for the source) 
 """        
+session.close(remove=True)
 if source == 'Z':
     store = funcs.askUserFor("\nWant to store the game for future playing? (YES,NO) ",
                              ['YES', 'NO'], '')
     if store == "YES":
         # FileName will be defined in writeGameInfo() to simplify user experience
-        funcs.writeGameInfo(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles)
+        funcs.writeGameInfo(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles,
+                            puzzleId)
         print("Hope to see you again soon!")
     else:
         print("Better luck next time!")
 else:
     print("Full bottles =", fullBottles, "  Errors =", nrErrors)
-    if nrErrors >= 3:
+    if session.deadEnd:
+        print("No more moves can win this game. Better luck next time!")
+    elif nrErrors >= MAX_ERRORS:
         print("Better luck next time!")
     else:
         print("CONGRATULATIONS!!")
 
 print()
+instrument.stopDumping()
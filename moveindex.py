@@ -0,0 +1,113 @@
+from board import EMPTY
+
+# *****************************************************
+class MoveIndex:
+    """
+    The legal moves of a Board, kept up to date move by move.
+
+    Bottles are indexed by their top color: open[code] has the bottles
+    with that top and free space, closed[code] the full bottles with that
+    top that are not complete yet, and empty the empty bottles. A move of
+    color code can only go from open[code] or closed[code] into
+    open[code] or an empty bottle, so the moves are listed without
+    looking at any other pair of bottles. Each move only reindexes the
+    two bottles it touches.
+
+    Moves that cannot be part of a shortest solution are left out: moves
+    out of a complete bottle (which are never indexed), moves that pour a
+    bottle holding a single run into an empty one, and moves into any
+    empty bottle but the first (all empty bottles are alike).
+    """
+
+    __slots__ = ("board", "open", "closed", "empty", "single", "where")
+
+    def __init__(self, board):
+        self.board = board
+        nrCodes = max(board.cells, default=EMPTY) + 1
+        self.open = [set() for _ in range(nrCodes)]
+        self.closed = [set() for _ in range(nrCodes)]
+        self.empty = set()
+        # single[bottle]: does the bottle hold a single run?
+        self.single = bytearray(board.nrBotts)
+        # where[bottle]: the set the bottle is in (None if complete)
+        self.where = [None] * board.nrBotts
+        for bottle in range(board.nrBotts):
+            self._place(bottle)
+
+    # *************************************************
+    def _place(self, bottle):
+        board = self.board
+        height = board.heights[bottle]
+        if height == 0:
+            group = self.empty
+            self.single[bottle] = False
+        else:
+            code = board.cells[bottle * board.botSize + height - 1]
+            single = board.topRun(bottle) == height
+            self.single[bottle] = single
+            if height < board.botSize:
+                group = self.open[code]
+            elif single:
+                group = None
+            else:
+                group = self.closed[code]
+        if group is not None:
+            group.add(bottle)
+        self.where[bottle] = group
+
+    # *************************************************
+    def _reindex(self, source, destin):
+        where = self.where
+        if where[source] is not None:
+            where[source].discard(source)
+        if where[destin] is not None:
+            where[destin].discard(destin)
+        self._place(source)
+        self._place(destin)
+
+    # *************************************************
+    def legalMoves(self):
+        """
+        The moves that may be part of a shortest solution
+
+        Returns
+        -------
+        list of tuples (source, destin) of bottle indexes
+
+        """
+        moves = []
+        firstEmpty = min(self.empty) if self.empty else None
+        single = self.single
+        for code in range(1, len(self.open)):
+            destins = self.open[code]
+            for group in (destins, self.closed[code]):
+                for source in group:
+                    for destin in destins:
+                        if destin != source:
+                            moves.append((source, destin))
+                    if firstEmpty is not None and not single[source]:
+                        moves.append((source, firstEmpty))
+        return moves
+
+    # *************************************************
+    def doMove(self, source, destin):
+        """
+        Board.doMove, keeping the index up to date
+
+        Returns
+        -------
+        int
+            The quantity of "liquid" that was transferred.
+
+        """
+        transfer = self.board.doMove(source, destin)
+        self._reindex(source, destin)
+        return transfer
+
+    # *************************************************
+    def undoMove(self, source, destin, transfer):
+        """
+        Board.undoMove, keeping the index up to date
+        """
+        self.board.undoMove(source, destin, transfer)
+        self._reindex(source, destin)
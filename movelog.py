@@ -0,0 +1,369 @@
+import glob
+import json
+import os
+import struct
+import time
+
+import functions as funcs
+
+MAGIC = b"WSPLOG1\n"
+# Games with more than 256 bottles store each bottle index in 2 bytes
+WIDE_MAGIC = b"WSPLOG2\n"
+LOG_PATTERN = "session-*.wsplog"
+MOVE = ord("M")
+UNDO = ord("U")
+ERROR = ord("E")
+SNAPSHOT = ord("S")
+SNAPSHOT_EVERY = 50
+
+# *****************************************************
+class MoveLog:
+    """
+    An append-only log of a game session, to recover it after a crash.
+
+    The file starts with MAGIC and a snapshot of the initial game; then
+    each move adds 3 bytes ("M", source, destin as bottle indexes), each
+    undo 4 bytes ("U", source, destin, transfer) and each error 1 byte
+    ("E"). With more than 256 bottles the file starts with WIDE_MAGIC
+    instead and bottle indexes take 2 bytes (little-endian). Every
+    SNAPSHOT_EVERY records a new snapshot ("S", 4 byte length, JSON with
+    the bottles and the number of errors) is appended, so recovery only
+    replays the records after the last one. Records are flushed as they
+    are written, so saving costs the same for every move.
+    """
+
+    __slots__ = ("fileName", "file", "indexes", "sinceSnapshot", "pair")
+
+    def __init__(self, fileName, labels):
+        self.fileName = fileName
+        self.file = open(fileName, 'ab')
+        self.indexes = {label: i for i, label in enumerate(labels)}
+        self.sinceSnapshot = 0
+        # Packs the two bottle indexes of a record
+        self.pair = struct.Struct("<HH" if len(labels) > 256 else "<BB").pack
+
+    # *************************************************
+    @classmethod
+    def create(cls, botSize, nrBotts, expertise, nrErrors, bottles, folder=".",
+               puzzleId=None):
+        """
+        Starts the log of a new session
+
+        Parameters
+        ----------
+        botSize, nrBotts, expertise, nrErrors : int
+            The game information, as returned by functions.newGameInfo.
+        bottles : dictionary
+            Keys are strings and values are lists.
+        folder : string, optional
+            Where to write the log. The default is the current folder.
+        puzzleId : string, optional
+            The ID of the game (see puzzleid). The default is None.
+
+        Returns
+        -------
+        MoveLog
+
+        """
+        fileName = os.path.join(folder, f"session-{time.time_ns()}.wsplog")
+        with open(fileName, 'wb') as file:
+            file.write(WIDE_MAGIC if len(bottles) > 256 else MAGIC)
+        log = cls(fileName, list(bottles.keys()))
+        log.snapshot(bottles, nrErrors, {"botSize": botSize, "nrBotts": nrBotts,
+                                         "expertise": expertise, "puzzleId": puzzleId})
+        return log
+
+    # *************************************************
+    def _append(self, record, bottles=None, nrErrors=0):
+        self.file.write(record)
+        self.sinceSnapshot += 1
+        if bottles is not None and self.sinceSnapshot >= SNAPSHOT_EVERY:
+            self.snapshot(bottles, nrErrors)
+        else:
+            self.file.flush()
+
+    # *************************************************
+    def move(self, source, destin, bottles=None, nrErrors=0):
+        """
+        Logs a move (or a redo)
+
+        Parameters
+        ----------
+        source, destin : string
+            The letters of the bottles.
+        bottles : dictionary, optional
+            The bottles after the move; when given, a snapshot is taken
+            if it is time for one.
+        nrErrors : int, optional
+            The number of errors, for the snapshot.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._append(bytes((MOVE,)) + self.pair(self.indexes[source], self.indexes[destin]),
+                     bottles, nrErrors)
+
+    # *************************************************
+    def undo(self, source, destin, transfer, bottles=None, nrErrors=0):
+        """
+        Logs the undoing of a move (see move for the parameters)
+        """
+        self._append(bytes((UNDO,)) + self.pair(self.indexes[source], self.indexes[destin]) +
+                     bytes((transfer,)), bottles, nrErrors)
+
+    # *************************************************
+    def error(self):
+        """
+        Logs an error of the user
+        """
+        self._append(bytes((ERROR,)))
+
+    # *************************************************
+    def snapshot(self, bottles, nrErrors, extra=None):
+        """
+        Appends the whole state of the game and forces it to disk
+
+        Parameters
+        ----------
+        bottles : dictionary
+            Keys are strings and values are lists.
+        nrErrors : int
+            The number of errors the user already made.
+        extra : dictionary, optional
+            More values to store (the first snapshot has the game size).
+
+        Returns
+        -------
+        None.
+
+        """
+        state = {"bottles": bottles, "nrErrors": nrErrors}
+        if extra:
+            state.update(extra)
+        data = json.dumps(state).encode('utf-8')
+        self.file.write(bytes((SNAPSHOT,)) + struct.pack("<I", len(data)) + data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.sinceSnapshot = 0
+
+    # *************************************************
+    def close(self, remove=False):
+        """
+        Closes the log, removing it if the session ended normally
+        """
+        self.file.close()
+        if remove:
+            os.remove(self.fileName)
+
+# *****************************************************
+def scanLog(data):
+    """
+    Finds the snapshots of a log and where its valid records end
+
+    A record cut short at the end of the data (the program stopped while
+    writing it) is left out.
+
+    Parameters
+    ----------
+    data : bytes
+        The contents of a log file.
+
+    Returns
+    -------
+    first : dictionary
+        The first snapshot, with the size of the game.
+    last : dictionary
+        The last snapshot.
+    start : int
+        The byte where the records after the last snapshot start.
+    end : int
+        The byte where the valid records end.
+
+    """
+    if data.startswith(MAGIC):
+        pair = 2
+    elif data.startswith(WIDE_MAGIC):
+        pair = 4
+    else:
+        raise ValueError("not a session log")
+    i = len(MAGIC)
+    size = len(data)
+    first = last = None
+    start = i
+    while i < size:
+        kind = data[i]
+        if kind == MOVE:
+            length = 1 + pair
+        elif kind == UNDO:
+            length = 2 + pair
+        elif kind == ERROR:
+            length = 1
+        elif kind == SNAPSHOT:
+            if i + 5 > size:
+                break
+            length = 5 + struct.unpack_from("<I", data, i + 1)[0]
+        else:
+            raise ValueError(f"unknown record at byte {i}")
+        if i + length > size:
+            break
+        if kind == SNAPSHOT:
+            last = json.loads(data[i + 5 : i + length])
+            if first is None:
+                first = last
+            start = i + length
+        i += length
+    if first is None:
+        raise ValueError("the log has no snapshot")
+    return first, last, start, i
+
+# *****************************************************
+def replayLog(fileName):
+    """
+    Rebuilds the game of a session log
+
+    The bottles of the last snapshot are replayed with the records after
+    it (see replay), without printing or checking anything.
+
+    Parameters
+    ----------
+    fileName : string
+
+    Returns
+    -------
+    tuple
+        (botSize, nrBotts, expertise, nrErrors, fullBottles, bottles,
+        puzzleId), as returned by functions.newGameInfo.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a session log or is damaged.
+    OSError
+        If the file cannot be read.
+
+    """
+    with open(fileName, 'rb') as file:
+        data = file.read()
+    first, last, start, end = scanLog(data)
+    try:
+        botSize = first["botSize"]
+        bottles = last["bottles"]
+        nrErrors = replay(bottles, botSize, data, start, end, last["nrErrors"])
+        fullBottles = sum(1 for content in bottles.values() if funcs.full(content, botSize))
+        return (botSize, first["nrBotts"], first["expertise"], nrErrors, fullBottles, bottles,
+                first.get("puzzleId"))
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ValueError(f"the log is damaged ({e!r})") from None
+
+# *****************************************************
+def replay(bottles, botSize, data, start, end, nrErrors=0):
+    """
+    Applies the move, undo and error records in data[start:end] to bottles
+
+    Each bottle is replayed as a stack of runs ([symbol, length] from the
+    bottom up), so a move or an undo only moves one run whatever the size
+    of the game (millions of records per second). Records that pour a
+    bottle into itself change nothing (the game never logs them).
+
+    Parameters
+    ----------
+    bottles : dictionary
+        Keys are strings and values are lists; changed in place.
+    botSize : int
+        The capacity of bottles.
+    data : bytes
+        The contents of a log file.
+    start, end : int
+        As returned by scanLog; there must be no snapshot in between.
+    nrErrors : int, optional
+        The errors already made. The default is 0.
+
+    Returns
+    -------
+    int
+        The number of errors at the end.
+
+    """
+    stacks = []
+    heights = []
+    for content in bottles.values():
+        runs = []
+        for symbol in content:
+            if runs and runs[-1][0] == symbol:
+                runs[-1][1] += 1
+            else:
+                runs.append([symbol, 1])
+        stacks.append(runs)
+        heights.append(len(content))
+    if data.startswith(WIDE_MAGIC):
+        pair = struct.Struct("<HH").unpack_from
+        width = 5
+    else:
+        pair = struct.Struct("<BB").unpack_from
+        width = 3
+    i = start
+    while i < end:
+        kind = data[i]
+        if kind == ERROR:
+            nrErrors += 1
+            i += 1
+            continue
+        source, destin = pair(data, i + 1)
+        i += width
+        if kind == MOVE:
+            if source == destin:
+                continue
+            sourceRuns = stacks[source]
+            top = sourceRuns[-1]
+            room = botSize - heights[destin]
+            transfer = top[1]
+            if transfer > room:
+                transfer = room
+                top[1] -= room
+            else:
+                sourceRuns.pop()
+            destRuns = stacks[destin]
+        else:
+            # An undo: the run goes back from destin to source
+            transfer = data[i]
+            i += 1
+            if source == destin:
+                continue
+            sourceRuns = stacks[destin]
+            top = sourceRuns[-1]
+            if top[1] == transfer:
+                sourceRuns.pop()
+            else:
+                top[1] -= transfer
+            destRuns = stacks[source]
+            source, destin = destin, source
+        symbol = top[0]
+        if destRuns and destRuns[-1][0] == symbol:
+            destRuns[-1][1] += transfer
+        else:
+            destRuns.append([symbol, transfer])
+        heights[source] -= transfer
+        heights[destin] += transfer
+    for content, runs in zip(bottles.values(), stacks):
+        content[:] = [symbol for symbol, length in runs for _ in range(length)]
+    return nrErrors
+
+# *****************************************************
+def unfinishedLogs(folder="."):
+    """
+    The session logs left by games that did not end, newest first
+
+    Parameters
+    ----------
+    folder : string, optional
+        The default is the current folder.
+
+    Returns
+    -------
+    list of strings
+
+    """
+    return sorted(glob.glob(os.path.join(folder, LOG_PATTERN)),
+                  key=os.path.getmtime, reverse=True)
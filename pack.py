@@ -0,0 +1,170 @@
+"""
+Puzzle packs: many levels in one binary file, any of which is read
+without reading the others. Packs are written by buildpack.py.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from board import Board, MAX_BYTE_COLORS
+
+PACK_MAGIC = b"WSPPACK1"
+# magic, number of levels
+HEADER = struct.Struct("<8sI")
+# Offset of each level from the start of the file, plus the end of the last one
+OFFSET = struct.Struct("<Q")
+# nrBotts, botSize, expert of a level
+SHAPE = struct.Struct("<HHH")
+
+# *****************************************************
+def encodeLevel(board, expert):
+    """
+    The bytes of one level of a pack
+
+    A level is its SHAPE, the height of each bottle (one byte each) and
+    then the color codes of the filled cells only, bottle after bottle,
+    one byte each (two bytes, little endian, with more than
+    MAX_BYTE_COLORS colors).
+
+    Parameters
+    ----------
+    board : Board
+        The game of the level.
+    expert : int
+        The number of bottles that end empty.
+
+    Returns
+    -------
+    bytes
+
+    """
+    botSize = board.botSize
+    cells = board.cells
+    filled = cells[:0]
+    for bottle, height in enumerate(board.heights):
+        filled += cells[bottle * botSize : bottle * botSize + height]
+    if isinstance(filled, array) and sys.byteorder == "big":
+        filled.byteswap()
+    return SHAPE.pack(board.nrBotts, botSize, expert) + bytes(board.heights) + \
+           (filled.tobytes() if isinstance(filled, array) else bytes(filled))
+
+# *****************************************************
+class PuzzlePack:
+    """
+    A puzzle pack opened for reading.
+
+    The file is memory-mapped: opening it only reads the header, and
+    level k is found in the offset table that follows it, so reading a
+    level touches only its own bytes whatever the size of the pack.
+
+    Layout: HEADER, then (count + 1) OFFSETs, then the levels (see
+    encodeLevel) one after the other.
+    """
+
+    __slots__ = ("fileName", "file", "data", "count")
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.file = open(fileName, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            self.file.close()
+            raise ValueError(f"{fileName} is not a puzzle pack") from None
+        magic, self.count = HEADER.unpack_from(self.data) \
+            if len(self.data) >= HEADER.size else (None, 0)
+        if magic != PACK_MAGIC or \
+           len(self.data) < HEADER.size + (self.count + 1) * OFFSET.size:
+            self.close()
+            raise ValueError(f"{fileName} is not a puzzle pack")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # *************************************************
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    # *************************************************
+    def _level(self, level):
+        # The start and end of a level in the file
+        if not 0 <= level < self.count:
+            raise IndexError(f"{self.fileName} has levels 0 to {self.count - 1}")
+        position = HEADER.size + level * OFFSET.size
+        return OFFSET.unpack_from(self.data, position)[0], \
+               OFFSET.unpack_from(self.data, position + OFFSET.size)[0]
+
+    # *************************************************
+    def shape(self, level):
+        """
+        The shape of a level
+
+        Returns
+        -------
+        tuple
+            (nrBotts, botSize, expert).
+
+        """
+        return SHAPE.unpack_from(self.data, self._level(level)[0])
+
+    # *************************************************
+    def board(self, level, letters, symbols):
+        """
+        The game of a level
+
+        Parameters
+        ----------
+        level : int
+            From 0 to len(self) - 1.
+        letters : sequence of strings
+            The letters that identify bottles.
+        symbols : sequence of strings
+            The symbols that color codes 1, 2, ... stand for.
+
+        Returns
+        -------
+        Board
+
+        Raises
+        ------
+        IndexError
+            If the pack has no such level.
+
+        """
+        start, end = self._level(level)
+        nrBotts, botSize, expert = SHAPE.unpack_from(self.data, start)
+        nrColors = nrBotts - expert
+        board = Board(botSize, nrBotts, list(letters[:nrBotts]), list(symbols[:nrColors]))
+        start += SHAPE.size
+        board.heights[:] = self.data[start : start + nrBotts]
+        start += nrBotts
+        if nrColors > MAX_BYTE_COLORS:
+            filled = array('H')
+            filled.frombytes(self.data[start : end])
+            if sys.byteorder == "big":
+                filled.byteswap()
+        else:
+            filled = self.data[start : end]
+        cells = board.cells
+        taken = 0
+        for bottle, height in enumerate(board.heights):
+            cells[bottle * botSize : bottle * botSize + height] = filled[taken : taken + height]
+            taken += height
+        return board
+
+    # *************************************************
+    def bottles(self, level, letters, symbols):
+        """
+        The dictionary of bottles of a level, as built by
+        functions.buildGameBottles
+        """
+        return self.board(level, letters, symbols).toBottles()
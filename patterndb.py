@@ -0,0 +1,368 @@
+"""
+Pattern databases: lower bounds on the moves that win a game, computed
+once per bottle capacity and stored on disk for the solver.
+
+Example:
+    python patterndb.py --capacities 4 5 6 7 8 9 10 11 12
+
+Each color is looked at alone. Moves of the other colors are free and
+their cells can always be put out of the way, so all that is left of a
+color c is, for each bottle holding c, the lengths of its runs of c from
+the bottom up and whether other colors lie below them (the pattern of
+c, see colorPattern). Every real move pours a single color, and what it
+does to that color is also a move between patterns, so the fewest
+pattern moves that gather c in one bottle is never more than the moves
+of c in any real solution: the sum over the colors is a lower bound of
+the whole solution (an additive pattern database). It is at least the
+bound of the runs (runs - colors), and larger when runs of a color lie
+on top of each other or bottles are too full to take them.
+
+The patterns of a color depend on the capacity only, so one table per
+capacity serves games of any number of bottles. Tables are open
+addressing hash tables of 8 byte pattern hashes and 1 byte distances,
+memory-mapped and read only where a pattern is looked up.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+PDB_MAGIC = b"WSPPDB1\n"
+# magic, capacity, number of patterns, number of slots (a power of 2)
+PDB_HEADER = struct.Struct("<8sHII")
+# The distance of patterns that can never be gathered in one bottle
+UNREACHABLE = 255
+PDB_FOLDER = "patterns"
+
+# *****************************************************
+def colorPattern(board, code):
+    """
+    The pattern of one color on a Board
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles.
+    code : int
+        The color code.
+
+    Returns
+    -------
+    tuple
+        One (below, runs) per bottle holding the color, sorted: below is
+        True if other colors lie below its lowest run, runs the lengths of
+        its runs from the bottom up. Other colors above the top run are
+        left out.
+
+    """
+    botSize = board.botSize
+    cells = board.cells
+    bottles = []
+    for bottle, height in enumerate(board.heights):
+        content = cells[bottle * botSize : bottle * botSize + height]
+        if code not in content:
+            continue
+        runs = []
+        previous = False
+        for cell in content:
+            if cell == code:
+                if previous:
+                    runs[-1] += 1
+                else:
+                    runs.append(1)
+                previous = True
+            else:
+                previous = False
+        bottles.append((content[0] != code, tuple(runs)))
+    bottles.sort()
+    return tuple(bottles)
+
+# *****************************************************
+def patternHash(pattern):
+    """
+    The key of a pattern in a table: 8 bytes of its hash, never 0
+    """
+    data = bytearray()
+    for below, runs in pattern:
+        data.append(below)
+        data.extend(runs)
+        data.append(0)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") or 1
+
+# *****************************************************
+def bottlePatterns(botSize):
+    # Every (below, runs) a bottle can hold: each run but the lowest one
+    # has other colors below it, so they take at least one cell each
+    found = []
+
+    def compose(total, runs):
+        if total == 0:
+            for below in (False, True):
+                if sum(runs) + len(runs) - 1 + below <= botSize:
+                    found.append((below, tuple(runs)))
+            return
+        for run in range(1, total + 1):
+            compose(total - run, runs + [run])
+    for cells in range(1, botSize + 1):
+        compose(cells, [])
+    found.sort()
+    return found
+
+# *****************************************************
+def allPatterns(botSize):
+    """
+    Every pattern of a color for a capacity (botSize cells of the color)
+
+    Returns
+    -------
+    list of tuples
+        As returned by colorPattern, in increasing order.
+
+    """
+    choices = bottlePatterns(botSize)
+    weights = [sum(runs) for _, runs in choices]
+    patterns = []
+    chosen = []
+
+    def choose(first, left):
+        if left == 0:
+            patterns.append(tuple(chosen))
+            return
+        for index in range(first, len(choices)):
+            if weights[index] <= left:
+                chosen.append(choices[index])
+                choose(index, left - weights[index])
+                chosen.pop()
+    choose(0, botSize)
+    return patterns
+
+# *****************************************************
+def nextPatterns(pattern, botSize):
+    """
+    The patterns one move of the color away
+
+    A move pours all or part of the top run of a bottle onto the top run
+    of another (as much as the room left, counting at least one cell of
+    other colors below each run but the lowest, allows) or all of it
+    into an empty bottle. The other colors above the runs are moved away
+    for free.
+
+    Returns
+    -------
+    set of tuples
+
+    """
+    found = set()
+    bottles = list(pattern)
+    for i, (below, runs) in enumerate(bottles):
+        if i > 0 and bottles[i - 1] == bottles[i]:
+            continue
+        top = runs[-1]
+        others = bottles[:i] + bottles[i + 1:]
+        left = [(below, runs[:-1])] if len(runs) > 1 else []
+        # Into an empty bottle (pouring a single run out of an empty bottom changes nothing)
+        if below or len(runs) > 1:
+            found.add(tuple(sorted(others + left + [(False, (top,))])))
+        for j, (destBelow, destRuns) in enumerate(others):
+            room = botSize - sum(destRuns) - len(destRuns) + 1 - destBelow
+            rest = others[:j] + others[j + 1:]
+            for transfer in range(1, min(top, room) + 1):
+                source = left if transfer == top else [(below, runs[:-1] + (top - transfer,))]
+                destin = (destBelow, destRuns[:-1] + (destRuns[-1] + transfer,))
+                found.add(tuple(sorted(rest + source + [destin])))
+    return found
+
+# *****************************************************
+def patternDistances(botSize):
+    """
+    The fewest moves from every pattern of a capacity to a full bottle
+
+    Breadth first search from the goal over the moves taken backwards.
+
+    Returns
+    -------
+    patterns : list of tuples
+        As returned by allPatterns.
+    distances : bytearray
+        distances[i] for patterns[i], UNREACHABLE if it cannot be won.
+
+    """
+    patterns = allPatterns(botSize)
+    index = {pattern: i for i, pattern in enumerate(patterns)}
+    # The moves taken backwards, in compressed rows
+    forward = [[index[after] for after in nextPatterns(pattern, botSize)]
+               for pattern in patterns]
+    counts = array('I', bytes(4 * (len(patterns) + 1)))
+    for successors in forward:
+        for after in successors:
+            counts[after + 1] += 1
+    for i in range(len(patterns)):
+        counts[i + 1] += counts[i]
+    backward = array('I', bytes(4 * counts[-1]))
+    filled = array('I', counts)
+    for before, successors in enumerate(forward):
+        for after in successors:
+            backward[filled[after]] = before
+            filled[after] += 1
+    del forward
+
+    distances = bytearray([UNREACHABLE]) * len(patterns)
+    layer = [index[((False, (botSize,)),)]]
+    distances[layer[0]] = 0
+    depth = 0
+    while layer:
+        depth += 1
+        following = []
+        for after in layer:
+            for before in backward[counts[after] : counts[after + 1]]:
+                if distances[before] == UNREACHABLE:
+                    distances[before] = min(depth, UNREACHABLE - 1)
+                    following.append(before)
+        layer = following
+    return patterns, distances
+
+# *****************************************************
+def tableFile(botSize, folder=PDB_FOLDER):
+    return os.path.join(folder, f"pdb_{botSize}.bin")
+
+# *****************************************************
+def writeTable(botSize, folder=PDB_FOLDER):
+    """
+    Computes and writes the table of a capacity
+
+    Returns
+    -------
+    int
+        The number of patterns in the table.
+
+    Raises
+    ------
+    ValueError
+        If two patterns have the same hash (never seen in practice).
+
+    """
+    patterns, distances = patternDistances(botSize)
+    nrSlots = 1
+    while nrSlots < 2 * len(patterns):
+        nrSlots *= 2
+    keys = array('Q', bytes(8 * nrSlots))
+    values = bytearray([UNREACHABLE]) * nrSlots
+    for pattern, distance in zip(patterns, distances):
+        key = patternHash(pattern)
+        slot = key & (nrSlots - 1)
+        while keys[slot]:
+            if keys[slot] == key:
+                raise ValueError(f"two patterns of capacity {botSize} have the same hash")
+            slot = (slot + 1) & (nrSlots - 1)
+        keys[slot] = key
+        values[slot] = distance
+    if sys.byteorder == "big":
+        keys.byteswap()
+    os.makedirs(folder, exist_ok=True)
+    fileName = tableFile(botSize, folder)
+    with open(fileName + ".tmp", 'wb') as file:
+        file.write(PDB_HEADER.pack(PDB_MAGIC, botSize, len(patterns), nrSlots))
+        file.write(keys.tobytes())
+        file.write(values)
+    os.replace(fileName + ".tmp", fileName)
+    return len(patterns)
+
+# *****************************************************
+class PatternTable:
+    """
+    The memory-mapped table of one capacity.
+    """
+
+    __slots__ = ("file", "data", "nrSlots", "values", "memo")
+
+    def __init__(self, fileName, botSize):
+        self.file = open(fileName, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, capacity, _, self.nrSlots = PDB_HEADER.unpack_from(self.data)
+        if magic != PDB_MAGIC or capacity != botSize:
+            self.close()
+            raise ValueError(f"{fileName} is not the pattern table of capacity {botSize}")
+        self.values = PDB_HEADER.size + 8 * self.nrSlots
+        # Patterns already looked up -> distance
+        self.memo = {}
+
+    # *************************************************
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    # *************************************************
+    def distance(self, pattern):
+        distance = self.memo.get(pattern)
+        if distance is not None:
+            return distance
+        key = patternHash(pattern)
+        mask = self.nrSlots - 1
+        slot = key & mask
+        data = self.data
+        while True:
+            found = struct.unpack_from("<Q", data, PDB_HEADER.size + 8 * slot)[0]
+            if found == key:
+                distance = data[self.values + slot]
+                break
+            if found == 0:
+                # Not a pattern of this capacity: nothing is known
+                distance = 0
+                break
+            slot = (slot + 1) & mask
+        if len(self.memo) >= 1000000:
+            self.memo.clear()
+        self.memo[pattern] = distance
+        return distance
+
+# *****************************************************
+class PatternDatabase:
+    """
+    The tables of a folder, each opened the first time a game of its
+    capacity needs it.
+    """
+
+    __slots__ = ("folder", "tables")
+
+    def __init__(self, folder=PDB_FOLDER):
+        self.folder = folder
+        # botSize -> PatternTable, or None if there is no table
+        self.tables = {}
+
+    # *************************************************
+    def table(self, botSize):
+        """
+        The table of a capacity, or None if it was not built
+        """
+        if botSize not in self.tables:
+            fileName = tableFile(botSize, self.folder)
+            self.tables[botSize] = PatternTable(fileName, botSize) \
+                if os.path.exists(fileName) else None
+        return self.tables[botSize]
+
+    # *************************************************
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+        self.tables.clear()
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Build the pattern tables of the solver.")
+    parser.add_argument("--capacities", type=int, nargs="+", default=list(range(4, 13)))
+    parser.add_argument("--folder", default=PDB_FOLDER)
+    args = parser.parse_args()
+    for botSize in args.capacities:
+        start = time.perf_counter()
+        count = writeTable(botSize, args.folder)
+        print(f"Capacity {botSize}: {count} patterns in {time.perf_counter() - start:.1f} s "
+              f"({os.path.getsize(tableFile(botSize, args.folder))} bytes)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import random
+
+# Changes whenever the same seed would build a different game
+GENERATOR_VERSION = 1
+
+# *****************************************************
+def formatPuzzleId(nrBotts, botSize, expert, seed, version=GENERATOR_VERSION):
+    """
+    The compact identity of a generated game
+
+    Parameters
+    ----------
+    nrBotts, botSize, expert : int
+        The shape of the game, as in functions.buildGameBottles.
+    seed : int
+        The seed of the random numbers used to build it.
+    version : int, optional
+        The generator version. The default is GENERATOR_VERSION.
+
+    Returns
+    -------
+    string
+        "version-nrBotts-botSize-expert-seed", with the seed in
+        hexadecimal (e.g. "1-10-8-3-5f3a9c21").
+
+    """
+    return f"{version}-{nrBotts}-{botSize}-{expert}-{seed:x}"
+
+# *****************************************************
+def parsePuzzleId(puzzleId):
+    """
+    The values stored in a puzzle ID
+
+    Parameters
+    ----------
+    puzzleId : string
+        As returned by formatPuzzleId.
+
+    Returns
+    -------
+    tuple
+        (nrBotts, botSize, expert, seed).
+
+    Raises
+    ------
+    ValueError
+        If puzzleId is not a puzzle ID, or was made by another version of
+        the generator (which would build a different game).
+
+    """
+    parts = puzzleId.strip().split("-")
+    if len(parts) != 5:
+        raise ValueError(f"{puzzleId!r} is not a puzzle ID")
+    try:
+        version, nrBotts, botSize, expert = (int(part) for part in parts[:4])
+        seed = int(parts[4], 16)
+    except ValueError:
+        raise ValueError(f"{puzzleId!r} is not a puzzle ID") from None
+    if version != GENERATOR_VERSION:
+        raise ValueError(f"puzzle {puzzleId} needs generator version {version}, "
+                         f"this is version {GENERATOR_VERSION}")
+    return nrBotts, botSize, expert, seed
+
+# *****************************************************
+def newPuzzleId(nrBotts, botSize, expert):
+    """
+    A puzzle ID with a new random seed
+    """
+    return formatPuzzleId(nrBotts, botSize, expert, random.getrandbits(32))
+
+# *****************************************************
+def puzzleRandom(puzzleId):
+    """
+    The source of random numbers that builds the game of a puzzle ID
+
+    Parameters
+    ----------
+    puzzleId : string
+        As returned by formatPuzzleId.
+
+    Returns
+    -------
+    random.Random
+        Always in the same state for the same puzzleId.
+
+    """
+    return random.Random(parsePuzzleId(puzzleId)[3])
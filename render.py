@@ -0,0 +1,171 @@
+import os
+import shutil
+import sys
+
+import functions as funcs
+
+CLEAR_SCREEN = "\033[2J\033[H"
+CLEAR_BELOW = "\033[J"
+
+# *****************************************************
+def moveTo(row, column):
+    # ANSI cursor position, 1-based
+    return f"\033[{row};{column}H"
+
+# *****************************************************
+def supportsAnsi(stream):
+    """
+    Can the stream be expected to understand ANSI cursor movements?
+
+    Parameters
+    ----------
+    stream : file object
+
+    Returns
+    -------
+    bool
+        True for terminals, except when TERM is "dumb".
+
+    """
+    isatty = getattr(stream, "isatty", None)
+    return bool(isatty and isatty()) and os.environ.get("TERM", "") != "dumb"
+
+# *****************************************************
+class Renderer:
+    """
+    Shows the game bottles, redrawing as little as possible.
+
+    Each frame is built in memory and written with a single write. In
+    plain mode every frame is the text of functions.showBottles. In ANSI
+    mode the first frame is drawn at the top of a cleared screen; later
+    frames only rewrite the cells that changed (normally in the two
+    bottles touched by the last move) and the number of errors, and
+    then clear whatever the prompts printed below the bottles.
+
+    In ANSI mode the bottles that do not fit on the screen are split in
+    pages; only the current page is shown, and turnPage changes it.
+    """
+
+    __slots__ = ("botSize", "stream", "ansi", "shown", "places", "nrErrors",
+                 "width", "page", "pageSize", "nrPages", "errorsRow")
+
+    def __init__(self, botSize, stream=None, ansi=None):
+        self.botSize = botSize
+        self.stream = sys.stdout if stream is None else stream
+        self.ansi = supportsAnsi(self.stream) if ansi is None else ansi
+        self.shown = None
+        self.places = None
+        self.nrErrors = None
+        self.width = 1
+        self.page = 0
+        self.pageSize = None
+        self.nrPages = 1
+        self.errorsRow = None
+
+    # *************************************************
+    def render(self, bottles, nrErrors, changed=None):
+        """
+        Shows the bottles
+
+        Parameters
+        ----------
+        bottles : dictionary
+            Keys are strings and values are lists.
+        nrErrors : int
+            The number of errors the user already made.
+        changed : sequence of strings, optional
+            The letters of the bottles that may have changed since the
+            last frame. The default is None (any of them).
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.ansi:
+            self.stream.write(funcs.formatBottles(bottles, self.botSize, nrErrors))
+            self.stream.flush()
+            return
+        if self.shown is None or self.places.keys() - bottles.keys():
+            frame = self.fullFrame(bottles, nrErrors)
+        else:
+            frame = self.cellChanges(bottles, nrErrors, changed)
+        self.nrErrors = nrErrors
+        self.stream.write(frame)
+        self.stream.flush()
+
+    # *************************************************
+    def turnPage(self, step):
+        """
+        Moves to another page; the next render draws it in full
+
+        Parameters
+        ----------
+        step : int
+            1 for the next page, -1 for the previous one (pages wrap
+            around).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.page = (self.page + step) % self.nrPages
+        self.shown = None
+
+    # *************************************************
+    def fullFrame(self, bottles, nrErrors):
+        # Clears the screen and draws the current page
+        botSize = self.botSize
+        size = shutil.get_terminal_size()
+        self.width = funcs.cellWidth(bottles)
+        perBand = funcs.bottlesPerBand(self.width, size.columns)
+        bandsPerPage = max(1, (size.lines - 3) // (botSize + 2))
+        self.pageSize = perBand * bandsPerPage
+        self.nrPages = max(1, -(-len(bottles) // self.pageSize))
+        self.page = min(self.page, self.nrPages - 1)
+        first = self.page * self.pageSize
+        letters = list(bottles)[first : first + self.pageSize]
+        page = {letter: bottles[letter] for letter in letters}
+
+        self.shown = {letter: tuple(content) for letter, content in page.items()}
+        self.places = {}
+        for i, letter in enumerate(letters):
+            top = 1 + (i // perBand) * (botSize + 2)
+            self.places[letter] = (top + botSize, (self.width + 6) * (i % perBand) + 4)
+        nrBands = -(-len(letters) // perBand)
+        self.errorsRow = nrBands * (botSize + 2)
+        frame = CLEAR_SCREEN + funcs.formatBottles(page, botSize, nrErrors, size.columns,
+                                                   self.width)
+        if self.nrPages > 1:
+            frame += f"Page {self.page + 1} of {self.nrPages} (+ next page, - previous page)\n"
+        return frame
+
+    # *************************************************
+    def cellChanges(self, bottles, nrErrors, changed):
+        # The escape sequences that update the screen from the last frame
+        botSize = self.botSize
+        width = self.width
+        parts = []
+        letters = bottles.keys() if changed is None else changed
+        for letter in letters:
+            before = self.shown.get(letter)
+            if before is None:
+                # Not on the current page
+                continue
+            content = bottles[letter]
+            if len(content) == len(before) and tuple(content) == before:
+                continue
+            base, column = self.places[letter]
+            for position in range(botSize):
+                new = content[position] if position < len(content) else " "
+                old = before[position] if position < len(before) else " "
+                if new != old:
+                    parts.append(moveTo(base - position, column) + new.rjust(width))
+            self.shown[letter] = tuple(content)
+        if nrErrors != self.nrErrors:
+            parts.append(moveTo(self.errorsRow, 1) + "NUMBER OF ERRORS: " + str(nrErrors))
+        # Back under the bottles, wiping the prompts of the last move
+        below = self.errorsRow + (2 if self.nrPages > 1 else 1)
+        parts.append(moveTo(below, 1) + CLEAR_BELOW)
+        return "".join(parts)
@@ -0,0 +1,329 @@
+import json
+import os
+import time
+
+SAVES_INDEX = "saves.index.json"
+SAVE_HEADER = "# Attention - Changing any value in this database may break your save forever."
+BOTTLES_LINE = "Bottles: "
+PUZZLE_LINE = "# Puzzle ID: "
+
+# *****************************************************
+def formatSave(botSize, nrBotts, expertise, nrErrors, fullBottles, bottles, puzzleId=None):
+    """
+    The contents of a save file
+
+    Parameters
+    ----------
+    botSize, nrBotts, expertise, nrErrors, fullBottles : int
+        The game information, as returned by functions.newGameInfo.
+    bottles : dictionary
+        Keys are strings and values are lists.
+    puzzleId : string, optional
+        The ID of the game that was started (see puzzleid). The default is
+        None (not known).
+
+    Returns
+    -------
+    header : string
+        Everything up to and including the "Bottles: " line.
+    body : string
+        One line "letter:symbol,symbol,..." per bottle, and then a
+        "# Puzzle ID: " line if puzzleId is given.
+
+    """
+    header = (f"{SAVE_HEADER}\n\n"
+              f"# Bottle capacity\n{botSize}\n\n"
+              f"# Total number of bottles in the game\n{nrBotts}\n\n"
+              f"# Expertise level\n{expertise}\n\n"
+              f"# Number of Errors\n{nrErrors}\n\n"
+              f"# Number of Full Bottles\n{fullBottles}\n\n"
+              f"{BOTTLES_LINE}\n")
+    body = "".join(f"{letter}:{','.join(content)}\n" for letter, content in bottles.items())
+    if puzzleId is not None:
+        body += f"{PUZZLE_LINE}{puzzleId}\n"
+    return header, body
+
+# *****************************************************
+def parseBottles(lines):
+    """
+    The bottles stored in the lines that follow "Bottles: " in a save
+
+    Parameters
+    ----------
+    lines : iterable of strings
+
+    Returns
+    -------
+    dictionary
+        Keys are strings and values are lists.
+
+    """
+    bottles = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        letter, content = line.split(":")
+        # An empty bottle is stored as "J:", which must not become ['']
+        bottles[letter] = content.split(',') if content else []
+    return bottles
+
+# *****************************************************
+def indexEntry(fileName, player, botSize, nrBotts, expertise, nrErrors,
+               fullBottles, offset, puzzleId=None):
+    """
+    What the saves index knows about a save file
+
+    Returns
+    -------
+    dictionary
+        "player", "timestamp", "botSize", "nrBotts", "expertise",
+        "nrErrors", "fullBottles", "progress" (percentage of the bottles
+        to fill already full), "offset" (byte where the bottles start),
+        "puzzleId" (None if not known) and "mtime"/"size" of the file, to
+        notice later changes.
+
+    """
+    info = os.stat(fileName)
+    toFill = nrBotts - expertise
+    return {"player": player,
+            "timestamp": time.time(),
+            "botSize": botSize,
+            "nrBotts": nrBotts,
+            "expertise": expertise,
+            "nrErrors": nrErrors,
+            "fullBottles": fullBottles,
+            "progress": round(100 * fullBottles / toFill) if toFill > 0 else 0,
+            "offset": offset,
+            "puzzleId": puzzleId,
+            "mtime": info.st_mtime,
+            "size": info.st_size}
+
+# *****************************************************
+def readSaveIndex(folder="."):
+    """
+    The saves index of a folder, built from its files if it does not exist
+
+    Entries whose file no longer exists are dropped, and save files that
+    are not in the index are added (the index is then written again).
+
+    Parameters
+    ----------
+    folder : string, optional
+        The default is the current folder.
+
+    Returns
+    -------
+    dictionary
+        Keys are save file names, values as returned by indexEntry.
+
+    """
+    try:
+        with open(os.path.join(folder, SAVES_INDEX), 'r', encoding='utf-8') as file:
+            index = json.load(file)
+    except FileNotFoundError:
+        return rebuildSaveIndex(folder)
+    except ValueError:
+        # A damaged index is rebuilt rather than losing the saves
+        return rebuildSaveIndex(folder)
+    gone = [fileName for fileName in index
+            if not os.path.exists(os.path.join(folder, fileName))]
+    for fileName in gone:
+        del index[fileName]
+    # Saves written without the index (e.g. by older versions of the game)
+    found = scanSaves(folder, index)
+    index.update(found)
+    if gone or found:
+        writeSaveIndex(index, folder)
+    return index
+
+# *****************************************************
+def writeSaveIndex(index, folder="."):
+    """
+    Stores the saves index, replacing the old one in a single step
+
+    Parameters
+    ----------
+    index : dictionary
+        As returned by readSaveIndex.
+    folder : string, optional
+        The default is the current folder.
+
+    Returns
+    -------
+    None.
+
+    """
+    fileName = os.path.join(folder, SAVES_INDEX)
+    temporary = fileName + ".tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=1)
+    os.replace(temporary, fileName)
+
+# *****************************************************
+def recordSave(fileName, player, botSize, nrBotts, expertise, nrErrors,
+               fullBottles, offset, folder=".", puzzleId=None):
+    """
+    Adds (or updates) a save in the saves index
+
+    Parameters
+    ----------
+    fileName : string
+        The save file, relative to folder.
+    player : string
+        The name the user entered.
+    botSize, nrBotts, expertise, nrErrors, fullBottles : int
+        The game information that was saved.
+    offset : int
+        The byte of the file where the bottles start.
+    folder : string, optional
+        The default is the current folder.
+    puzzleId : string, optional
+        The ID of the game that was started. The default is None.
+
+    Returns
+    -------
+    None.
+
+    """
+    index = readSaveIndex(folder)
+    index[fileName] = indexEntry(os.path.join(folder, fileName), player, botSize,
+                                 nrBotts, expertise, nrErrors, fullBottles, offset,
+                                 puzzleId)
+    writeSaveIndex(index, folder)
+
+# *****************************************************
+def parseSaveFile(fileName, player=None):
+    """
+    Reads a whole save file and describes it as the saves index does
+
+    Parameters
+    ----------
+    fileName : string
+    player : string, optional
+        The default is None (the file name without ".txt").
+
+    Returns
+    -------
+    dictionary or None
+        As returned by indexEntry; None if the file is not a save.
+
+    """
+    with open(fileName, 'rb') as file:
+        data = file.read()
+    text = data.decode('utf-8', errors='replace')
+    if not text.startswith(SAVE_HEADER):
+        return None
+    lines = text.splitlines(keepends=True)
+    try:
+        values = [int(lines[i].strip()) for i in (3, 6, 9, 12, 15)]
+    except (IndexError, ValueError):
+        return None
+    if len(lines) < 18 or lines[17].strip() != BOTTLES_LINE.strip():
+        return None
+    offset = len("".join(lines[:18]).encode('utf-8'))
+    puzzleId = None
+    for line in lines[18:]:
+        if line.startswith(PUZZLE_LINE):
+            puzzleId = line[len(PUZZLE_LINE):].strip()
+    if player is None:
+        player = os.path.basename(fileName)[:-len(".txt")]
+    return indexEntry(fileName, player, *values, offset, puzzleId)
+
+# *****************************************************
+def scanSaves(folder=".", known=()):
+    """
+    Describes the save files of a folder that are not known yet
+
+    Other .txt files (like the configuration) are ignored; only their
+    first line is read.
+
+    Parameters
+    ----------
+    folder : string, optional
+        The default is the current folder.
+    known : collection of strings, optional
+        File names to leave out. The default is none.
+
+    Returns
+    -------
+    dictionary
+        Keys are save file names, values as returned by indexEntry.
+
+    """
+    header = SAVE_HEADER.encode('utf-8')
+    found = {}
+    for fileName in sorted(os.listdir(folder)):
+        if not fileName.endswith(".txt") or fileName in known:
+            continue
+        fullName = os.path.join(folder, fileName)
+        try:
+            with open(fullName, 'rb') as file:
+                if file.read(len(header)) != header:
+                    continue
+            entry = parseSaveFile(fullName)
+        except OSError:
+            continue
+        if entry is not None:
+            entry["timestamp"] = entry["mtime"]
+            found[fileName] = entry
+    return found
+
+# *****************************************************
+def rebuildSaveIndex(folder="."):
+    """
+    Builds the saves index by reading every save file in the folder
+
+    Parameters
+    ----------
+    folder : string, optional
+        The default is the current folder.
+
+    Returns
+    -------
+    dictionary
+        As returned by readSaveIndex.
+
+    """
+    index = scanSaves(folder)
+    writeSaveIndex(index, folder)
+    return index
+
+# *****************************************************
+def loadSave(fileName, entry, folder="."):
+    """
+    The bottles of a save, reading only the part of the file that has them
+
+    If the file changed since it was indexed, it is read again in full,
+    and entry and the saves index are updated.
+
+    Parameters
+    ----------
+    fileName : string
+        The save file, relative to folder.
+    entry : dictionary
+        Its entry in the saves index.
+    folder : string, optional
+        The default is the current folder.
+
+    Returns
+    -------
+    dictionary
+        Keys are strings and values are lists.
+
+    """
+    fullName = os.path.join(folder, fileName)
+    info = os.stat(fullName)
+    if info.st_mtime != entry["mtime"] or info.st_size != entry["size"]:
+        fresh = parseSaveFile(fullName, entry["player"])
+        if fresh is None:
+            raise ValueError(f"{fileName} is no longer a saved game")
+        fresh["timestamp"] = entry["timestamp"]
+        entry.update(fresh)
+        index = readSaveIndex(folder)
+        index[fileName] = entry
+        writeSaveIndex(index, folder)
+    with open(fullName, 'rb') as file:
+        file.seek(entry["offset"])
+        data = file.read()
+    return parseBottles(data.decode('utf-8').splitlines())
@@ -0,0 +1,344 @@
+"""
+Hosts many games at once over a line protocol, one game per connection.
+
+Example:
+    python server.py --port 7777 --folder games
+
+Each request is one line, each answer one line of JSON with "ok" (and
+"error" when ok is false):
+    NEW [puzzleId | nrBotts botSize expertise]   start a game
+    MOVE source destin                           pour a bottle into another
+    UNDO, REDO, HINT, SHOW                       as in the game
+    SAVE player, LOAD player                     saves in the server folder
+    STATS                                        latencies of this session
+    QUIT
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from random import randint
+
+import functions as funcs
+import instrument
+from gameconfig import CFG_FILE, DEFAULT_CONFIG, loadConfig
+from gamesession import GameSession
+from hints import HintService
+from puzzleid import newPuzzleId, parsePuzzleId
+from saves import formatSave, loadSave, readSaveIndex, recordSave
+
+# Player names become file names
+PLAYER_NAME = re.compile(r"[A-Za-z0-9_-]{1,40}")
+
+# *****************************************************
+def percentiles(latencies):
+    """
+    The median, 99th percentile and maximum of a sequence of seconds
+
+    Returns
+    -------
+    dictionary
+        "p50Ms", "p99Ms" and "maxMs", in milliseconds.
+
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"p50Ms": 0.0, "p99Ms": 0.0, "maxMs": 0.0}
+    return {"p50Ms": 1000 * ordered[len(ordered) // 2],
+            "p99Ms": 1000 * ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))],
+            "maxMs": 1000 * ordered[-1]}
+
+# *****************************************************
+# The hint service of each worker process of the hint pool
+_hints = None
+
+def hintInWorker(bottles, botSize, expertise):
+    global _hints
+    if _hints is None:
+        _hints = HintService()
+    return _hints.hint(bottles, botSize, expertise)
+
+# *****************************************************
+def saveGame(info, player, folder):
+    # Writes a save like functions.writeGameInfo, without asking anything
+    fileName = player + ".txt"
+    header, body = formatSave(*info)
+    with open(os.path.join(folder, fileName), 'w', encoding='utf-8', newline='\n') as file:
+        file.write(header)
+        file.write(body)
+    botSize, nrBotts, expertise, nrErrors, fullBottles, _, puzzleId = info
+    recordSave(fileName, player, botSize, nrBotts, expertise, nrErrors, fullBottles,
+               len(header.encode('utf-8')), folder, puzzleId)
+
+# *****************************************************
+def loadGame(player, folder):
+    # The game information of a save, like functions.oldGameInfo
+    fileName = player + ".txt"
+    entry = readSaveIndex(folder).get(fileName)
+    if entry is None:
+        raise ValueError(f"no game saved by {player}")
+    bottles = loadSave(fileName, entry, folder)
+    return (entry["botSize"], entry["nrBotts"], entry["expertise"], entry["nrErrors"],
+            entry["fullBottles"], bottles, entry.get("puzzleId"))
+
+# *****************************************************
+class Connection:
+    """
+    The game and latencies of one connection.
+    """
+
+    __slots__ = ("session", "commands", "latencies")
+
+    def __init__(self):
+        self.session = None
+        self.commands = 0
+        self.latencies = deque(maxlen=1000)
+
+# *****************************************************
+class GameServer:
+    """
+    Plays one GameSession per connection, all in one event loop.
+
+    Moves are fast and handled in the loop. What could hold it are sent
+    elsewhere: saves and loads to a single thread (so the saves index is
+    only written by one at a time) and hints, which search, to a pool of
+    processes.
+    """
+
+    __slots__ = ("folder", "cfgFile", "ioPool", "hintPool", "connections",
+                 "commands", "latencies", "started")
+
+    def __init__(self, folder="games", cfgFile=CFG_FILE, hintWorkers=None):
+        self.folder = folder
+        self.cfgFile = cfgFile
+        os.makedirs(folder, exist_ok=True)
+        self.ioPool = ThreadPoolExecutor(max_workers=1)
+        # Forked workers would keep the sockets open at the time they start,
+        # so closed connections would not end
+        self.hintPool = ProcessPoolExecutor(max_workers=hintWorkers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        self.connections = 0
+        self.commands = 0
+        self.latencies = deque(maxlen=100000)
+        self.started = time.perf_counter()
+
+    # *************************************************
+    async def start(self, host="127.0.0.1", port=7777, path=None):
+        """
+        Starts listening on a TCP port, or on a Unix socket if path is given
+
+        Returns
+        -------
+        asyncio.Server
+
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path, limit=1 << 20)
+        return await asyncio.start_server(self.handle, host, port, limit=1 << 20)
+
+    # *************************************************
+    def close(self):
+        self.ioPool.shutdown()
+        self.hintPool.shutdown()
+
+    # *************************************************
+    async def handle(self, reader, writer):
+        """
+        Answers the requests of one connection until QUIT or disconnection
+        """
+        connection = Connection()
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                words = line.decode('utf-8', 'replace').split()
+                if not words:
+                    continue
+                command = words[0].upper()
+                try:
+                    answer = await self.answer(connection, command, words[1:])
+                except Exception as e:
+                    answer = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(answer).encode('utf-8') + b"\n")
+                seconds = time.perf_counter() - start
+                connection.commands += 1
+                connection.latencies.append(seconds)
+                self.commands += 1
+                self.latencies.append(seconds)
+                await writer.drain()
+                if command == "QUIT":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    # *************************************************
+    async def answer(self, connection, command, args):
+        """
+        The answer to one request (see the module docstring)
+
+        Returns
+        -------
+        dictionary
+
+        """
+        session = connection.session
+        if command == "NEW":
+            connection.session = session = self.newSession(args)
+            return dict(self.describe(session), puzzleId=session.puzzleId,
+                        bottles=session.bottles)
+        if command == "LOAD":
+            player = self.player(args)
+            info = await asyncio.get_running_loop().run_in_executor(
+                self.ioPool, loadGame, player, self.folder)
+            connection.session = session = GameSession.fromInfo(info)
+            return dict(self.describe(session), puzzleId=session.puzzleId,
+                        bottles=session.bottles)
+        if command == "STATS":
+            return dict(ok=True, commands=connection.commands,
+                        **percentiles(connection.latencies))
+        if command == "QUIT":
+            return {"ok": True}
+        if session is None:
+            return {"ok": False, "error": "no game: send NEW or LOAD first"}
+        if command == "SHOW":
+            return dict(self.describe(session), bottles=session.bottles)
+        if command == "SAVE":
+            player = self.player(args)
+            # The game goes on while the save is written, so save a copy
+            info = session.info()
+            bottles = {letter: list(content) for letter, content in info[5].items()}
+            await asyncio.get_running_loop().run_in_executor(
+                self.ioPool, saveGame, info[:5] + (bottles,) + info[6:], player, self.folder)
+            return self.describe(session)
+        if command == "HINT":
+            hint = await asyncio.get_running_loop().run_in_executor(
+                self.hintPool, hintInWorker, session.bottles, session.botSize,
+                session.expertise)
+            return dict(self.describe(session), hint=hint)
+        if session.over():
+            return {"ok": False, "error": "the game is over"}
+        if command == "MOVE":
+            if len(args) != 2:
+                return {"ok": False, "error": "MOVE needs a source and a destination"}
+            source, destin = (arg.upper() for arg in args)
+            try:
+                transfer = session.move(source, destin)
+            except KeyError as e:
+                return {"ok": False, "error": f"there is no bottle {e.args[0]}"}
+            return dict(self.describe(session), transfer=transfer)
+        if command == "UNDO":
+            return dict(self.describe(session), changed=session.undo())
+        if command == "REDO":
+            return dict(self.describe(session), changed=session.redo())
+        return {"ok": False, "error": f"unknown command {command}"}
+
+    # *************************************************
+    def newSession(self, args):
+        # NEW, NEW puzzleId or NEW nrBotts botSize expertise
+        cfg = loadConfig(self.cfgFile, validate=False) if os.path.exists(self.cfgFile) \
+            else DEFAULT_CONFIG
+        puzzleId = None
+        if len(args) == 1:
+            puzzleId = args[0]
+            nrBotts, botSize, expertise, _ = parsePuzzleId(puzzleId)
+        elif len(args) == 3:
+            nrBotts, botSize, expertise = (int(arg) for arg in args)
+        elif not args:
+            nrBotts, botSize = cfg.nrBotts, cfg.botSize
+            expertise = randint(1, 5) if cfg.expertise == "random" else int(cfg.expertise)
+        else:
+            raise ValueError("NEW takes a puzzle ID or nrBotts botSize expertise")
+        cfg = cfg.replace(nrBotts=nrBotts, botSize=botSize, expertise=str(expertise))
+        problems = cfg.problems()
+        if problems:
+            raise ValueError(" ".join(problems))
+        if puzzleId is None:
+            puzzleId = newPuzzleId(nrBotts, botSize, expertise)
+        bottles = funcs.buildGameFromId(puzzleId, cfg.bottleLabels(),
+                                        cfg.colorSymbols(nrBotts - expertise))
+        return GameSession(botSize, nrBotts, expertise, 0, bottles, puzzleId)
+
+    # *************************************************
+    def player(self, args):
+        if len(args) != 1 or not PLAYER_NAME.fullmatch(args[0]):
+            raise ValueError("the player name must be letters, digits, _ or -")
+        return args[0]
+
+    # *************************************************
+    def describe(self, session):
+        # What every answer about a game says
+        if session.won():
+            status = "won"
+        elif session.over():
+            status = "lost"
+        else:
+            status = "playing"
+        return {"ok": True, "status": status, "nrErrors": session.nrErrors,
+                "fullBottles": session.fullBottles}
+
+    # *************************************************
+    def stats(self):
+        """
+        What the server has done so far
+
+        Returns
+        -------
+        dictionary
+            "connections" (open now), "commands", "commandsPerSec" and the
+            latencies of the last 100000 commands (see percentiles).
+
+        """
+        seconds = time.perf_counter() - self.started
+        return dict(connections=self.connections, commands=self.commands,
+                    commandsPerSec=self.commands / seconds if seconds else 0.0,
+                    **percentiles(self.latencies))
+
+# *****************************************************
+async def serve(host, port, path, folder, hintWorkers, statsEvery):
+    server = GameServer(folder, hintWorkers=hintWorkers)
+    listener = await server.start(host, port, path)
+    print("Listening on " + (path or f"{host}:{port}"))
+    try:
+        async with listener:
+            while True:
+                await asyncio.sleep(statsEvery)
+                print(json.dumps(server.stats()), flush=True)
+    finally:
+        server.close()
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Host many games over a line protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--unix", dest="path", help="listen on this Unix socket instead")
+    parser.add_argument("--folder", default="games", help="where games are saved")
+    parser.add_argument("--hint-workers", type=int, default=None)
+    parser.add_argument("--stats-every", type=float, default=10.0,
+                        help="seconds between two lines of statistics")
+    parser.add_argument("--instrument", help="write the times of the main functions here")
+    args = parser.parse_args()
+    if args.instrument:
+        instrument.enable()
+        instrument.startDumping(args.instrument, args.stats_every)
+    try:
+        asyncio.run(serve(args.host, args.port, args.path, args.folder, args.hint_workers,
+                          args.stats_every))
+    except KeyboardInterrupt:
+        pass
+    instrument.stopDumping()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Plays generated games without a player, to measure how often each kind of
+player wins, and with how many moves and errors.
+
+Example:
+    python simulate.py --games 100000 --policy greedy --bottles 10 --capacity 8 --expert 2
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import functions as funcs
+from gamesession import MAX_ERRORS
+from solutioncache import SolutionCache
+from solver import solve
+from verify import chunkRandom
+
+# *****************************************************
+def legalMoves(bottles, botSize):
+    return [(source, destin) for source in bottles for destin in bottles
+            if source != destin and funcs.moveIsPossible(botSize, source, destin, bottles)]
+
+# *****************************************************
+class RandomPolicy:
+    """
+    Plays any legal move, each with the same chance.
+    """
+
+    __slots__ = ("botSize", "expert", "rng")
+
+    def __init__(self, botSize, expert, rng):
+        self.botSize = botSize
+        self.expert = expert
+        self.rng = rng
+
+    # *************************************************
+    def start(self, bottles):
+        """
+        Called before the first move of each game
+        """
+
+    # *************************************************
+    def choose(self, bottles, moves):
+        """
+        The next move
+
+        Parameters
+        ----------
+        bottles : dictionary
+            Keys are strings and values are lists. Must be left unchanged.
+        moves : list of tuples (source, destin)
+            The legal moves, never empty.
+
+        Returns
+        -------
+        tuple (source, destin)
+
+        """
+        return self.rng.choice(moves)
+
+    # *************************************************
+    def played(self, source, destin, planned):
+        """
+        Called after each move; planned is False when the move was not
+        the one returned by choose (a slip).
+        """
+
+# *****************************************************
+class GreedyPolicy(RandomPolicy):
+    """
+    Plays the move that looks best right now: completing a bottle first,
+    then pouring onto the same symbol, and into an empty bottle only when
+    that splits a bottle. Never undoes its last move.
+    """
+
+    __slots__ = ("last",)
+
+    def start(self, bottles):
+        self.last = None
+
+    def choose(self, bottles, moves):
+        botSize = self.botSize
+        best, bestScore = [], None
+        for source, destin in moves:
+            if (destin, source) == self.last:
+                continue
+            sourceContent = bottles[source]
+            destContent = bottles[destin]
+            run = 1
+            while run < len(sourceContent) and sourceContent[-run - 1] == sourceContent[-1]:
+                run += 1
+            if destContent:
+                transfer = min(run, botSize - len(destContent))
+                score = 2
+                if transfer == run and len(destContent) + transfer == botSize and \
+                   funcs.full(destContent + sourceContent[-transfer:], botSize):
+                    score = 3
+            else:
+                # Pouring a bottle of a single symbol into an empty one changes nothing
+                score = 0 if run == len(sourceContent) else 1
+            if bestScore is None or score > bestScore:
+                best, bestScore = [(source, destin)], score
+            elif score == bestScore:
+                best.append((source, destin))
+        if not best:
+            return self.rng.choice(moves)
+        return self.rng.choice(best)
+
+    def played(self, source, destin, planned):
+        self.last = (source, destin)
+
+# *****************************************************
+class SolverPolicy(GreedyPolicy):
+    """
+    Plays an optimal solution found by the solver, searching again after
+    a slip. Plays like GreedyPolicy when the solver finds no solution
+    within maxNodes. With a SolutionCache, each game is only solved the
+    first time it is met, by any process.
+    """
+
+    __slots__ = ("plan", "maxNodes", "cache")
+
+    def __init__(self, botSize, expert, rng, maxNodes=20000, cache=None):
+        super().__init__(botSize, expert, rng)
+        self.maxNodes = maxNodes
+        self.cache = cache
+
+    def start(self, bottles):
+        super().start(bottles)
+        self.plan = None
+
+    def choose(self, bottles, moves):
+        if self.plan is None:
+            if self.cache is None:
+                solution, _ = solve(bottles, self.botSize, self.expert, self.maxNodes)
+            else:
+                solution, _ = self.cache.solve(bottles, self.botSize, self.expert,
+                                               self.maxNodes)
+            self.plan = [] if solution is None else solution[::-1]
+        if self.plan:
+            return self.plan[-1]
+        return super().choose(bottles, moves)
+
+    def played(self, source, destin, planned):
+        super().played(source, destin, planned)
+        if self.plan:
+            if planned and self.plan[-1] == (source, destin):
+                self.plan.pop()
+            else:
+                self.plan = None
+
+POLICIES = {"random": RandomPolicy, "greedy": GreedyPolicy, "solver": SolverPolicy}
+
+# *****************************************************
+def playGame(bottles, botSize, expert, policy, rng, slips=0.0, maxMoves=1000):
+    """
+    Plays one game to its end with the rules of the game loop in main.py
+
+    Parameters
+    ----------
+    bottles : dictionary
+        Keys are strings and values are lists. It is played on.
+    botSize : int
+        The capacity of bottles.
+    expert : int
+        The user's expert level.
+    policy : RandomPolicy, GreedyPolicy or SolverPolicy
+        Chooses the moves.
+    rng : random.Random
+        Decides the slips.
+    slips : float, optional
+        The chance that a move is two bottles picked at random instead of
+        the policy's move; an impossible one counts as an error. The
+        default is 0.0.
+    maxMoves : int, optional
+        Gives up after this many moves. The default is 1000.
+
+    Returns
+    -------
+    dictionary
+        "outcome" ("won", "errors" after MAX_ERRORS errors, "stuck" when no
+        move is possible, or "limit" when maxMoves was reached), "moves",
+        "errors" and "fullBottles".
+
+    """
+    nrBotts = len(bottles)
+    letters = list(bottles)
+    fullBottles = sum(funcs.full(content, botSize) for content in bottles.values())
+    moves = errors = 0
+    policy.start(bottles)
+    outcome = "limit"
+    while moves < maxMoves:
+        if funcs.allBottlesFull(nrBotts, fullBottles, expert):
+            outcome = "won"
+            break
+        legal = legalMoves(bottles, botSize)
+        if not legal:
+            outcome = "stuck"
+            break
+        planned = not (slips and rng.random() < slips)
+        if planned:
+            source, destin = policy.choose(bottles, legal)
+        else:
+            source, destin = rng.sample(letters, 2)
+        if not funcs.moveIsPossible(botSize, source, destin, bottles):
+            errors += 1
+            if errors == MAX_ERRORS:
+                outcome = "errors"
+                break
+            continue
+        before = funcs.full(bottles[source], botSize) + funcs.full(bottles[destin], botSize)
+        funcs.doMove(botSize, source, destin, bottles)
+        fullBottles += funcs.full(bottles[source], botSize) + \
+                       funcs.full(bottles[destin], botSize) - before
+        moves += 1
+        policy.played(source, destin, planned)
+    return {"outcome": outcome, "moves": moves, "errors": errors,
+            "fullBottles": fullBottles}
+
+# *****************************************************
+def simulateChunk(task):
+    """
+    Builds and plays the games of one chunk (runs in a worker process)
+
+    Parameters
+    ----------
+    task : tuple
+        (seed, chunk, howMany, nrBotts, botSize, expert, policyName,
+        slips, maxMoves, cacheFile).
+
+    Returns
+    -------
+    dictionary
+        Counters over the chunk: "outcomes", "moves" (moves of the games
+        won), "errors" and "fullBottles" (of all games).
+
+    """
+    seed, chunk, howMany, nrBotts, botSize, expert, policyName, slips, maxMoves, \
+        cacheFile = task
+    rng = chunkRandom(seed, chunk)
+    letters = [str(i) for i in range(nrBotts)]
+    symbols = [chr(0x100 + i) for i in range(nrBotts)]
+    if policyName == "solver" and cacheFile is not None:
+        policy = SolverPolicy(botSize, expert, rng, cache=SolutionCache(cacheFile))
+    else:
+        policy = POLICIES[policyName](botSize, expert, rng)
+    counters = {"outcomes": Counter(), "moves": Counter(), "errors": Counter(),
+                "fullBottles": Counter()}
+    for _ in range(howMany):
+        bottles = funcs.buildGameBottles(nrBotts, botSize, expert, letters, symbols, rng)
+        result = playGame(bottles, botSize, expert, policy, rng, slips, maxMoves)
+        counters["outcomes"][result["outcome"]] += 1
+        if result["outcome"] == "won":
+            counters["moves"][result["moves"]] += 1
+        counters["errors"][result["errors"]] += 1
+        counters["fullBottles"][result["fullBottles"]] += 1
+    return counters
+
+# *****************************************************
+def simulate(nrGames, nrBotts, botSize, expert, policyName="random", seed=0,
+             slips=0.0, maxMoves=1000, chunkSize=256, workers=None, onChunk=None,
+             cacheFile=None):
+    """
+    Plays many generated games using all the processor cores
+
+    Work is split and streamed as in verify.verifyPack: each worker builds
+    its games from (seed, chunk index) and returns only counters, which
+    are added to the totals as soon as each chunk completes, so memory
+    does not grow with the number of games.
+
+    Parameters
+    ----------
+    nrGames : int
+        How many games to play.
+    nrBotts, botSize, expert : int
+        The shape of the games, as in functions.buildGameBottles.
+    policyName : string, optional
+        A key of POLICIES. The default is "random".
+    seed : int, optional
+        The same seed always plays the same games. The default is 0.
+    slips, maxMoves : optional
+        As in playGame.
+    chunkSize : int, optional
+        Games per task sent to a worker. The default is 256.
+    workers : int, optional
+        Number of processes. The default is None (one per core).
+    onChunk : function, optional
+        Called with the number of games played so far after each chunk.
+    cacheFile : string, optional
+        A SolutionCache file shared by the workers of the solver policy.
+        The default is None (no cache).
+
+    Returns
+    -------
+    dictionary
+        The report: "games", "won", "lost to errors", "stuck", "limit",
+        "winRate", "errorRate" (errors per game), "meanMoves", the
+        histograms "movesHistogram", "errorsHistogram" and
+        "fullBottlesHistogram", and "gamesPerSec".
+
+    """
+    workers = workers or os.cpu_count() or 1
+    nrChunks = (nrGames + chunkSize - 1) // chunkSize
+    tasks = ((seed, chunk, min(chunkSize, nrGames - chunk * chunkSize),
+              nrBotts, botSize, expert, policyName, slips, maxMoves, cacheFile)
+             for chunk in range(nrChunks))
+    totals = {"outcomes": Counter(), "moves": Counter(), "errors": Counter(),
+              "fullBottles": Counter()}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(simulateChunk, task))
+            if len(pending) >= 2 * workers:
+                pending = collect(pending, totals, onChunk)
+        while pending:
+            pending = collect(pending, totals, onChunk)
+    seconds = time.perf_counter() - start
+
+    outcomes, moves, errors = totals["outcomes"], totals["moves"], totals["errors"]
+    games = sum(outcomes.values())
+    won = outcomes["won"]
+    return {"nrBotts": nrBotts, "botSize": botSize, "expert": expert,
+            "policy": policyName, "slips": slips, "seed": seed,
+            "games": games, "won": won, "lost to errors": outcomes["errors"],
+            "stuck": outcomes["stuck"], "limit": outcomes["limit"],
+            "winRate": won / games if games else None,
+            "errorRate": sum(k * v for k, v in errors.items()) / games if games else None,
+            "meanMoves": sum(k * v for k, v in moves.items()) / won if won else None,
+            "movesHistogram": histogram(moves),
+            "errorsHistogram": histogram(errors),
+            "fullBottlesHistogram": histogram(totals["fullBottles"]),
+            "seconds": seconds, "workers": workers,
+            "gamesPerSec": games / seconds if seconds else 0.0}
+
+# *****************************************************
+def collect(pending, totals, onChunk):
+    # Waits for at least one chunk and adds its counters to the totals
+    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        for name, counter in future.result().items():
+            totals[name].update(counter)
+    if onChunk is not None:
+        onChunk(sum(totals["outcomes"].values()))
+    return pending
+
+# *****************************************************
+def histogram(counter):
+    return {str(k): counter[k] for k in sorted(counter)}
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Play generated games without a player.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--bottles", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--expert", type=int, default=2)
+    parser.add_argument("--slips", type=float, default=0.0)
+    parser.add_argument("--max-moves", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", help="solution cache file for the solver policy")
+    parser.add_argument("--report", default="simulate_report.json")
+    args = parser.parse_args()
+
+    def progress(played):
+        print(f"{played} games played", end="\r", flush=True)
+
+    report = simulate(args.games, args.bottles, args.capacity, args.expert, args.policy,
+                      args.seed, args.slips, args.max_moves, args.chunk, args.workers,
+                      progress, args.cache)
+    print()
+    with open(args.report, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Won: {report['winRate']:.1%}  Errors per game: {report['errorRate']:.2f}  "
+          f"({report['gamesPerSec']:.1f} games/s)")
+    print("Report written to " + args.report)
+
+
+if __name__ == "__main__":
+    main()
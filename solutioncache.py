@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from board import Board
+from difficulty import scoreBoard
+from solver import solveBoard
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    key BLOB PRIMARY KEY,
+    moves TEXT,
+    score TEXT NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutionsByUse ON solutions (used);
+"""
+
+# *****************************************************
+def cacheKey(botSize, nrColors, canonicalKey):
+    """
+    The key of a game in the cache: a hash of its Board.canonicalKey
+
+    Returns
+    -------
+    bytes
+        16 bytes, the same in every process and on every system.
+
+    """
+    return hashlib.blake2b(b"%d,%d," % (botSize, nrColors) + canonicalKey,
+                           digest_size=16).digest()
+
+# *****************************************************
+class SolutionCache:
+    """
+    Optimal solutions and difficulty scores kept in a SQLite file, so that
+    a game is only solved once, whatever the process that asks for it and
+    however many times the programs are restarted.
+
+    Games are keyed by their canonical form (see Board.canonicalForm), so
+    a game with its bottles in another order or its colors renamed is
+    found too; moves are stored as rows of the canonical form and
+    translated back to the bottles of the game asked about.
+
+    The file keeps at most about maxEntries games: each one records when
+    it was last read or written, and the least recently used ones are
+    deleted every evictEvery new games. The last memoryEntries games used
+    by this process are also kept in memory, in front of the file; reads
+    served from memory are written to the file evictEvery at a time, and
+    before evicting or closing, so that a game used often from memory is
+    not evicted from the file.
+
+    Several processes can share the file: each opens its own connection
+    (also after a fork), the file is in write-ahead-log mode so reading
+    never waits for writing, and a busy file is waited for up to timeout
+    seconds.
+    """
+
+    __slots__ = ("fileName", "maxEntries", "memoryEntries", "evictEvery", "timeout",
+                 "memory", "touched", "connection", "pid", "stored", "hits", "diskHits",
+                 "misses")
+
+    def __init__(self, fileName="solutions.sqlite", maxEntries=100000, memoryEntries=1000,
+                 evictEvery=100, timeout=30.0):
+        self.fileName = fileName
+        self.maxEntries = maxEntries
+        self.memoryEntries = memoryEntries
+        self.evictEvery = evictEvery
+        self.timeout = timeout
+        # cacheKey -> (moves as canonical rows or None, score)
+        self.memory = {}
+        # cacheKey -> when it was last read from memory, not yet in the file
+        self.touched = {}
+        self.connection = None
+        self.pid = None
+        self.stored = 0
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # *************************************************
+    def close(self):
+        if self.touched:
+            self._flushTouched()
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+
+    # *************************************************
+    def _connect(self):
+        # A connection cannot be shared with a child process
+        if self.connection is None or self.pid != os.getpid():
+            connection = sqlite3.connect(self.fileName, timeout=self.timeout,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self.connection = connection
+            self.pid = os.getpid()
+        return self.connection
+
+    # *************************************************
+    def _remember(self, key, entry):
+        memory = self.memory
+        memory.pop(key, None)
+        if len(memory) >= self.memoryEntries:
+            # Dictionaries keep insertion order: drop the least recently used
+            del memory[next(iter(memory))]
+        memory[key] = entry
+
+    # *************************************************
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._remember(key, entry)
+            self.touched[key] = time.time_ns()
+            if len(self.touched) >= self.evictEvery:
+                self._flushTouched()
+            return entry
+        connection = self._connect()
+        row = connection.execute("SELECT moves, score FROM solutions WHERE key = ?",
+                                 (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.diskHits += 1
+        connection.execute("UPDATE solutions SET used = ? WHERE key = ?",
+                           (time.time_ns(), key))
+        moves = None if row[0] is None else [tuple(move) for move in json.loads(row[0])]
+        entry = (moves, json.loads(row[1]))
+        self._remember(key, entry)
+        return entry
+
+    # *************************************************
+    def _flushTouched(self):
+        touched = self.touched
+        self.touched = {}
+        connection = self._connect()
+        # One transaction for the whole batch
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany("UPDATE solutions SET used = ? WHERE key = ?",
+                                   [(used, key) for key, used in touched.items()])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    # *************************************************
+    def _store(self, key, moves, score):
+        connection = self._connect()
+        connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                           (key, None if moves is None else json.dumps(moves),
+                            json.dumps(score), time.time_ns()))
+        self._remember(key, (moves, score))
+        self.stored += 1
+        if self.stored % self.evictEvery == 0:
+            self.evict()
+
+    # *************************************************
+    def evict(self):
+        """
+        Deletes the least recently used games beyond maxEntries
+
+        Returns
+        -------
+        int
+            How many were deleted.
+
+        """
+        if self.touched:
+            self._flushTouched()
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            excess = connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0] \
+                     - self.maxEntries
+            if excess > 0:
+                connection.execute("DELETE FROM solutions WHERE key IN "
+                                   "(SELECT key FROM solutions ORDER BY used LIMIT ?)",
+                                   (excess,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return max(0, excess)
+
+    # *************************************************
+    def solveBoard(self, board, nrColors, maxNodes=20000):
+        """
+        The optimal solution and difficulty score of a Board
+
+        Games not in the cache are solved and scored with
+        difficulty.scoreBoard, and stored unless the node budget ran out.
+
+        Parameters
+        ----------
+        board : Board
+            The game bottles. It is left unchanged.
+        nrColors : int
+            The number of different symbols in the game.
+        maxNodes : int, optional
+            Node budget of the solver for games not in the cache.
+
+        Returns
+        -------
+        solution : list of tuples (source, destin) of bottle indexes, or None
+            As returned by solver.solveBoard.
+        score : dictionary
+            As returned by difficulty.scoreBoard.
+
+        """
+        canonical, order = board.canonicalForm()
+        key = cacheKey(board.botSize, nrColors, canonical)
+        entry = self._lookup(key)
+        if entry is None:
+            solved = solveBoard(board, nrColors, maxNodes)
+            score = scoreBoard(board, nrColors, maxNodes, solved=solved)
+            if score["solvable"] is None:
+                return None, score
+            rowOf = {bottle: row for row, bottle in enumerate(order)}
+            moves = solved[0]
+            entry = (None if moves is None else
+                     [(rowOf[source], rowOf[destin]) for source, destin in moves], score)
+            self._store(key, *entry)
+        moves, score = entry
+        if moves is None:
+            return None, score
+        return [(order[source], order[destin]) for source, destin in moves], score
+
+    # *************************************************
+    def solve(self, bottles, botSize, expert, maxNodes=20000):
+        """
+        solveBoard for a dictionary of bottles
+
+        Returns
+        -------
+        solution : list of tuples (source, destin) of keys of bottles, or None
+        score : dictionary
+
+        """
+        board = Board.fromBottles(bottles, botSize)
+        moves, score = self.solveBoard(board, len(bottles) - expert, maxNodes)
+        if moves is None:
+            return None, score
+        labels = board.labels
+        return [(labels[source], labels[destin]) for source, destin in moves], score
+
+    # *************************************************
+    def stats(self):
+        """
+        How well the cache is doing
+
+        Returns
+        -------
+        dictionary
+            "hits" (in memory), "diskHits", "misses", "hitRate",
+            "memoryEntries" and "entries" (in the file).
+
+        """
+        asked = self.hits + self.diskHits + self.misses
+        entries = self._connect().execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        return {"hits": self.hits,
+                "diskHits": self.diskHits,
+                "misses": self.misses,
+                "hitRate": (self.hits + self.diskHits) / asked if asked else 0.0,
+                "memoryEntries": len(self.memory),
+                "entries": entries}
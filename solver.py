@@ -0,0 +1,264 @@
+import time
+
+from board import Board
+from moveindex import MoveIndex
+from patterndb import UNREACHABLE, colorPattern
+
+# *****************************************************
+def isSolved(board, nrColors):
+    """
+    Are there nrColors full bottles and all the others empty?
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles.
+    nrColors : int
+        The number of different symbols in the game.
+
+    Returns
+    -------
+    bool
+
+    """
+    fullBottles = 0
+    for bottle in range(board.nrBotts):
+        if board.heights[bottle]:
+            if not board.full(bottle):
+                return False
+            fullBottles += 1
+    return fullBottles == nrColors
+
+# *****************************************************
+def usefulMoves(board):
+    """
+    Lists the legal moves that may be part of a shortest solution
+
+    Moves out of a complete bottle, or moves that pour a bottle holding
+    a single run into an empty bottle, only lead to equivalent states
+    and are skipped.
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles.
+
+    Returns
+    -------
+    list of tuples (source, destin) of bottle indexes
+
+    """
+    moves = []
+    heights = board.heights
+    nrBotts = board.nrBotts
+    for source in range(nrBotts):
+        height = heights[source]
+        if height == 0:
+            continue
+        singleRun = board.topRun(source) == height
+        if singleRun and height == board.botSize:
+            continue
+        for destin in range(nrBotts):
+            if destin == source:
+                continue
+            if heights[destin] == 0:
+                if not singleRun:
+                    moves.append((source, destin))
+            elif board.moveIsPossible(source, destin):
+                moves.append((source, destin))
+    return moves
+
+# *****************************************************
+def solveBoard(board, nrColors, maxNodes=None, maxSeconds=None, canonical=True,
+               patterns=None):
+    """
+    Finds a shortest sequence of moves that wins the game on a Board
+
+    The search is an IDA* using the number of runs (maximal groups of equal
+    consecutive colors) minus nrColors as lower bound: every move removes
+    at most one run, and the game is won with exactly one run per color.
+    The bound is updated incrementally from the two bottles each move
+    touches. The moves of each board come from a MoveIndex, and are made
+    in place and reverted through it, so no board is ever copied. A
+    transposition table keeps the smallest depth at which each board was
+    reached in the current iteration, pruning boards reached again by
+    longer paths. With
+    canonical, boards are keyed by Board.sortedKey, so a board that only
+    differs from one already reached in the order of its bottles is pruned
+    too (colors are never renamed by moves, so Board.canonicalKey would
+    find nothing more).
+
+    With patterns that have a table for the capacity of the board, the
+    lower bound is the larger of the bound of the runs and the sum over
+    the colors of their distance in the table (see patterndb); only the
+    distance of the color each move pours is looked up again.
+
+    Parameters
+    ----------
+    board : Board
+        The game bottles. It is left unchanged.
+    nrColors : int
+        The number of different symbols in the game.
+    maxNodes : int, optional
+        Gives up after expanding this many boards. The default is None
+        (no limit).
+    maxSeconds : float, optional
+        Gives up after searching for this long. The default is None
+        (no limit).
+    canonical : bool, optional
+        Whether to ignore bottle order in the transposition table. The
+        default is True.
+    patterns : PatternDatabase, optional
+        The default is None (the bound of the runs).
+
+    Returns
+    -------
+    solution : list of tuples (source, destin) of bottle indexes, or None
+        The moves of an optimal solution; None if the game cannot be won
+        (or if a limit was reached, see stats).
+    stats : dictionary
+        "nodes", "seconds", "nodesPerSec", "peakTable", "exhausted"
+        (True if the search stopped because of maxNodes or maxSeconds)
+        and "closest" (the moves to the board with the lowest estimate
+        reached, the best known start when the search was stopped).
+
+    """
+    # The time limit also covers building the index and the first bound,
+    # which take long on large boards
+    start = time.perf_counter()
+    deadline = None if maxSeconds is None else start + maxSeconds
+    # Looking at the clock on every node would slow the search of small
+    # boards down; the nodes of large boards are slow enough for it
+    clockEvery = max(1, min(32, 4096 // max(1, len(board.cells))))
+    infinity = float("inf")
+    table = {}
+    path = []
+    stats = {"nodes": 0, "peakTable": 0, "exhausted": False, "closest": []}
+    closestH = [infinity]
+    runs = board.runs
+    moves = MoveIndex(board)
+    boardKey = board.sortedKey if canonical else board.key
+
+    def search(depth, runsH, patternH, bound):
+        # Returns True when solved, otherwise the smallest f over the bound
+        h = runsH if runsH >= patternH else patternH
+        f = depth + h
+        if f > bound:
+            return f
+        if h <= 0 and isSolved(board, nrColors):
+            return True
+        if h < closestH[0]:
+            closestH[0] = h
+            stats["closest"] = list(path)
+        key = boardKey()
+        seen = table.get(key)
+        if seen is not None and seen <= depth:
+            return infinity
+        table[key] = depth
+        stats["nodes"] += 1
+        if maxNodes is not None and stats["nodes"] >= maxNodes:
+            stats["exhausted"] = True
+            return infinity
+        if deadline is not None and stats["nodes"] % clockEvery == 0 and \
+           time.perf_counter() > deadline:
+            stats["exhausted"] = True
+            return infinity
+        smallest = infinity
+        for source, destin in moves.legalMoves():
+            before = runs(source) + runs(destin)
+            transfer = moves.doMove(source, destin)
+            childRunsH = runsH - before + runs(source) + runs(destin)
+            childPatternH = patternH
+            if patternTable is not None:
+                code = cells[destin * botSize + heights[destin] - 1]
+                previous = colorH[code]
+                colorH[code] = colorDistance(code)
+                childPatternH += colorH[code] - previous
+            path.append((source, destin))
+            result = search(depth + 1, childRunsH, childPatternH, bound)
+            moves.undoMove(source, destin, transfer)
+            if patternTable is not None:
+                colorH[code] = previous
+            if result is True:
+                return True
+            path.pop()
+            smallest = min(smallest, result)
+            if stats["exhausted"]:
+                break
+        return smallest
+
+    patternTable = None if patterns is None else patterns.table(board.botSize)
+    cells = board.cells
+    heights = board.heights
+    botSize = board.botSize
+
+    def colorDistance(code):
+        distance = patternTable.distance(colorPattern(board, code))
+        return infinity if distance == UNREACHABLE else distance
+
+    solution = None
+    runsH = sum(runs(bottle) for bottle in range(board.nrBotts)) - nrColors
+    patternH = 0
+    if patternTable is not None:
+        # The distance of each color code
+        colorH = [0] * (max(cells, default=0) + 1)
+        for code in set(cells) - {0}:
+            colorH[code] = colorDistance(code)
+        patternH = sum(colorH)
+    h = bound = max(runsH, patternH)
+    while h < infinity:
+        table.clear()
+        result = search(0, runsH, patternH, bound)
+        stats["peakTable"] = max(stats["peakTable"], len(table))
+        if result is True:
+            solution = list(path)
+            break
+        if result == infinity or stats["exhausted"]:
+            break
+        bound = result
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["nodesPerSec"] = stats["nodes"] / stats["seconds"] if stats["seconds"] else 0.0
+    return solution, stats
+
+# *****************************************************
+def solve(bottles, botSize, expert, maxNodes=None, maxSeconds=None, patterns=None):
+    """
+    Finds a shortest sequence of moves that wins the game
+
+    The bottles are converted to a Board and searched with solveBoard.
+
+    Parameters
+    ----------
+    bottles : dictionary
+        Keys are strings and values are lists. It is left unchanged.
+    botSize : int
+        The capacity of bottles.
+    expert : int
+        The user's expert level (number of bottles that end empty).
+    maxNodes : int, optional
+        Gives up after expanding this many boards. The default is None
+        (no limit).
+    maxSeconds : float, optional
+        Gives up after searching for this long. The default is None
+        (no limit).
+    patterns : PatternDatabase, optional
+        See solveBoard. The default is None.
+
+    Returns
+    -------
+    solution : list of tuples (source, destin) or None
+        The moves of an optimal solution, as keys of bottles; None if the
+        game cannot be won (or if a limit was reached, see stats).
+    stats : dictionary
+        See solveBoard.
+
+    """
+    board = Board.fromBottles(bottles, botSize)
+    moves, stats = solveBoard(board, len(bottles) - expert, maxNodes, maxSeconds,
+                              patterns=patterns)
+    solution = None
+    if moves is not None:
+        labels = board.labels
+        solution = [(labels[source], labels[destin]) for source, destin in moves]
+    return solution, stats
@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import functions as funcs
+from batch import BatchRunner, runBatch
+from buildpack import buildPack
+from gameconfig import CFG_FILE, loadConfig
+from saves import formatSave
+from solver import solve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CFG = os.path.join(ROOT, CFG_FILE)
+PUZZLE = "1-7-8-2-2a"
+
+
+def solution(puzzleId):
+    cfg = loadConfig(CFG, {"nrBotts": 7, "botSize": 8, "expertise": "2"})
+    bottles = funcs.buildGameFromId(puzzleId, cfg.bottleLabels(), cfg.colorSymbols(5))
+    moves, _ = solve(bottles, 8, 2, maxNodes=200000)
+    return moves
+
+
+def play(script, **options):
+    runner = BatchRunner(CFG, **options)
+    try:
+        return list(runner.run(script.splitlines()))
+    finally:
+        runner.close()
+
+
+def test_games_are_played_back_to_back():
+    moves = solution(PUZZLE)
+    script = [f"NEW {PUZZLE}"] + [f"{source} {destin}" for source, destin in moves]
+    # The same game again, with an error (G is empty), an undo and a redo
+    script += [f"new {PUZZLE}", "# a comment", "g a", f"{moves[0][0]} {moves[0][1]}", "<", ">",
+               "END"]
+    won, second = play("\n".join(script))
+    assert won["ok"] and won["status"] == "won" and won["puzzleId"] == PUZZLE
+    assert won["moves"] == len(moves) and won["nrErrors"] == 0
+    assert won["fullBottles"] == 5 and won["line"] == 1
+    assert second["status"] == "playing"
+    assert (second["nrErrors"], second["moves"], second["undos"], second["redos"]) == (1, 1, 1, 1)
+    assert second["bottles"] != won["bottles"]
+    assert second["seconds"] >= 0
+
+
+def test_bad_lines_are_rejected():
+    results = play("A B\nC D\nNEW nope\nA B\nSEED 5\nA Z\nA B C\n>\n")
+    assert [result["ok"] for result in results] == [False, False, True]
+    assert "no game" in results[0]["error"] and results[1]["line"] == 3
+    game = results[2]
+    assert game["rejected"] == 3 and len(game["problems"]) == 3
+    assert "there is no bottle Z" in game["problems"][0]
+
+
+def test_three_errors_end_the_game():
+    results = play(f"NEW {PUZZLE}\nG A\nG B\nG C\nG D\n")
+    assert results[0]["status"] == "lost" and results[0]["nrErrors"] == 3
+    assert results[0]["rejected"] == 1
+
+
+def test_a_self_pour_is_an_error():
+    result, = play(f"NEW {PUZZLE}\nA A\nA A\nA A\n")
+    assert (result["moves"], result["nrErrors"], result["status"]) == (0, 3, "lost")
+    assert result["fullBottles"] == 0
+
+
+def test_seeds_build_the_same_game():
+    first, second = play("SEED 42\nSEED 42", overrides={"expertise": "3"})
+    assert first["puzzleId"] == second["puzzleId"] == "1-10-8-3-2a"
+    assert first["bottles"] == second["bottles"]
+
+
+def test_saves_and_packs(tmp_path):
+    bottles = funcs.buildGameFromId(PUZZLE, "ABCDEFG", "@#%$!")
+    header, body = formatSave(8, 7, 2, 1, 0, bottles, PUZZLE)
+    save = tmp_path / "player.txt"
+    save.write_text(header + body, encoding='utf-8', newline='\n')
+    packFile = str(tmp_path / "levels.pack")
+    buildPack(packFile, 3, 7, 8, 2, seed=1)
+    saved, level, missing = play(f"SAVE {save}\nPACK {packFile} 2\nPACK {packFile} 3\n")
+    assert saved["bottles"] == bottles and saved["nrErrors"] == 1
+    assert saved["puzzleId"] == PUZZLE
+    assert level["ok"] and level["nrBotts"] == 7 and level["puzzleId"] is None
+    assert not missing["ok"]
+
+
+def test_run_batch_writes_json_lines():
+    output = io.StringIO()
+    summary = runBatch(io.StringIO(f"NEW {PUZZLE}\nNEW x\n"), output, CFG)
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [line["ok"] for line in lines] == [True, False]
+    assert (summary["games"], summary["failed"], summary["won"]) == (2, 1, 0)
+
+
+def test_main_reads_moves_from_stdin(tmp_path):
+    moves = solution(PUZZLE)
+    script = f"NEW {PUZZLE}\n" + "".join(f"{s} {d}\n" for s, d in moves)
+    done = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--batch", "-"],
+                          input=script, capture_output=True, text=True, cwd=ROOT,
+                          timeout=60)
+    assert done.returncode == 0
+    result = json.loads(done.stdout)
+    assert result["status"] == "won"
+    assert "1 games (1 won" in done.stderr
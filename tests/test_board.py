@@ -0,0 +1,102 @@
+import random
+import time
+
+import functions as funcs
+from benchmark import labelsAndSymbols
+from board import Board
+
+
+def test_from_bottles_round_trip():
+    bottles = {'A': ['x', 'y', 'x'], 'B': ['y'], 'C': []}
+    board = Board.fromBottles(bottles, 3)
+    assert board.symbols == ['x', 'y']
+    assert list(board.heights) == [3, 1, 0]
+    assert board.toBottles() == bottles
+
+
+def test_a_bottle_is_never_poured_into_itself():
+    board = Board.fromBottles({'A': ['x', 'y'], 'B': ['x', 'x', 'x'], 'C': ['y', 'y']}, 4)
+    before = board.key()
+    assert not board.moveIsPossible(0, 0)
+    assert board.doMove(0, 0) == 0
+    assert board.key() == before and list(board.heights) == [2, 3, 2]
+
+
+def test_moves_agree_with_the_dictionary_rules():
+    rng = random.Random(5)
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng)
+    board = Board.fromBottles(bottles, 4)
+    letters = list(bottles)
+    for _ in range(300):
+        source, destin = rng.randrange(7), rng.randrange(7)
+        possible = funcs.moveIsPossible(4, letters[source], letters[destin], bottles)
+        assert board.moveIsPossible(source, destin) == possible
+        if possible:
+            assert board.doMove(source, destin) == \
+                funcs.doMove(4, letters[source], letters[destin], bottles)
+        assert board.toBottles() == bottles
+
+
+def test_large_boards_are_built_in_linear_time():
+    letters, symbols = labelsAndSymbols(999)
+    bottles = funcs.buildGameBottles(999, 255, 10, letters, symbols, random.Random(1))
+    start = time.perf_counter()
+    board = Board.fromBottles(bottles, 255)
+    assert time.perf_counter() - start < 1.0
+    assert len(board.symbols) == 989
+    assert board.toBottles() == bottles
+
+
+def renamed(bottles, rng):
+    # The same game with the bottles in another order and the symbols renamed
+    letters = list(bottles)
+    rng.shuffle(letters)
+    symbols = sorted({char for content in bottles.values() for char in content})
+    names = dict(zip(symbols, rng.sample([chr(0x100 + i) for i in range(2 * len(symbols))],
+                                         len(symbols))))
+    return {letter: [names[char] for char in bottles[letter]] for letter in letters}
+
+
+def test_the_canonical_key_ignores_bottle_order_and_color_names():
+    rng = random.Random(9)
+    for _ in range(400):
+        nrBotts, botSize = rng.randint(3, 8), rng.randint(1, 4)
+        expert = rng.randint(1, 2)
+        bottles = funcs.buildGameBottles(nrBotts, botSize, expert, "ABCDEFGH"[:nrBotts],
+                                         "@#%$!+o"[:nrBotts - expert], rng)
+        for _ in range(rng.randrange(20)):
+            moves = [(s, d) for s in bottles for d in bottles
+                     if funcs.moveIsPossible(botSize, s, d, bottles)]
+            if moves:
+                funcs.doMove(botSize, *rng.choice(moves), bottles)
+        if rng.random() < 0.3:
+            # Copies of the same bottles make colors that nothing tells apart
+            bottles.update({letter + "'": [char + "'" for char in content]
+                            for letter, content in bottles.items()})
+        key = Board.fromBottles(bottles, botSize).canonicalKey()
+        for _ in range(3):
+            other = Board.fromBottles(renamed(bottles, rng), botSize)
+            key2, order = other.canonicalForm()
+            assert key2 == key
+            rows = [bytes(other.cells[b * botSize : (b + 1) * botSize]) for b in order]
+            # Row r of the key is bottle order[r] with its colors renamed
+            names = {}
+            for row, keyRow in zip(rows, (key[i : i + botSize]
+                                          for i in range(0, len(key), botSize))):
+                for code, keyCode in zip(row, keyRow):
+                    assert names.setdefault(code, keyCode) == keyCode
+
+
+def test_colors_that_look_alike_are_told_apart_by_their_bottles():
+    # x and y have the same cells, but only y shares a bottle with w
+    bottles = {'A': ['u', 'x'], 'B': ['u', 'y'], 'C': ['x', 'v', 'v'], 'D': ['y', 'w', 't']}
+    rng = random.Random(2)
+    keys = {Board.fromBottles(renamed(bottles, rng), 3).canonicalKey() for _ in range(50)}
+    assert len(keys) == 1
+
+
+def test_different_games_get_different_canonical_keys():
+    one = {'A': ['x', 'y', 'x'], 'B': ['y', 'x', 'y'], 'C': []}
+    other = {'A': ['x', 'x', 'y'], 'B': ['y', 'y', 'x'], 'C': []}
+    assert Board.fromBottles(one, 3).canonicalKey() != \
+        Board.fromBottles(other, 3).canonicalKey()
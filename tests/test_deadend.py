@@ -0,0 +1,78 @@
+import random
+
+import functions as funcs
+from board import Board
+from deadend import ALIVE, DEAD, UNKNOWN, WON, DeadEndDetector, hasAnyMove, isReversible
+
+
+def moves(board):
+    return [(s, d) for s in range(board.nrBotts) for d in range(board.nrBotts)
+            if board.moveIsPossible(s, d)]
+
+
+def reversible(board, move):
+    transfer = board.doMove(*move)
+    result = isReversible(board, *move, transfer)
+    board.undoMove(*move, transfer)
+    return result
+
+
+def test_a_lost_game_with_moves_left_is_dead():
+    # x and x can only go back and forth between B and C
+    board = Board.fromBottles({'A': ['y'], 'B': ['y', 'x', 'x'], 'C': ['y', 'x']}, 3)
+    detector = DeadEndDetector()
+    assert hasAnyMove(board)
+    assert detector.checkBoard(board, 2) == DEAD
+    assert detector.searches == 1
+
+
+def test_no_move_at_all_is_dead_without_a_search():
+    detector = DeadEndDetector()
+    assert detector.check({'A': ['x', 'y'], 'B': ['y', 'x'], 'C': ['z']}, 2, 0) == DEAD
+    assert detector.searches == 0
+    assert detector.check({'A': ['x', 'x'], 'B': ['y', 'y'], 'C': []}, 2, 1) == WON
+
+
+def test_a_reversible_move_keeps_the_status_without_a_search():
+    board = Board.fromBottles({'A': ['x', 'y', 'y', 'y'], 'B': ['x'], 'C': ['x', 'x', 'y'],
+                               'D': []}, 4)
+    detector = DeadEndDetector()
+    assert detector.checkBoard(board, 2) == ALIVE
+    plan = list(detector.plan)
+    # C only has room for one y, which can be poured back
+    move = (0, 2)
+    assert plan[0] != move
+    transfer = board.doMove(*move)
+    assert isReversible(board, *move, transfer)
+    assert detector.checkBoard(board, 2, move, transfer) == ALIVE
+    assert detector.searches == 1
+    assert detector.plan == [(move[1], move[0])] + plan
+
+
+def test_following_the_plan_wins_without_another_search():
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", random.Random(3))
+    board = Board.fromBottles(bottles, 4)
+    detector = DeadEndDetector()
+    assert detector.checkBoard(board, 5) == ALIVE
+    status = ALIVE
+    while detector.plan:
+        move = detector.plan[0]
+        status = detector.checkBoard(board, 5, move, board.doMove(*move))
+    assert status == WON and detector.searches == 1
+
+
+def test_searches_back_off_after_giving_up():
+    bottles = funcs.buildGameBottles(12, 4, 2, "ABCDEFGHIJKL", "@#%$!+o?&=", random.Random(5))
+    board = Board.fromBottles(bottles, 4)
+    detector = DeadEndDetector(maxNodes=1)
+    assert detector.checkBoard(board, 10) == UNKNOWN
+    assert (detector.wait, detector.backoff) == (1, 2)
+    source, destin = next(move for move in moves(board) if not reversible(board, move))
+    transfer = board.doMove(source, destin)
+    # The next search waits for one move, then for two
+    assert detector.checkBoard(board, 10, (source, destin), transfer) == UNKNOWN
+    assert detector.searches == 1
+    board.undoMove(source, destin, transfer)
+    transfer = board.doMove(source, destin)
+    assert detector.checkBoard(board, 10, (source, destin), transfer) == UNKNOWN
+    assert detector.searches == 2 and detector.wait == 2
@@ -0,0 +1,40 @@
+import random
+
+import functions as funcs
+from board import Board
+from difficulty import _scores, scoreBoard
+
+
+def randomBoard(seed):
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", random.Random(seed))
+    return Board.fromBottles(bottles, 4)
+
+
+def test_an_inconclusive_score_is_not_cached():
+    _scores.clear()
+    board = randomBoard(3)
+    rushed = scoreBoard(board, 5, maxNodes=1)
+    assert rushed["solvable"] is None and rushed["optimalMoves"] is None
+    assert not _scores
+    settled = scoreBoard(board, 5)
+    assert settled["solvable"] is True and settled["optimalMoves"] > 0
+    assert len(_scores) == 1
+
+
+def test_scores_are_cached_per_budget():
+    _scores.clear()
+    board = randomBoard(5)
+    score = scoreBoard(board, 5)
+    assert scoreBoard(board, 5) is score
+    fewer = scoreBoard(board, 5, maxStates=10, maxSolutions=1)
+    assert fewer is not score
+    assert fewer["solutions"] == 1 and len(_scores) == 2
+    assert fewer["optimalMoves"] == score["optimalMoves"]
+
+
+def test_the_cache_ignores_the_order_of_bottles():
+    _scores.clear()
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", random.Random(8))
+    score = scoreBoard(Board.fromBottles(bottles, 4), 5)
+    backwards = {letter: bottles[letter] for letter in reversed(list(bottles))}
+    assert scoreBoard(Board.fromBottles(backwards, 4), 5) is score
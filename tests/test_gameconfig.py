@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from gameconfig import DEFAULT_CONFIG, loadConfig, parseConfig, saveConfig
+
+
+def test_symbols_may_start_with_a_hash():
+    cfg = DEFAULT_CONFIG.replace(symbols="#@%$!+o?§")
+    assert parseConfig(cfg.format()) == cfg
+
+
+def test_headers_may_take_several_lines_in_any_order():
+    text = ("# Expertise\n# options: random; 1; 2; 3; 4; 5\n3\n\n"
+            "# Available symbols\n#   (at least 9)\n\n#@%$!+o?§\n"
+            "# Total number of bottles in the game\n# Max 999\n12\n"
+            "# Identifying letters for the bottles\nABCDEFGHIJKL\n"
+            "# Bottle capacity\n# Min 8\n# Max 255\n9\n")
+    assert parseConfig(text) == DEFAULT_CONFIG.replace(
+        botSize=9, nrBotts=12, symbols="#@%$!+o?§", letters="ABCDEFGHIJKL", expertise="3")
+
+
+def test_a_missing_value_is_named():
+    text = DEFAULT_CONFIG.format().replace("# Expertise", "# Something else")
+    with pytest.raises(ValueError, match="Expertise"):
+        parseConfig(text)
+
+
+def test_the_file_is_only_read_again_when_it_changes(tmp_path):
+    fileName = str(tmp_path / "cfg.txt")
+    assert saveConfig(DEFAULT_CONFIG, fileName)
+    assert not saveConfig(DEFAULT_CONFIG, fileName)
+    cfg = loadConfig(fileName)
+    assert loadConfig(fileName) is cfg
+    changed = DEFAULT_CONFIG.replace(nrBotts=12, letters="ABCDEFGHIJKL")
+    with open(fileName, 'w', encoding='utf-8') as file:
+        file.write(changed.format())
+    info = os.stat(fileName)
+    os.utime(fileName, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+    assert loadConfig(fileName) == changed
+
+
+def test_overrides_come_before_the_environment(tmp_path):
+    fileName = str(tmp_path / "cfg.txt")
+    saveConfig(DEFAULT_CONFIG, fileName)
+    environ = {"WSP_BOT_SIZE": "12", "WSP_EXPERTISE": "3"}
+    cfg = loadConfig(fileName, {"botSize": "10"}, environ)
+    assert (cfg.botSize, cfg.expertise) == (10, "3")
+    assert loadConfig(fileName, environ={}) == DEFAULT_CONFIG
+    with pytest.raises(ValueError, match="capacity"):
+        loadConfig(fileName, {"botSize": 4}, {})
+    assert loadConfig(fileName, {"botSize": 4}, {}, validate=False).botSize == 4
@@ -0,0 +1,53 @@
+import random
+
+import functions as funcs
+from gamestate import GameState
+
+
+def expectedRuns(content):
+    runs = []
+    previous = None
+    for char in content:
+        if char == previous:
+            runs[-1] += 1
+        else:
+            runs.append(1)
+            previous = char
+    return runs
+
+
+def checkState(state):
+    for letter, content in state.bottles.items():
+        assert state.runs[letter] == expectedRuns(content)
+        assert state.complete[letter] == funcs.full(content, state.botSize)
+    assert state.nrComplete == sum(state.complete.values())
+
+
+def test_a_bottle_cannot_be_poured_into_itself():
+    bottles = {'A': ['x', 'y'], 'B': ['x', 'x', 'x'], 'C': ['y', 'y']}
+    state = GameState(bottles, 4, 2)
+    assert not state.moveIsPossible('A', 'A')
+    assert not funcs.moveIsPossible(4, 'A', 'A', bottles)
+    assert state.runs['A'] == [1, 1]
+    state.doMove('C', 'A')
+    assert bottles['A'] == ['x', 'y', 'y', 'y'] and state.runs['A'] == [1, 3]
+    assert not state.won()
+    checkState(state)
+
+
+def test_runs_follow_random_moves_and_undos():
+    rng = random.Random(11)
+    bottles = funcs.buildGameBottles(9, 5, 2, "ABCDEFGHI", "@#%$!+o", rng)
+    state = GameState(bottles, 5, 2)
+    made = []
+    for _ in range(500):
+        if made and rng.random() < 0.3:
+            state.undoMove(*made.pop())
+        else:
+            moves = [(s, d) for s in bottles for d in bottles if state.moveIsPossible(s, d)]
+            if not moves:
+                continue
+            source, destin = rng.choice(moves)
+            made.append((source, destin, state.doMove(source, destin)))
+        checkState(state)
+    assert state.won() == funcs.allBottlesFull(9, state.nrComplete, 2)
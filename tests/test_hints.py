@@ -0,0 +1,53 @@
+import random
+import time
+
+import functions as funcs
+from benchmark import labelsAndSymbols
+from board import Board
+from hints import HintService, greedyMove
+from solver import usefulMoves
+
+
+def test_a_hint_is_a_legal_move_and_is_cached():
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", random.Random(4))
+    service = HintService()
+    hint = service.hint(bottles, 4, 2)
+    assert hint is not None and funcs.moveIsPossible(4, *hint, bottles)
+    assert service.hint(bottles, 4, 2) == hint
+    assert (service.hits, service.misses) == (1, 1)
+
+
+def test_no_hint_for_a_won_game():
+    bottles = {'A': ['x', 'x'], 'B': ['y', 'y'], 'C': []}
+    assert HintService().hint(bottles, 2, 1) is None
+
+
+def test_the_greedy_move_is_among_the_best_useful_moves():
+    rng = random.Random(6)
+
+    def score(board, move):
+        before = board.runs(move[0]) + board.runs(move[1])
+        transfer = board.doMove(*move)
+        after = board.runs(move[0]) + board.runs(move[1])
+        board.undoMove(*move, transfer)
+        return (after - before, -transfer)
+
+    for _ in range(20):
+        bottles = funcs.buildGameBottles(9, 4, 2, "ABCDEFGHI", "@#%$!+o", rng)
+        board = Board.fromBottles(bottles, 4)
+        move = greedyMove(board)
+        assert board.moveIsPossible(*move)
+        assert score(board, move) == min(score(board, m) for m in usefulMoves(board))
+    assert greedyMove(Board.fromBottles({'A': ['x', 'y'], 'B': ['y', 'x']}, 2)) is None
+
+
+def test_the_time_budget_covers_building_the_board():
+    letters, symbols = labelsAndSymbols(300)
+    bottles = funcs.buildGameBottles(300, 40, 5, letters, symbols, random.Random(2))
+    service = HintService(maxSeconds=0.05)
+    start = time.perf_counter()
+    hint = service.hint(bottles, 40, 5)
+    elapsed = time.perf_counter() - start
+    assert hint is None or funcs.moveIsPossible(40, *hint, bottles)
+    # The greedy fallback still runs once the budget is spent
+    assert elapsed < 0.1
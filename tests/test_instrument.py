@@ -0,0 +1,41 @@
+import json
+
+import functions as funcs
+import instrument
+import saves
+
+
+def test_enable_measures_and_disable_restores(tmp_path):
+    doMove = funcs.doMove
+    loadSave = saves.loadSave
+    instrument.reset()
+    instrument.enable(["functions.doMove", "saves.loadSave", "gamestate.GameState.doMove"])
+    try:
+        assert funcs.doMove is not doMove
+        # Also where it was imported by name
+        assert funcs.loadSave is saves.loadSave is not loadSave
+        bottles = {'A': ['x', 'y'], 'B': ['y'], 'C': []}
+        for _ in range(3):
+            transfer = funcs.doMove(2, 'A', 'C', bottles)
+            funcs.undoMove('A', 'C', transfer, bottles)
+        report = instrument.report()["functions"]
+        assert list(report) == ["functions.doMove"]
+        assert report["functions.doMove"]["calls"] == 3
+        assert sum(report["functions.doMove"]["histogram"].values()) == 3
+        instrument.dump(str(tmp_path / "measures.json"))
+        with open(tmp_path / "measures.json", encoding='utf-8') as file:
+            assert json.load(file)["functions"]["functions.doMove"]["calls"] == 3
+    finally:
+        instrument.disable()
+    assert funcs.doMove is doMove
+    assert funcs.loadSave is saves.loadSave is loadSave
+    assert not instrument.enabled()
+
+
+def test_periodic_dump_writes_a_last_report(tmp_path):
+    fileName = str(tmp_path / "measures.json")
+    assert not instrument.enableFromEnvironment({})
+    instrument.startDumping(fileName, every=60)
+    instrument.stopDumping()
+    with open(fileName, encoding='utf-8') as file:
+        assert "functions" in json.load(file)
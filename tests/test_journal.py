@@ -0,0 +1,78 @@
+import copy
+import random
+
+import functions as funcs
+from board import Board
+from gamestate import GameState
+from journal import MoveJournal
+
+
+def randomMove(rng, state):
+    moves = [(s, d) for s in state.bottles for d in state.bottles
+             if state.moveIsPossible(s, d)]
+    return rng.choice(moves) if moves else None
+
+
+def playRandom(rng, state, journal, howMany):
+    for _ in range(howMany):
+        move = randomMove(rng, state)
+        if move is None:
+            break
+        transfer = state.doMove(*move)
+        journal.record(*move, transfer, state.bottles[move[1]][-1])
+
+
+def test_undo_and_redo_round_trip_on_a_game_state():
+    rng = random.Random(2)
+    bottles = funcs.buildGameBottles(9, 5, 2, "ABCDEFGHI", "@#%$!+o", rng)
+    start = copy.deepcopy(bottles)
+    state = GameState(bottles, 5, 2)
+    journal = MoveJournal()
+    playRandom(rng, state, journal, 40)
+    end = copy.deepcopy(bottles)
+    runs = copy.deepcopy(state.runs)
+    made = len(journal)
+    assert journal.undo(state, made + 5) == made
+    assert bottles == start and len(journal) == 0
+    assert journal.undo(state) == 0
+    assert journal.redo(state, made) == made
+    assert bottles == end and state.runs == runs
+    assert journal.redo(state) == 0
+
+
+def test_a_new_move_drops_the_undone_ones():
+    rng = random.Random(4)
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng)
+    state = GameState(bottles, 4, 2)
+    journal = MoveJournal()
+    playRandom(rng, state, journal, 10)
+    journal.undo(state, 3)
+    playRandom(rng, state, journal, 1)
+    assert journal.redo(state) == 0
+    assert len(journal.entries) == len(journal)
+
+
+def test_rollback_to_a_checkpoint_on_a_board():
+    rng = random.Random(8)
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng)
+    board = Board.fromBottles(bottles, 4)
+    journal = MoveJournal()
+    mark = journal.checkpoint()
+    before = board.key()
+    for _ in range(30):
+        moves = [(s, d) for s in range(7) for d in range(7) if board.moveIsPossible(s, d)]
+        source, destin = rng.choice(moves)
+        transfer = board.doMove(source, destin)
+        journal.record(source, destin, transfer, board.topSymbolAndPosition(destin)[0])
+    journal.rollback(board, mark)
+    assert board.key() == before
+    assert len(journal) == 0 and not journal.entries
+
+
+def test_truncate_keeps_the_last_moves():
+    journal = MoveJournal()
+    for i in range(10):
+        journal.record(i, i + 1, 1, 'x')
+    journal.truncate(keep=4)
+    assert len(journal) == 4
+    assert [entry[0] for entry in journal.entries] == [6, 7, 8, 9]
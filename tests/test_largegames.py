@@ -0,0 +1,37 @@
+import random
+import time
+
+import functions as funcs
+from benchmark import labelsAndSymbols
+from deadend import DeadEndDetector
+from gamesession import GameSession
+from hints import HintService
+
+
+def test_a_large_session_keeps_its_board_in_step():
+    nrBotts, botSize, expert = 300, 40, 5
+    letters, symbols = labelsAndSymbols(nrBotts)
+    bottles = funcs.buildGameBottles(nrBotts, botSize, expert, letters, symbols,
+                                     random.Random(2))
+    session = GameSession(botSize, nrBotts, expert, 0, bottles, hints=HintService(),
+                          deadEnds=DeadEndDetector(maxNodes=200, maxSeconds=0.05))
+    rng = random.Random(3)
+    slowest = 0.0
+    for step in range(40):
+        if step % 7 == 6:
+            session.undo()
+            session.redo()
+            session.undo()
+            continue
+        source = rng.choice([letter for letter in letters if bottles[letter]])
+        destin = next((d for d in letters if session.state.moveIsPossible(source, d)), None)
+        if destin is None:
+            continue
+        start = time.perf_counter()
+        session.move(source, destin)
+        slowest = max(slowest, time.perf_counter() - start)
+        assert session.board.toBottles() == bottles
+    # A move costs the dead end search at most, never a rebuild of the board
+    assert slowest < 0.5
+    hint = session.hint()
+    assert hint is None or session.state.moveIsPossible(*hint)
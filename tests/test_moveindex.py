@@ -0,0 +1,50 @@
+import random
+
+import functions as funcs
+from board import Board
+from moveindex import MoveIndex
+
+
+def bruteForceMoves(board):
+    # Every legal move, less those MoveIndex leaves out on purpose
+    heights = board.heights
+    empty = [bottle for bottle in range(board.nrBotts) if heights[bottle] == 0]
+    moves = set()
+    for source in range(board.nrBotts):
+        single = heights[source] > 0 and board.topRun(source) == heights[source]
+        if single and heights[source] == board.botSize:
+            continue
+        for destin in range(board.nrBotts):
+            if not board.moveIsPossible(source, destin):
+                continue
+            if heights[destin] == 0 and (single or destin != empty[0]):
+                continue
+            moves.add((source, destin))
+    return moves
+
+
+def test_legal_moves_follow_random_moves_and_undos():
+    rng = random.Random(12)
+    for nrBotts, botSize, expert in ((7, 4, 2), (12, 5, 3), (20, 8, 4)):
+        letters = [str(bottle) for bottle in range(nrBotts)]
+        symbols = [chr(0x100 + code) for code in range(nrBotts - expert)]
+        board = Board.fromBottles(funcs.buildGameBottles(nrBotts, botSize, expert, letters,
+                                                         symbols, rng), botSize)
+        index = MoveIndex(board)
+        made = []
+        for _ in range(300):
+            moves = index.legalMoves()
+            assert len(moves) == len(set(moves))
+            assert set(moves) == bruteForceMoves(board)
+            if made and (not moves or rng.random() < 0.3):
+                index.undoMove(*made.pop())
+            elif moves:
+                source, destin = rng.choice(moves)
+                made.append((source, destin, index.doMove(source, destin)))
+        fresh = MoveIndex(board)
+        assert (fresh.open, fresh.closed, fresh.empty) == (index.open, index.closed, index.empty)
+
+
+def test_complete_bottles_are_never_poured():
+    board = Board.fromBottles({'A': ['x', 'x'], 'B': ['y'], 'C': ['y'], 'D': []}, 2)
+    assert sorted(MoveIndex(board).legalMoves()) == [(1, 2), (2, 1)]
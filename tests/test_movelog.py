@@ -0,0 +1,121 @@
+import os
+import random
+import subprocess
+import sys
+import time
+
+import pytest
+
+import functions as funcs
+from board import Board
+from movelog import MAGIC, MOVE, MoveLog, replay, replayLog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_move_log_replays_moves_undos_and_errors(tmp_path):
+    rng = random.Random(3)
+    bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng)
+    log = MoveLog.create(4, 7, 2, 0, bottles, folder=str(tmp_path), puzzleId="1-7-4-2-3")
+    nrErrors = 0
+    for step in range(120):
+        moves = [(s, d) for s in bottles for d in bottles
+                 if funcs.moveIsPossible(4, s, d, bottles)]
+        source, destin = rng.choice(moves)
+        transfer = funcs.doMove(4, source, destin, bottles)
+        log.move(source, destin, bottles, nrErrors)
+        if step % 5 == 0:
+            funcs.undoMove(source, destin, transfer, bottles)
+            log.undo(source, destin, transfer, bottles, nrErrors)
+        if step % 11 == 0:
+            nrErrors += 1
+            log.error()
+    log.close()
+
+    botSize, nrBotts, expertise, errors, _, replayed, puzzleId = replayLog(log.fileName)
+    assert (botSize, nrBotts, expertise, puzzleId) == (4, 7, 2, "1-7-4-2-3")
+    assert errors == nrErrors
+    assert replayed == bottles
+
+
+def test_move_log_ignores_a_record_cut_short(tmp_path):
+    bottles = {'A': ['x', 'y'], 'B': ['y', 'x'], 'C': []}
+    log = MoveLog.create(2, 3, 1, 0, bottles, folder=str(tmp_path))
+    funcs.doMove(2, 'A', 'C', bottles)
+    log.move('A', 'C')
+    expected = {letter: list(content) for letter, content in bottles.items()}
+    log.file.write(b"M\x01")   # the program stopped in the middle of a record
+    log.close()
+    assert replayLog(log.fileName)[5] == expected
+
+
+def test_self_pour_records_change_nothing(tmp_path):
+    bottles = {'A': ['x', 'y'], 'B': ['x', 'x', 'x'], 'C': ['y', 'y']}
+    log = MoveLog.create(4, 3, 2, 0, bottles, folder=str(tmp_path))
+    log.move('A', 'A')
+    log.undo('B', 'B', 3)
+    log.move('C', 'A')
+    log.close()
+    *_, fullBottles, replayed, _ = replayLog(log.fileName)
+    assert replayed == {'A': ['x', 'y', 'y', 'y'], 'B': ['x', 'x', 'x'], 'C': []}
+    assert fullBottles == 0
+
+
+def test_wide_logs_of_many_bottles(tmp_path):
+    rng = random.Random(6)
+    letters = [f"B{i}" for i in range(300)]
+    bottles = funcs.buildGameBottles(300, 4, 40, letters, [f"s{i}" for i in range(260)], rng)
+    log = MoveLog.create(4, 300, 40, 0, bottles, folder=str(tmp_path))
+    step = 0
+    while step < 300:
+        source, destin = rng.choice(letters), rng.choice(letters)
+        if not funcs.moveIsPossible(4, source, destin, bottles):
+            continue
+        step += 1
+        transfer = funcs.doMove(4, source, destin, bottles)
+        log.move(source, destin, bottles)
+        if step % 3 == 0:
+            funcs.undoMove(source, destin, transfer, bottles)
+            log.undo(source, destin, transfer, bottles)
+    log.close()
+    assert replayLog(log.fileName)[5] == bottles
+
+
+def test_a_damaged_log_raises_value_error(tmp_path):
+    damaged = tmp_path / "session-1.wsplog"
+    damaged.write_bytes(MAGIC)
+    with pytest.raises(ValueError):
+        replayLog(str(damaged))
+    damaged.write_bytes(b"not a log")
+    with pytest.raises(ValueError):
+        replayLog(str(damaged))
+
+
+def test_main_still_removes_a_log_it_cannot_recover(tmp_path):
+    (tmp_path / "session-1.wsplog").write_bytes(MAGIC + b"M\x00\x01")
+    done = subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], input="YES\n",
+                          capture_output=True, text=True, cwd=str(tmp_path), timeout=60)
+    assert "could not be recovered" in done.stdout
+    assert not (tmp_path / "session-1.wsplog").exists()
+
+
+def test_replay_runs_at_a_million_moves_per_second():
+    rng = random.Random(1)
+    bottles = funcs.buildGameBottles(10, 8, 2, "ABCDEFGHIJ", "@#%$!+o?", rng)
+    board = Board.fromBottles(bottles, 8)
+    records = bytearray(MAGIC)
+    for _ in range(30000):
+        source, destin = rng.choice([(s, d) for s in range(10) for d in range(10)
+                                     if board.moveIsPossible(s, d)])
+        board.doMove(source, destin)
+        records += bytes((MOVE, source, destin))
+    data = bytes(records)
+    best = float("inf")
+    for _ in range(3):
+        replayed = {letter: list(content) for letter, content in bottles.items()}
+        begin = time.perf_counter()
+        replay(replayed, 8, data, len(MAGIC), len(data))
+        best = min(best, time.perf_counter() - begin)
+    assert replayed == board.toBottles()
+    # About 1.6 million moves per second here; a wide margin for slow machines
+    assert 30000 / best > 250000
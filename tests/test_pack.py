@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import functions as funcs
+from board import Board
+from buildpack import buildPack
+from generator import buildGameBatch
+from pack import PuzzlePack
+from verify import chunkRandom
+
+LETTERS = "ABCDEFGHIJ"
+SYMBOLS = "0123456789"
+CFG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "cfg.newGame.txt")
+
+
+def test_pack_levels_are_the_generated_games(tmp_path):
+    fileName = str(tmp_path / "levels.pack")
+    buildPack(fileName, 300, 10, 8, 2, seed=4, chunkSize=128)
+    with PuzzlePack(fileName) as pack:
+        assert len(pack) == 300
+        assert pack.shape(299) == (10, 8, 2)
+        for level in (0, 127, 128, 299):
+            chunk, row = divmod(level, 128)
+            batch = buildGameBatch(128, 10, 8, 2, chunkRandom(4, chunk))
+            assert pack.bottles(level, LETTERS, SYMBOLS) == batch.bottles(row, LETTERS, SYMBOLS)
+        with pytest.raises(IndexError):
+            pack.board(300, LETTERS, SYMBOLS)
+
+
+def test_pack_with_two_byte_colors(tmp_path):
+    fileName = str(tmp_path / "wide.pack")
+    buildPack(fileName, 3, 300, 2, 10, seed=1)
+    labels = [str(i) for i in range(300)]
+    symbols = [chr(0x100 + i) for i in range(290)]
+    batch = buildGameBatch(3, 300, 2, 10, chunkRandom(1, 0))
+    with PuzzlePack(fileName) as pack:
+        board = pack.board(2, labels, symbols)
+        assert board.key() == batch.board(2, labels, symbols).key()
+
+
+def test_not_a_pack(tmp_path):
+    fileName = tmp_path / "empty.pack"
+    fileName.write_bytes(b"")
+    with pytest.raises(ValueError):
+        PuzzlePack(str(fileName))
+
+
+def test_new_game_from_a_pack_level(tmp_path, monkeypatch):
+    monkeypatch.setattr(funcs, "sleep", lambda seconds: None)
+    packFile = str(tmp_path / "levels.pack")
+    buildPack(packFile, 10, 7, 4, 2, seed=2)
+    info = funcs.newGameInfo(CFG_FILE, None, None, packFile, 6)
+    botSize, nrBotts, expertise, nrErrors, fullBottles, bottles, puzzleId = info
+    assert (botSize, nrBotts, expertise, nrErrors, puzzleId) == (4, 7, 2, 0, None)
+    assert Board.fromBottles(bottles, 4).canonicalKey() == \
+        buildGameBatch(10, 7, 4, 2, chunkRandom(2, 0)).canonicalKey(6)
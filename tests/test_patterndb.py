@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from generator import buildGameBatch
+from patterndb import (UNREACHABLE, PatternDatabase, allPatterns, colorPattern,
+                       patternDistances, writeTable)
+from solver import solveBoard
+
+
+@pytest.fixture(scope="module")
+def patterns(tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp("patterns"))
+    for botSize in (3, 4, 5):
+        writeTable(botSize, folder)
+    database = PatternDatabase(folder)
+    yield database
+    database.close()
+
+
+def test_distances_of_simple_patterns():
+    patterns, distances = patternDistances(4)
+    distance = dict(zip(patterns, distances))
+    assert distance[((False, (4,)),)] == 0
+    # Two halves, one on an empty bottom: one move
+    assert distance[((False, (2,)), (True, (2,)))] == 1
+    # Both halves on other colors: one of them must first go elsewhere
+    assert distance[((True, (2,)), (True, (2,)))] == 2
+    assert all(distance < UNREACHABLE for distance in distances)
+    assert len(set(patterns)) == len(patterns) == len(allPatterns(4))
+
+
+def test_missing_capacity_has_no_table(patterns):
+    assert patterns.table(6) is None
+
+
+@pytest.mark.parametrize("shape", [(5, 3, 2), (7, 4, 2), (9, 5, 2)])
+def test_solutions_stay_shortest(patterns, shape):
+    nrBotts, botSize, expert = shape
+    nrColors = nrBotts - expert
+    batch = buildGameBatch(10, nrBotts, botSize, expert, random.Random(1))
+    table = patterns.table(botSize)
+    for row in range(10):
+        board = batch.board(row, range(nrBotts), range(1, nrColors + 1))
+        bound = sum(board.runs(bottle) for bottle in range(nrBotts)) - nrColors
+        estimate = sum(table.distance(colorPattern(board, code))
+                       for code in range(1, nrColors + 1))
+        assert estimate >= bound
+        plain, _ = solveBoard(board, nrColors)
+        found, stats = solveBoard(board, nrColors, patterns=patterns)
+        assert not stats["exhausted"]
+        assert (plain is None) == (found is None)
+        if found is not None:
+            assert len(found) == len(plain)
+            assert estimate <= len(found)
+
+
+class FlatTable:
+    # A table that knows nothing: every pattern is at distance 0
+    def distance(self, pattern):
+        return 0
+
+
+class FlatPatterns:
+    def table(self, botSize):
+        return FlatTable()
+
+
+def test_the_bound_of_the_runs_still_counts_with_patterns():
+    batch = buildGameBatch(5, 7, 4, 2, random.Random(3))
+    for row in range(5):
+        board = batch.board(row, range(7), range(1, 6))
+        plain, plainStats = solveBoard(board, 5)
+        found, stats = solveBoard(board, 5, patterns=FlatPatterns())
+        assert found == plain
+        assert stats["nodes"] == plainStats["nodes"]
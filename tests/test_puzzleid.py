@@ -0,0 +1,42 @@
+import pytest
+
+import functions as funcs
+from puzzleid import (GENERATOR_VERSION, formatPuzzleId, newPuzzleId, parsePuzzleId,
+                      puzzleRandom)
+
+
+def test_format_and_parse_round_trip():
+    for values in ((7, 8, 2, 0), (10, 8, 3, 0x5f3a9c21), (999, 255, 5, 2**64 - 1)):
+        puzzleId = formatPuzzleId(*values)
+        assert puzzleId.startswith(f"{GENERATOR_VERSION}-")
+        assert parsePuzzleId(puzzleId) == values
+    assert formatPuzzleId(10, 8, 3, 0x5f3a9c21) == f"{GENERATOR_VERSION}-10-8-3-5f3a9c21"
+    assert parsePuzzleId(f" {GENERATOR_VERSION}-10-8-3-5F3A9C21\n") == (10, 8, 3, 0x5f3a9c21)
+
+
+def test_new_ids_keep_the_shape_of_the_game():
+    nrBotts, botSize, expert, seed = parsePuzzleId(newPuzzleId(12, 9, 4))
+    assert (nrBotts, botSize, expert) == (12, 9, 4)
+    assert 0 <= seed < 2**32
+
+
+@pytest.mark.parametrize("puzzleId", ["", "1-10-8-3", "1-10-8-3-5f-0", "1-ten-8-3-5f",
+                                      "1-10-8-3-xyz", "1-10-8-3-", "10/8/3/5f/1"])
+def test_bad_ids_are_rejected(puzzleId):
+    with pytest.raises(ValueError, match="not a puzzle ID"):
+        parsePuzzleId(puzzleId)
+
+
+def test_ids_of_another_generator_version_are_rejected():
+    with pytest.raises(ValueError, match="generator version"):
+        parsePuzzleId(formatPuzzleId(10, 8, 3, 1, version=GENERATOR_VERSION + 1))
+
+
+def test_the_same_id_always_builds_the_same_game():
+    puzzleId = formatPuzzleId(10, 8, 3, 0xbeef)
+    assert puzzleRandom(puzzleId).random() == puzzleRandom(puzzleId).random()
+    game = funcs.buildGameFromId(puzzleId, "ABCDEFGHIJ", "@#%$!+o?§")
+    assert game == funcs.buildGameFromId(puzzleId, "ABCDEFGHIJ", "@#%$!+o?§")
+    assert len(game) == 10 and all(len(content) <= 8 for content in game.values())
+    assert game != funcs.buildGameFromId(formatPuzzleId(10, 8, 3, 0xbeee),
+                                         "ABCDEFGHIJ", "@#%$!+o?§")
@@ -0,0 +1,49 @@
+import json
+
+from saves import formatSave, readSaveIndex, loadSave, recordSave
+
+
+def test_save_index_and_load(tmp_path):
+    folder = str(tmp_path)
+    bottles = {'A': ['#', '@'], 'B': ['@', '#'], 'C': []}
+    header, body = formatSave(2, 3, 1, 0, 0, bottles, "1-3-2-1-ff")
+    with open(tmp_path / "bob.txt", 'w', encoding='utf-8', newline='\n') as file:
+        file.write(header + body)
+    recordSave("bob.txt", "bob", 2, 3, 1, 0, 0, len(header.encode('utf-8')), folder,
+               "1-3-2-1-ff")
+
+    index = readSaveIndex(folder)
+    entry = index["bob.txt"]
+    assert entry["puzzleId"] == "1-3-2-1-ff"
+    assert loadSave("bob.txt", entry, folder) == bottles
+
+    # A lost index is rebuilt from the files
+    (tmp_path / "saves.index.json").unlink()
+    rebuilt = readSaveIndex(folder)["bob.txt"]
+    assert rebuilt["offset"] == entry["offset"]
+    assert loadSave("bob.txt", rebuilt, folder) == bottles
+
+    # A deleted save is no longer listed
+    (tmp_path / "bob.txt").unlink()
+    assert readSaveIndex(folder) == {}
+
+
+def test_saves_missing_from_the_index_are_listed(tmp_path):
+    folder = str(tmp_path)
+    bottles = {'A': ['#', '@'], 'B': ['@', '#'], 'C': []}
+    header, body = formatSave(2, 3, 1, 2, 0, bottles)
+    (tmp_path / "cfg.newGame.txt").write_text("# Bottle capacity\n8\n", encoding='utf-8')
+    with open(tmp_path / "new.txt", 'w', encoding='utf-8', newline='\n') as file:
+        file.write(header + body)
+    recordSave("new.txt", "new", 2, 3, 1, 2, 0, len(header.encode('utf-8')), folder)
+    # A save of an older version, written without the index
+    with open(tmp_path / "old.txt", 'w', encoding='utf-8', newline='\n') as file:
+        file.write(header + body)
+
+    index = readSaveIndex(folder)
+    assert sorted(index) == ["new.txt", "old.txt"]
+    assert index["old.txt"]["player"] == "old" and index["old.txt"]["nrErrors"] == 2
+    assert loadSave("old.txt", index["old.txt"], folder) == bottles
+    # It is now in the index file itself
+    with open(tmp_path / "saves.index.json", encoding='utf-8') as file:
+        assert "old.txt" in json.load(file)
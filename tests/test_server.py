@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import functions as funcs
+from gamesession import MAX_ERRORS, GameSession
+from loadtest import loadTest
+from server import GameServer
+
+
+def test_session_moves_undo_redo_and_errors():
+    bottles = {'A': ['x', 'y'], 'B': ['y', 'x'], 'C': []}
+    session = GameSession(2, 3, 1, 0, bottles)
+    assert session.move('A', 'C') == 1
+    assert session.undo() and bottles['A'] == ['x', 'y']
+    assert session.redo() and bottles['C'] == ['y']
+    assert not session.redo()
+    for _ in range(MAX_ERRORS):
+        assert not session.over()
+        assert session.move('C', 'A') == 0
+    assert session.over() and not session.won()
+
+
+def test_session_counts_a_self_pour_as_an_error():
+    bottles = {'A': ['x', 'y'], 'B': ['x', 'x', 'x'], 'C': ['y', 'y']}
+    session = GameSession(4, 3, 2, 0, bottles)
+    assert session.move('A', 'A') == 0
+    assert session.nrErrors == 1 and bottles['A'] == ['x', 'y']
+    assert session.move('C', 'A') == 2
+    assert not session.won() and not session.over()
+    assert session.undo() and bottles['A'] == ['x', 'y'] and session.nrErrors == 1
+
+
+def test_session_is_won():
+    session = GameSession.fromInfo((2, 3, 1, 0, 0, {'A': ['x', 'y'], 'B': ['y'], 'C': ['x']},
+                                    None))
+    session.move('A', 'B')
+    session.move('A', 'C')
+    assert session.won() and session.over() and session.fullBottles == 2
+
+
+async def talk(server, lines):
+    listener = await server.start("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    answers = []
+    for line in lines + ["QUIT"]:
+        writer.write(line.encode('utf-8') + b"\n")
+        answers.append(json.loads(await reader.readline()))
+    # The server closes the connection after QUIT
+    assert await reader.read() == b""
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return answers
+
+
+def test_server_plays_saves_and_loads(tmp_path):
+    server = GameServer(str(tmp_path), cfgFile=str(tmp_path / "none.txt"), hintWorkers=1)
+    try:
+        new, _ = asyncio.run(talk(server, ["NEW 1-7-8-2-2a"]))
+        bottles = new["bottles"]
+        assert new["ok"] and new["status"] == "playing"
+        assert bottles == funcs.buildGameFromId("1-7-8-2-2a", "ABCDEFGHIJ", "@#%$!+o?§")
+        source, destin = next((s, d) for s in bottles for d in bottles
+                              if s != d and funcs.moveIsPossible(8, s, d, bottles))
+        wrong = next((s, d) for s in bottles for d in bottles
+                     if s != d and bottles[s] and not funcs.moveIsPossible(8, s, d, bottles))
+        answers = asyncio.run(talk(server, [
+            "MOVE A", "NEW 1-7-8-2-2a", f"MOVE {source} {destin}", f"move {wrong[0]} {wrong[1]}",
+            "MOVE A Q", f"MOVE {source} {source}", "HINT", "SAVE ann", "UNDO", "LOAD ann", "SAVE ../x", "STATS"]))
+    finally:
+        server.close()
+    noGame, _, moved, error, unknown, selfPour, hint, saved, undone, loaded, badName, stats, _ = answers
+    assert not noGame["ok"]
+    assert moved["transfer"] > 0
+    assert error["transfer"] == 0 and error["nrErrors"] == 1
+    assert not unknown["ok"]
+    assert selfPour["transfer"] == 0 and selfPour["nrErrors"] == 2
+    assert hint["ok"] and (hint["hint"] is None or len(hint["hint"]) == 2)
+    assert saved["ok"] and undone["changed"]
+    funcs.doMove(8, source, destin, bottles)
+    assert loaded["bottles"] == bottles and loaded["nrErrors"] == 2
+    assert loaded["puzzleId"] == "1-7-8-2-2a"
+    assert not badName["ok"]
+    assert stats["commands"] == 11
+
+
+def test_load_test_against_its_own_server():
+    report = asyncio.run(loadTest(20, nrBotts=7, botSize=8, expert=2, saves=0.5))
+    assert report["sessions"] == 20
+    assert sum(report["outcomes"].values()) == 20
+    assert report["server"]["commands"] == report["requests"]
+    assert report["server"]["connections"] == 0
@@ -0,0 +1,30 @@
+import random
+
+import functions as funcs
+from simulate import POLICIES, playGame, simulate
+from solver import solve
+
+
+def test_solver_policy_wins_in_the_optimal_number_of_moves():
+    rng = random.Random(5)
+    for _ in range(10):
+        bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng)
+        solution, _ = solve(bottles, 4, 2)
+        policy = POLICIES["solver"](4, 2, rng)
+        result = playGame(bottles, 4, 2, policy, rng)
+        if solution is None:
+            assert result["outcome"] != "won"
+        else:
+            assert result == {"outcome": "won", "moves": len(solution), "errors": 0,
+                              "fullBottles": 5}
+
+
+def test_simulate_counts_every_game_and_is_repeatable():
+    first = simulate(50, 7, 4, 2, "greedy", seed=1, slips=0.1, chunkSize=16, workers=2)
+    again = simulate(50, 7, 4, 2, "greedy", seed=1, slips=0.1, chunkSize=16, workers=2)
+    assert first["games"] == 50
+    assert first["won"] + first["lost to errors"] + first["stuck"] + first["limit"] == 50
+    assert sum(first["errorsHistogram"].values()) == 50
+    assert sum(first["movesHistogram"].values()) == first["won"]
+    for name in ("movesHistogram", "errorsHistogram", "fullBottlesHistogram"):
+        assert first[name] == again[name]
@@ -0,0 +1,96 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import functions as funcs
+from solutioncache import SolutionCache
+from solver import solve
+
+
+def shuffledGame(bottles, rng):
+    # The same game with the bottles in another order and the symbols renamed
+    letters = list(bottles)
+    rng.shuffle(letters)
+    symbols = sorted({char for content in bottles.values() for char in content})
+    renamed = dict(zip(symbols, rng.sample("abcdefghij", len(symbols))))
+    return {letter: [renamed[char] for char in bottles[letter]] for letter in letters}
+
+
+def playsToTheEnd(bottles, botSize, solution):
+    bottles = {letter: list(content) for letter, content in bottles.items()}
+    for source, destin in solution:
+        assert funcs.moveIsPossible(botSize, source, destin, bottles)
+        funcs.doMove(botSize, source, destin, bottles)
+    return sum(funcs.full(content, botSize) for content in bottles.values())
+
+
+def test_equivalent_games_share_one_entry(tmp_path):
+    rng = random.Random(7)
+    with SolutionCache(str(tmp_path / "cache.sqlite")) as cache:
+        for _ in range(5):
+            bottles = funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng)
+            expected, _ = solve(bottles, 4, 2)
+            solution, score = cache.solve(bottles, 4, 2)
+            misses = cache.misses
+            other = shuffledGame(bottles, rng)
+            again, otherScore = cache.solve(other, 4, 2)
+            assert cache.misses == misses
+            assert otherScore == score
+            if expected is None:
+                assert solution is None and again is None
+            else:
+                assert len(solution) == len(again) == len(expected) == score["optimalMoves"]
+                assert playsToTheEnd(bottles, 4, solution) == 5
+                assert playsToTheEnd(other, 4, again) == 5
+
+
+def test_entries_survive_a_restart_and_the_oldest_are_evicted(tmp_path):
+    fileName = str(tmp_path / "cache.sqlite")
+    rng = random.Random(1)
+    games = [funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng) for _ in range(6)]
+    with SolutionCache(fileName, maxEntries=4, evictEvery=1) as cache:
+        for bottles in games:
+            cache.solve(bottles, 4, 2)
+        assert cache.stats()["entries"] == 4
+    with SolutionCache(fileName) as cache:
+        for bottles in games[2:]:
+            cache.solve(bottles, 4, 2)
+        assert (cache.diskHits, cache.misses) == (4, 0)
+        cache.solve(games[0], 4, 2)
+        assert cache.misses == 1
+
+
+def solveInWorker(task):
+    fileName, seed = task
+    rng = random.Random(seed)
+    with SolutionCache(fileName, evictEvery=5) as cache:
+        for _ in range(10):
+            cache.solve(funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng), 4, 2)
+    return cache.misses
+
+
+def test_processes_share_the_file(tmp_path):
+    fileName = str(tmp_path / "cache.sqlite")
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(solveInWorker, [(fileName, seed % 2) for seed in range(8)]))
+    with SolutionCache(fileName) as cache:
+        assert cache.stats()["entries"] <= 20
+        assert solveInWorker((fileName, 0)) == 0
+
+
+def test_games_used_from_memory_are_not_evicted_from_the_file(tmp_path):
+    fileName = str(tmp_path / "cache.sqlite")
+    rng = random.Random(4)
+    games = [funcs.buildGameBottles(7, 4, 2, "ABCDEFG", "@#%$!", rng) for _ in range(4)]
+    with SolutionCache(fileName, maxEntries=3, evictEvery=1) as cache:
+        for bottles in games[:3]:
+            cache.solve(bottles, 4, 2)
+        # Only ever read from memory from now on
+        cache.solve(games[0], 4, 2)
+        assert cache.hits == 1
+        cache.solve(games[3], 4, 2)
+        assert cache.stats()["entries"] == 3
+    with SolutionCache(fileName) as cache:
+        cache.solve(games[0], 4, 2)
+        assert (cache.diskHits, cache.misses) == (1, 0)
+        cache.solve(games[1], 4, 2)
+        assert cache.misses == 1
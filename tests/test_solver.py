@@ -0,0 +1,53 @@
+import random
+from collections import deque
+
+import pytest
+
+import functions as funcs
+from generator import buildGameBatch
+from solver import isSolved, solve, solveBoard
+
+
+def shortestByBreadthFirst(board, nrColors):
+    # Every legal move, no pruning: the reference for optimal lengths
+    seen = {board.key()}
+    queue = deque([(board.copy(), 0)])
+    while queue:
+        current, depth = queue.popleft()
+        if isSolved(current, nrColors):
+            return depth
+        for source in range(current.nrBotts):
+            for destin in range(current.nrBotts):
+                if source != destin and current.moveIsPossible(source, destin):
+                    transfer = current.doMove(source, destin)
+                    key = current.key()
+                    if key not in seen:
+                        seen.add(key)
+                        queue.append((current.copy(), depth + 1))
+                    current.undoMove(source, destin, transfer)
+    return None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_solver_is_optimal_on_tiny_boards(seed):
+    batch = buildGameBatch(1, 5, 3, 2, random.Random(seed))
+    board = batch.board(0, "ABCDE", "xyz")
+    solution, stats = solveBoard(board, 3)
+    assert not stats["exhausted"]
+    expected = shortestByBreadthFirst(board, 3)
+    if expected is None:
+        assert solution is None
+        return
+    assert len(solution) == expected
+    for source, destin in solution:
+        assert board.moveIsPossible(source, destin)
+        board.doMove(source, destin)
+    assert isSolved(board, 3)
+
+
+def test_solve_returns_bottle_letters():
+    bottles = {'A': ['x', 'y'], 'B': ['y', 'x'], 'C': []}
+    solution, _ = solve(bottles, 2, 1)
+    for source, destin in solution:
+        funcs.doMove(2, source, destin, bottles)
+    assert sorted(map(sorted, bottles.values())) == [[], ['x', 'x'], ['y', 'y']]
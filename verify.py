@@ -0,0 +1,221 @@
+"""
+Checks whether generated games can be won, and in how many moves.
+
+Example:
+    python verify.py --boards 10000 --bottles 10 --capacity 8 --expert 2
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from generator import buildGameBatch
+from solver import solveBoard
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# *****************************************************
+def chunkRandom(seed, chunk):
+    """
+    The random generator for one chunk of a pack, the same in every process
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the whole pack.
+    chunk : int
+        The index of the chunk.
+
+    Returns
+    -------
+    random.Random
+
+    """
+    return random.Random(f"{seed}:{chunk}")
+
+# *****************************************************
+def verifyChunk(task):
+    """
+    Builds and solves the games of one chunk (runs in a worker process)
+
+    Parameters
+    ----------
+    task : tuple
+        (seed, chunk, first, howMany, nrBotts, botSize, expert, maxNodes,
+        maxSeconds), where first is the index in the pack of its first game.
+
+    Returns
+    -------
+    list of dictionaries
+        One per game: "board" (index in the pack), "status" ("solved",
+        "unsolvable" or "unknown" if a limit was reached), "moves" (length
+        of the optimal solution or None), "nodes" and "seconds".
+
+    """
+    seed, chunk, first, howMany, nrBotts, botSize, expert, maxNodes, maxSeconds = task
+    batch = buildGameBatch(howMany, nrBotts, botSize, expert, chunkRandom(seed, chunk))
+    symbols = [chr(code) for code in range(1, nrBotts - expert + 1)]
+    results = []
+    for row in range(howMany):
+        board = batch.board(row, LETTERS, symbols)
+        solution, stats = solveBoard(board, nrBotts - expert, maxNodes, maxSeconds)
+        if solution is not None:
+            status = "solved"
+        elif stats["exhausted"]:
+            status = "unknown"
+        else:
+            status = "unsolvable"
+        results.append({"board": first + row,
+                        "status": status,
+                        "moves": None if solution is None else len(solution),
+                        "nodes": stats["nodes"],
+                        "seconds": stats["seconds"]})
+    return results
+
+# *****************************************************
+def verifyPack(nrBoards, nrBotts, botSize, expert, seed=0, chunkSize=64,
+               workers=None, maxNodes=None, maxSeconds=None, onResults=None):
+    """
+    Solves a pack of generated games using all the processor cores
+
+    The pack is split into chunks of chunkSize games, each built and
+    solved by a worker process from (seed, chunk index), so only small
+    tuples travel between processes. At most two chunks per worker are
+    in flight at any time and results are handed to onResults as soon
+    as each chunk completes.
+
+    Parameters
+    ----------
+    nrBoards : int
+        The number of games in the pack.
+    nrBotts, botSize, expert : int
+        The shape of the games, as in functions.buildGameBottles.
+    seed : int, optional
+        Identifies the pack. The default is 0.
+    chunkSize : int, optional
+        Games per task sent to a worker. The default is 64.
+    workers : int, optional
+        Number of processes. The default is None (one per core).
+    maxNodes : int, optional
+        Node budget per game. The default is None (no limit).
+    maxSeconds : float, optional
+        Time budget per game. The default is None (no limit).
+    onResults : function, optional
+        Called with the list of results of each chunk as it completes.
+
+    Returns
+    -------
+    dictionary
+        The summary report (see summarize).
+
+    """
+    workers = workers or os.cpu_count() or 1
+    nrChunks = (nrBoards + chunkSize - 1) // chunkSize
+    tasks = ((seed, chunk, chunk * chunkSize,
+              min(chunkSize, nrBoards - chunk * chunkSize),
+              nrBotts, botSize, expert, maxNodes, maxSeconds)
+             for chunk in range(nrChunks))
+    summary = newSummary(nrBotts, botSize, expert, seed)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(verifyChunk, task))
+            if len(pending) >= 2 * workers:
+                pending = collect(pending, summary, onResults)
+        while pending:
+            pending = collect(pending, summary, onResults)
+    summary["seconds"] = time.perf_counter() - start
+    summary["workers"] = workers
+    return summarize(summary)
+
+# *****************************************************
+def collect(pending, summary, onResults):
+    # Waits for at least one chunk and adds its results to the summary
+    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        results = future.result()
+        for result in results:
+            summary["statuses"][result["status"]] += 1
+            if result["moves"] is not None:
+                summary["moves"][result["moves"]] += 1
+            summary["nodes"] += result["nodes"]
+        if onResults is not None:
+            onResults(results)
+    return pending
+
+# *****************************************************
+def newSummary(nrBotts, botSize, expert, seed):
+    return {"nrBotts": nrBotts, "botSize": botSize, "expert": expert,
+            "seed": seed, "statuses": Counter(), "moves": Counter(), "nodes": 0}
+
+# *****************************************************
+def summarize(summary):
+    """
+    Completes the summary with rates and averages
+
+    Parameters
+    ----------
+    summary : dictionary
+        Counters gathered by verifyPack.
+
+    Returns
+    -------
+    dictionary
+        Ready to be written as JSON: "boards", "solved", "unsolvable",
+        "unknown", "deadEndRate" (unsolvable / decided boards),
+        "meanMoves", "movesHistogram", "boardsPerSec", "nodesPerSec"...
+
+    """
+    statuses = summary.pop("statuses")
+    moves = summary.pop("moves")
+    boards = sum(statuses.values())
+    decided = statuses["solved"] + statuses["unsolvable"]
+    seconds = summary["seconds"]
+    summary["boards"] = boards
+    for status in ("solved", "unsolvable", "unknown"):
+        summary[status] = statuses[status]
+    summary["deadEndRate"] = statuses["unsolvable"] / decided if decided else None
+    solved = sum(moves.values())
+    summary["meanMoves"] = sum(k * v for k, v in moves.items()) / solved if solved else None
+    summary["movesHistogram"] = {str(k): moves[k] for k in sorted(moves)}
+    summary["boardsPerSec"] = boards / seconds if seconds else 0.0
+    summary["nodesPerSec"] = summary["nodes"] / seconds if seconds else 0.0
+    return summary
+
+# *****************************************************
+def main():
+    parser = argparse.ArgumentParser(description="Solve a pack of generated games.")
+    parser.add_argument("--boards", type=int, default=1000)
+    parser.add_argument("--bottles", type=int, default=10)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--expert", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-nodes", type=int, default=200000)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--report", default="verify_report.json")
+    args = parser.parse_args()
+
+    def progress(results):
+        progress.done += len(results)
+        print(f"{progress.done} boards verified", end="\r", flush=True)
+    progress.done = 0
+
+    summary = verifyPack(args.boards, args.bottles, args.capacity, args.expert,
+                         args.seed, args.chunk, args.workers, args.max_nodes,
+                         args.max_seconds, progress)
+    print()
+    with open(args.report, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, indent=2)
+    print(f"Solved: {summary['solved']}  Unsolvable: {summary['unsolvable']}  "
+          f"Unknown: {summary['unknown']}  ({summary['boardsPerSec']:.1f} boards/s)")
+    print("Report written to " + args.report)
+
+
+if __name__ == "__main__":
+    main()